@@ -1,79 +1,256 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
-import csv
+from tkinter import filedialog, messagebox, ttk
 import psycopg2
+import logging
 import os
-import re
-from datetime import datetime, date, time, timedelta
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from data_core import (
+    DatabaseManager, HeaderError, ImportCancelled, ImportMonitor, export_option,
+    EXPORT_ALL, EXPORT_TARGETS, is_typed, load_typed, format_cache_stats,
+    CSV_ONLY_OPTIONS, option_conflicts,
+    validate_admin_user, load_admin_user, validate_restaurant, load_restaurant,
+    import_restaurant_streaming,
+    validate_auth_user, validate_foodie_contact, load_users, import_users_staged
+)
+from data_delta import upsert_admin_user, upsert_restaurant, upsert_users
+from data_swap import swap_admin_user, swap_restaurant, swap_users
+from data_pool import connection
+from data_shard import export_option_sharded
+from data_formats import EXPORT_FORMATS, IMPORT_FILETYPES
+from data_resume import import_admin_resumable, import_restaurant_resumable, import_users_resumable
+from data_errors import DIALOG_EXAMPLES, error_summary
+from data_metrics import RunMetrics, format_metrics
 
-class DatabaseManager:
-    def __init__(self):
-        self.conn = psycopg2.connect(
-            host="localhost",
-            dbname="dishdb",
-            user="postgres",
-            password="jkl"
-        )
-        self.cur = self.conn.cursor()
+# Checkbox names of the OPTION_CONFLICTS options
+OPTION_LABELS = {
+    'stream': "Stream", 'workers': "All CPU cores", 'delta': "Delta import", 'swap': "Shadow load",
+    'bulk': "Bulk mode", 'resume': "Resumable import", 'staged': "Staging tables",
+    'incremental': "Incremental export", 'parts': "Sharded export",
+}
+
+def option_errors(options, typed=False):
+    # Messages for option combinations the CLI would reject; options is
+    # {name: value} with the OPTION_CONFLICTS names
+    errors = [f"{OPTION_LABELS[first]} cannot be combined with {OPTION_LABELS[second]}"
+              for first, second in option_conflicts(options)]
+    if typed:
+        errors += [f"{OPTION_LABELS[name]} needs a CSV file" for name in CSV_ONLY_OPTIONS if options.get(name)]
+    return errors
+
+class BackgroundTask:
+    """Runs work(monitor, log) on a worker thread and relays its events to Tk"""
+    POLL_MS = 100
+    
+    def __init__(self, widget, work, on_done, on_error, on_progress=None, on_log=None, on_cancelled=None,
+                 metrics=None):
+        self.widget = widget
+        self.work = work
+        # RunMetrics timing the work; its record is ready once on_done runs
+        self.metrics = metrics
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_log = on_log
+        self.on_cancelled = on_cancelled
+        self.events = queue.Queue()
+        self.monitor = ImportMonitor(callback=self._queue_progress)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        self.widget.after(self.POLL_MS, self._poll)
+        return self
     
-    def import_csv(self, table_name, file_path):
+    def cancel(self):
+        self.monitor.cancel()
+    
+    # ---- worker thread side: never touch Tk here ----
+    def _queue_progress(self, stage, done, total, rate):
+        self.events.put(("progress", (stage, done, total, rate)))
+    
+    def _queue_log(self, message, tag=None):
+        self.events.put(("log", (message, tag)))
+    
+    def _work(self):
         try:
-            with open(file_path, 'r') as f:
-                reader = csv.reader(f)
-                headers = next(reader)
-                
-                # Remove 'id' column if present
-                if 'id' in headers:
-                    id_index = headers.index('id')
-                    headers.pop(id_index)
-                
-                columns = ', '.join(headers)
-                placeholders = ', '.join(['%s'] * len(headers))
-                
-                # Clear table before import
-                self.cur.execute(f"DELETE FROM {table_name}")
-                # Reset sequence
-                self.cur.execute(f"ALTER SEQUENCE {table_name}_id_seq RESTART WITH 1")
-                
-                # Insert data
-                for row in reader:
-                    # Remove id value if exists
-                    if 'id' in headers:
-                        row.pop(id_index)
-                    self.cur.execute(
-                        f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
-                        row
-                    )
-            self.conn.commit()
-            return True
-        except Exception as e:
-            self.conn.rollback()
-            raise e
+            return self.work(self.monitor, self._queue_log)
+        finally:
+            # A stage that raised never reached finish(); record it as failed
+            self.monitor.abort()
     
-    def export_csv(self, table_name, file_path):
+    def _run(self):
         try:
-            self.cur.execute(f"SELECT * FROM {table_name}")
-            rows = self.cur.fetchall()
-            
-            with open(file_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                # Write headers
-                writer.writerow([desc[0] for desc in self.cur.description])
-                writer.writerows(rows)
-            return True
+            if self.metrics:
+                with self.metrics:
+                    result = self._work()
+            else:
+                result = self._work()
+            self.events.put(("done", result))
+        except ImportCancelled:
+            self.events.put(("cancelled", None))
         except Exception as e:
-            raise e
+            self.events.put(("error", e))
     
-    def close(self):
-        self.cur.close()
-        self.conn.close()
+    # ---- Tk main thread side ----
+    def _poll(self):
+        finished = False
+        try:
+            while True:
+                kind, payload = self.events.get_nowait()
+                if kind == "progress" and self.on_progress:
+                    self.on_progress(*payload)
+                elif kind == "log" and self.on_log:
+                    self.on_log(*payload)
+                elif kind == "done":
+                    finished = True
+                    self.on_done(payload)
+                elif kind == "cancelled":
+                    finished = True
+                    if self.on_cancelled:
+                        self.on_cancelled()
+                elif kind == "error":
+                    finished = True
+                    self.on_error(payload)
+        except queue.Empty:
+            pass
+        if not finished:
+            self.widget.after(self.POLL_MS, self._poll)
 
-class GUI2(tk.Toplevel):
+class ProgressPanel(tk.Frame):
+    """Progress bar, rows/sec readout and Cancel button for a BackgroundTask"""
     def __init__(self, parent):
+        super().__init__(parent)
+        self.task = None
+        
+        self.bar = ttk.Progressbar(self, orient=tk.HORIZONTAL, mode="determinate")
+        self.bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
+        
+        self.cancel_btn = tk.Button(self, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.RIGHT)
+        
+        self.text_var = tk.StringVar(value="")
+        tk.Label(self, textvariable=self.text_var, font=("Arial", 9), fg="gray").pack(side=tk.RIGHT, padx=5)
+    
+    def attach(self, task):
+        self.task = task
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.text_var.set("Starting...")
+    
+    def update_progress(self, stage, done, total, rate):
+        if total:
+            self.bar.stop()
+            self.bar.config(mode="determinate", maximum=total, value=done)
+            self.text_var.set(f"{stage}: {done}/{total} rows ({rate:,.0f} rows/s)")
+        else:
+            # Row count is unknown while a file is still being read
+            if self.bar.cget("mode") != "indeterminate":
+                self.bar.config(mode="indeterminate")
+                self.bar.start(50)
+            self.text_var.set(f"{stage}: {done} rows ({rate:,.0f} rows/s)")
+    
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.text_var.set("Cancelling...")
+    
+    def reset(self, text=""):
+        self.task = None
+        self.bar.stop()
+        self.bar.config(mode="determinate", value=0)
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.text_var.set(text)
+
+# Full log of every LogConsole, rotated at LOG_FILE_BYTES
+LOG_FILE = "data_manager.log"
+LOG_FILE_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+def _file_log():
+    # One rotating file handler for the whole app, added on first use
+    logger = logging.getLogger("data_manager.console")
+    if not logger.handlers:
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_BACKUPS,
+                                      encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+class LogConsole:
+    """Log sink for a Text widget. write() may be called from any thread;
+    lines are buffered and shown every FLUSH_MS in a single insert, the
+    widget keeps the last MAX_LINES lines and LOG_FILE keeps all of them."""
+    FLUSH_MS = 100
+    MAX_LINES = 2000
+    
+    def __init__(self, text):
+        self.text = text
+        self.file_log = _file_log()
+        self.lock = threading.Lock()
+        # Ring buffer: a burst longer than the widget cap only keeps its
+        # tail, leaving room for the "lines not shown" note
+        self.pending = deque(maxlen=self.MAX_LINES - 1)
+        self.dropped = 0
+        self.text.after(self.FLUSH_MS, self._flush)
+    
+    def write(self, message, tag=None):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.file_log.log(logging.ERROR if tag == "error" else logging.INFO, message)
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append((f"[{timestamp}] {message}\n", tag or ()))
+    
+    def _flush(self):
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        try:
+            if lines:
+                self._show(lines, dropped)
+            self.text.after(self.FLUSH_MS, self._flush)
+        except tk.TclError:
+            # The window was closed
+            pass
+    
+    def _show(self, lines, dropped):
+        chunks = []
+        if dropped:
+            chunks += [f"... {dropped} lines not shown, see {os.path.abspath(LOG_FILE)}\n", "info"]
+        for line, tag in lines:
+            chunks += [line, tag]
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, *chunks)
+        # The Text always ends with a newline, so 'end' is one line past the last
+        excess = int(self.text.index("end").split(".")[0]) - 2 - self.MAX_LINES
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+
+class GUI2(tk.Toplevel):
+    def __init__(self, parent, workers=None, delta=False, swap=False, bulk=False, resume=False):
         super().__init__(parent)
         self.title("Special Data Import")
-        self.geometry("600x500")
+        self.geometry("600x560")
         self.parent = parent
+        # Worker processes for validation (None validates on one core)
+        self.workers = workers
+        # Delta mode updates changed users in place instead of reloading
+        self.delta = delta
+        # Shadow mode loads copies of the tables and swaps them in at the end
+        self.swap = swap
+        # Bulk mode rebuilds secondary indexes once after the load
+        self.bulk = bulk
+        # Resumable mode stages batches and continues from a checkpoint
+        self.resume = resume
         
         # Variables to store file paths
         self.auth_user_file = None
@@ -122,6 +299,21 @@ class GUI2(tk.Toplevel):
         )
         self.btn_import.pack(pady=10)
         
+        # Staging mode validates and joins inside PostgreSQL instead of Python;
+        # greyed out when a main window option rules it out
+        self.staged_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            container,
+            text="Large files: validate and load through staging tables",
+            variable=self.staged_var,
+            state=tk.DISABLED if option_conflicts(self._options(staged=True), ['staged']) else tk.NORMAL,
+            font=("Arial", 10)
+        ).pack(pady=(0, 5))
+        
+        self.progress = ProgressPanel(container)
+        self.progress.pack(fill=tk.X, pady=5)
+        self.task = None
+        
         # Status Frame
         status_frame = tk.Frame(container)
         status_frame.pack(fill=tk.X, pady=10)
@@ -149,16 +341,14 @@ class GUI2(tk.Toplevel):
         self.terminal.tag_config("success", foreground="green")
         self.terminal.tag_config("error", foreground="red")
         self.terminal.tag_config("info", foreground="blue")
+        self.console = LogConsole(self.terminal)
 
     def log_message(self, message, tag=None):
-        self.terminal.config(state=tk.NORMAL)
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.terminal.insert(tk.END, f"[{timestamp}] {message}\n", tag)
-        self.terminal.see(tk.END)
-        self.terminal.config(state=tk.DISABLED)
+        # Safe from any thread; shown on the next console flush
+        self.console.write(message, tag)
 
     def select_auth_user(self):
-        file_path = filedialog.askopenfilename(title="Select auth_user.csv", filetypes=[("CSV files", "*.csv")])
+        file_path = filedialog.askopenfilename(title="Select auth_user.csv", filetypes=IMPORT_FILETYPES)
         if file_path:
             self.auth_user_file = file_path
             self.auth_status.config(text=f"✅ {file_path.split('/')[-1]} selected", fg="green")
@@ -166,7 +356,7 @@ class GUI2(tk.Toplevel):
             self.log_message(f"Selected auth_user file: {file_path}", "info")
 
     def select_foodie_contact(self):
-        file_path = filedialog.askopenfilename(title="Select foodie_contact.csv", filetypes=[("CSV files", "*.csv")])
+        file_path = filedialog.askopenfilename(title="Select foodie_contact.csv", filetypes=IMPORT_FILETYPES)
         if file_path:
             self.foodie_contact_file = file_path
             self.foodie_status.config(text=f"✅ {file_path.split('/')[-1]} selected", fg="green")
@@ -179,259 +369,162 @@ class GUI2(tk.Toplevel):
         else:
             self.btn_import.config(state=tk.DISABLED)
 
+    def _options(self, staged=None):
+        # The main window's options and the staged checkbox, by their
+        # OPTION_CONFLICTS names
+        return {'workers': self.workers, 'delta': self.delta, 'swap': self.swap, 'bulk': self.bulk,
+                'resume': self.resume, 'staged': self.staged_var.get() if staged is None else staged}
+
     def validate_and_import(self):
+        errors = option_errors(self._options(), is_typed(self.auth_user_file))
+        if is_typed(self.auth_user_file) != is_typed(self.foodie_contact_file):
+            errors.append("CSV and binary/Parquet files cannot be mixed")
+        if errors:
+            for error in errors:
+                self.log_message(f"OPTION ERROR: {error}", "error")
+            messagebox.showerror("Import Options", "\n".join(errors))
+            return
         self.log_message("Starting validation and import process...", "info")
-        
-        # Validate auth_user.csv
-        auth_valid, auth_data, auth_errors = self.validate_auth_user()
-        if not auth_valid:
-            for error in auth_errors:
+        self.btn_import.config(state=tk.DISABLED)
+        
+        staged = self.staged_var.get()
+        
+        def work(monitor, log):
+            if is_typed(self.auth_user_file):
+                # Binary COPY / Parquet exports are loaded as they are
+                with self._connect() as conn:
+                    load_typed(conn, [('auth_user', self.auth_user_file),
+                                      ('foodie_contact', self.foodie_contact_file)],
+                               log, monitor, self.bulk)
+                return ("ok", None)
+            if self.resume:
+                with self._connect() as conn:
+                    valid, counts, errors = import_users_resumable(
+                        conn, self.auth_user_file, self.foodie_contact_file, log, monitor, self.bulk
+                    )
+                return ("ok", None) if valid else ("staged", errors)
+            if staged:
+                with self._connect() as conn:
+                    log("Connected to database successfully", "info")
+                    valid, counts, errors = import_users_staged(
+                        conn, self.auth_user_file, self.foodie_contact_file, log, monitor,
+                        bulk=self.bulk
+                    )
+                return ("ok", None) if valid else ("staged", errors)
+            
+            # Validate auth_user.csv
+            auth_valid, auth_data, auth_errors = self.validate_auth_user(monitor, log)
+            if not auth_valid:
+                return ("auth", auth_errors)
+            
+            # Validate foodie_contact.csv
+            foodie_valid, foodie_data, foodie_errors = self.validate_foodie_contact(auth_data, monitor, log)
+            if not foodie_valid:
+                return ("foodie", foodie_errors)
+            
+            # Import to database
+            self.import_to_database(auth_data, foodie_data, monitor, log)
+            return ("ok", None)
+        
+        self.task = BackgroundTask(
+            self, work,
+            on_done=self._import_finished,
+            on_error=self._import_failed,
+            on_progress=self.progress.update_progress,
+            on_log=self.log_message,
+            on_cancelled=self._import_cancelled,
+            metrics=RunMetrics('import', data_type='users',
+                               files=[self.auth_user_file, self.foodie_contact_file])
+        )
+        self.progress.attach(self.task)
+        self.task.start()
+    
+    def _import_finished(self, result):
+        status, errors = result
+        self.progress.reset()
+        self._update_import_button_state()
+        if status == "auth":
+            for error in error_summary(errors):
                 self.log_message(f"AUTH ERROR: {error}", "error")
             messagebox.showerror("Validation Failed", "auth_user.csv validation failed. Check terminal for details.")
             return
-        
-        # Validate foodie_contact.csv
-        foodie_valid, foodie_data, foodie_errors = self.validate_foodie_contact(auth_data)
-        if not foodie_valid:
-            for error in foodie_errors:
+        if status == "staged":
+            for error in error_summary(errors):
+                self.log_message(f"VALIDATION ERROR: {error}", "error")
+            messagebox.showerror("Validation Failed", "Staged validation failed. Check terminal for details.")
+            return
+        if status == "foodie":
+            for error in error_summary(errors):
                 self.log_message(f"FOODIE ERROR: {error}", "error")
             messagebox.showerror("Validation Failed", "foodie_contact.csv validation failed. Check terminal for details.")
             return
-        
-        # Import to database
-        try:
-            self.import_to_database(auth_data, foodie_data)
-            self.log_message("Import completed successfully!", "success")
-            messagebox.showinfo("Success", "Data imported successfully!")
-            # Close both windows after successful import
-            self.close_all_windows()
-        except Exception as e:
-            self.log_message(f"DATABASE ERROR: {str(e)}", "error")
-            messagebox.showerror("Import Failed", f"Database import failed: {str(e)}")
+        self.log_message("Import completed successfully!", "success")
+        for line in format_metrics(self.task.metrics.record):
+            self.log_message(f"TIMING: {line}", "info")
+        messagebox.showinfo("Success", "Data imported successfully!")
+        # Close both windows after successful import
+        self.close_all_windows()
+    
+    def _import_failed(self, e):
+        self.progress.reset()
+        self._update_import_button_state()
+        self.log_message(f"DATABASE ERROR: {str(e)}", "error")
+        messagebox.showerror("Import Failed", f"Database import failed: {str(e)}")
+    
+    def _import_cancelled(self):
+        self.progress.reset("Cancelled")
+        self._update_import_button_state()
+        self.log_message("Import cancelled, no changes were written", "info")
 
-    def validate_auth_user(self):
-        errors = []
-        data = []
-        username_set = set()
-        username_lower_set = set()  # For case-insensitive checks
-        
-        try:
-            with open(self.auth_user_file, 'r') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-                
-                # Sort rows by 'id' in ascending order
-                try:
-                    rows.sort(key=lambda row: int(row['id']))
-                except (KeyError, ValueError) as e:
-                    errors.append(f"Error sorting by ID: {str(e)}")
-                
-                for row in rows:
-                    username = row['username']
-                    username_lower = username.lower()  # For case-insensitive check
-                    
-                    # Check uniqueness - exact match
-                    if username in username_set:
-                        errors.append(f"Duplicate username: {username}")
-                    
-                    # Check uniqueness - case-insensitive
-                    if username_lower in username_lower_set:
-                        errors.append(f"Duplicate username (case-insensitive): {username}")
-                    
-                    username_set.add(username)
-                    username_lower_set.add(username_lower)
-                    
-                    # Check required fields
-                    required_fields = ['password', 'email', 'date_joined']
-                    for field in required_fields:
-                        if not row[field].strip():
-                            errors.append(f"Missing {field} for user {username}")
-                    
-                    # ====== FIX: CASE-INSENSITIVE BOOLEAN VALIDATION ======
-                    # Check boolean fields (accept both 'True/False' and 'TRUE/FALSE')
-                    boolean_fields = ['is_superuser', 'is_staff', 'is_active']
-                    for field in boolean_fields:
-                        value = row[field].strip().upper()
-                        if value not in ['TRUE', 'FALSE']:
-                            # Also check for Python-style booleans
-                            if value in ['TRUE', 'FALSE']:
-                                row[field] = value  # Normalize to uppercase
-                            else:
-                                errors.append(f"Invalid {field} value '{row[field]}' for user {username}")
-                    
-                    # Handle empty names
-                    row['first_name'] = row['first_name'] if row['first_name'].strip() else None
-                    row['last_name'] = row['last_name'] if row['last_name'].strip() else None
-                    
-                    data.append(row)
-            
-            if not errors:
-                self.log_message("auth_user.csv validation passed", "success")
-            return (len(errors) == 0, data, errors)
-        
-        except Exception as e:
-            errors.append(f"Error reading file: {str(e)}")
-            return (False, None, errors)
+    # The methods below may run on a worker thread, so they log through the
+    # `log` callable instead of writing to the Text widget directly
 
-    def validate_foodie_contact(self, auth_data):
-        errors = []
-        data = []
-        foodie_name_set = set()
-        
-        # Create lowercase username set for case-insensitive matching
-        auth_usernames_lower = {row['username'].lower() for row in auth_data}
-        
-        try:
-            with open(self.foodie_contact_file, 'r') as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-                
-                # Sort rows by 'id' in ascending order
-                try:
-                    rows.sort(key=lambda row: int(row['id']))
-                except (KeyError, ValueError) as e:
-                    errors.append(f"Error sorting by ID: {str(e)}")
-                
-                for row in rows:
-                    foodie_name = row['foodie_name']
-                    
-                    # Check uniqueness
-                    if foodie_name in foodie_name_set:
-                        errors.append(f"Duplicate foodie_name: {foodie_name}")
-                    foodie_name_set.add(foodie_name)
-                    
-                    # Check required fields
-                    required_fields = ['gender', 'age_range', 'occupation', 'live_district']
-                    for field in required_fields:
-                        if not row[field].strip():
-                            errors.append(f"Missing {field} for foodie {foodie_name}")
-                    
-                    # Check boolean fields (accept both 'True/False' and 'TRUE/FALSE')
-                    boolean_fields = [
-                        'favor_chinese', 'favor_western', 'favor_veg', 'favor_organic',
-                        'favor_japan', 'favor_korean', 'favor_thai', 'favor_seafood',
-                        'favor_muslim', 'favor_no_beef', 'favor_no_pork', 'is_mvp'
-                    ]
-                    for field in boolean_fields:
-                        value = row[field].strip().upper()
-                        if value not in ['TRUE', 'FALSE']:
-                            # Also check for Python-style booleans
-                            if value in ['TRUE', 'FALSE']:
-                                row[field] = value  # Normalize to uppercase
-                            else:
-                                errors.append(f"Invalid {field} value '{row[field]}' for foodie {foodie_name}")
-                    
-                    # Case-insensitive matching
-                    if foodie_name.lower() not in auth_usernames_lower:
-                        errors.append(f"Username {foodie_name} not found in auth_user for foodie {foodie_name}")
-                    
-                    data.append(row)
-            
-            if not errors:
-                self.log_message("foodie_contact.csv validation passed", "success")
-            return (len(errors) == 0, data, errors)
-        
-        except Exception as e:
-            errors.append(f"Error reading file: {str(e)}")
-            return (False, None, errors)
+    def validate_auth_user(self, monitor=None, log=None):
+        log = log or self.log_message
+        valid, data, errors = validate_auth_user(self.auth_user_file, monitor, self.workers)
+        if valid:
+            log("auth_user.csv validation passed", "success")
+        self._log_cache_stats(monitor, log)
+        return (valid, data, errors)
 
-    def import_to_database(self, auth_data, foodie_data):
-        conn = None
+    def validate_foodie_contact(self, auth_data, monitor=None, log=None):
+        log = log or self.log_message
+        valid, data, errors = validate_foodie_contact(self.foodie_contact_file, auth_data, monitor, self.workers)
+        if valid:
+            log("foodie_contact.csv validation passed", "success")
+        self._log_cache_stats(monitor, log)
+        return (valid, data, errors)
+    
+    def _log_cache_stats(self, monitor, log):
+        # Share of repeated values that were converted only once
+        for table, stats in (monitor.cache_stats if monitor else {}).items():
+            log(f"Value cache hits for {table}: {format_cache_stats(stats)}", "info")
+        if monitor:
+            monitor.cache_stats.clear()
+
+    def import_to_database(self, auth_data, foodie_data, monitor=None, log=None):
+        log = log or self.log_message
         try:
-            # Connect to database
-            conn = psycopg2.connect(
-                host="localhost",
-                dbname="dishdb",
-                user="postgres",
-                password="jkl"
-            )
-            cur = conn.cursor()
-            self.log_message("Connected to database successfully", "info")
-            
-            # Delete existing records and reset sequences
-            cur.execute("DELETE FROM foodie_contact;")
-            cur.execute("ALTER SEQUENCE foodie_contact_id_seq RESTART WITH 1;")
-            cur.execute("DELETE FROM auth_user;")
-            cur.execute("ALTER SEQUENCE auth_user_id_seq RESTART WITH 1;")
-            self.log_message("Cleared existing records and reset sequences", "info")
-            
-            # Create case-insensitive mapping of username to new ID
-            username_id_map = {}
-            
-            # Import auth_user data
-            for row in auth_data:
-                # ====== FIX: CASE-INSENSITIVE BOOLEAN CONVERSION ======
-                cur.execute("""
-                    INSERT INTO auth_user (password, last_login, is_superuser, username, 
-                        first_name, last_name, email, is_staff, is_active, date_joined)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id;
-                """, (
-                    row['password'], row['last_login'], 
-                    row['is_superuser'].strip().upper() == 'TRUE', 
-                    row['username'], 
-                    row['first_name'], row['last_name'], row['email'], 
-                    row['is_staff'].strip().upper() == 'TRUE', 
-                    row['is_active'].strip().upper() == 'TRUE', 
-                    row['date_joined']
-                ))
-                new_id = cur.fetchone()[0]
+            # Borrow a connection from the shared pool
+            with self._connect() as conn:
+                log("Connected to database successfully", "info")
                 
-                # Map lowercase username to ID
-                username_id_map[row['username'].lower()] = new_id
-            
-            self.log_message(f"Imported {len(auth_data)} records to auth_user table", "info")
-            
-            # Import foodie_contact data
-            for row in foodie_data:
-                # Lookup user ID using lowercase username
-                user_id = username_id_map.get(row['foodie_name'].lower())
-                if not user_id:
-                    raise ValueError(f"User ID not found for {row['foodie_name']}")
-                
-                cur.execute("""
-                    INSERT INTO foodie_contact (
-                        foodie_name, updated_date, gender, age_range, occupation, live_district,
-                        favor_chinese, favor_western, favor_veg, favor_organic, favor_japan, favor_korean,
-                        favor_thai, favor_seafood, favor_muslim, favor_no_beef, favor_no_pork,
-                        foodie_desc, foodie_photo, is_mvp, user_id
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    row['foodie_name'], row['updated_date'], 
-                    row['gender'], row['age_range'], row['occupation'], row['live_district'],
-                    row['favor_chinese'].strip().upper() == 'TRUE', 
-                    row['favor_western'].strip().upper() == 'TRUE',
-                    row['favor_veg'].strip().upper() == 'TRUE', 
-                    row['favor_organic'].strip().upper() == 'TRUE',
-                    row['favor_japan'].strip().upper() == 'TRUE', 
-                    row['favor_korean'].strip().upper() == 'TRUE',
-                    row['favor_thai'].strip().upper() == 'TRUE', 
-                    row['favor_seafood'].strip().upper() == 'TRUE',
-                    row['favor_muslim'].strip().upper() == 'TRUE', 
-                    row['favor_no_beef'].strip().upper() == 'TRUE',
-                    row['favor_no_pork'].strip().upper() == 'TRUE', 
-                    row['foodie_desc'], 
-                    row['foodie_photo'], 
-                    row['is_mvp'].strip().upper() == 'TRUE', 
-                    user_id
-                ))
-            self.log_message(f"Imported {len(foodie_data)} records to foodie_contact table", "info")
-            
-            # Commit changes and close connection
-            conn.commit()
-            cur.close()
-            self.log_message("Database connection closed", "info")
-            self.log_message("IMPORT OK - All operations completed successfully!", "success")
+                if self.delta:
+                    upsert_users(conn, auth_data, foodie_data, log=log, monitor=monitor)
+                elif self.swap:
+                    swap_users(conn, auth_data, foodie_data, log=log, monitor=monitor)
+                else:
+                    load_users(conn, auth_data, foodie_data, log=log, monitor=monitor, bulk=self.bulk)
+            log("Database connection returned to pool", "info")
+            log("IMPORT OK - All operations completed successfully!", "success")
             
         except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
-            self.log_message(f"DATABASE ERROR: {e.pgerror}", "error")
+            log(f"DATABASE ERROR: {e.pgerror}", "error")
             raise Exception(f"Database error: {e.pgerror}") from e
-        finally:
-            if conn:
-                conn.close()
+    
+    def _connect(self):
+        # with self._connect() as conn: ... returns the connection when done
+        return connection()
     
     def close_all_windows(self):
         """Close both the import window and the main application window"""
@@ -446,6 +539,16 @@ class MainApp:
         
         self.db = DatabaseManager()
         self.option_var = tk.IntVar(value=1)
+        self.stream_var = tk.BooleanVar(value=False)
+        self.parallel_var = tk.BooleanVar(value=False)
+        self.delta_var = tk.BooleanVar(value=False)
+        self.swap_var = tk.BooleanVar(value=False)
+        self.bulk_var = tk.BooleanVar(value=False)
+        self.resume_var = tk.BooleanVar(value=False)
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.sharded_var = tk.BooleanVar(value=False)
+        self.compress_var = tk.BooleanVar(value=False)
+        self.format_var = tk.StringVar(value='csv')
         
         self.create_widgets()
     
@@ -495,6 +598,39 @@ class MainApp:
             font=("Arial", 15)
         ).pack(side=tk.LEFT, padx=5)
         
+        # Streaming mode overlaps parsing with DB writes for big restaurant files.
+        # Ticking an option greys out the ones it conflicts with.
+        self.option_checks = {}
+        self._option_check(main_frame, 'stream', "Stream large Restaurant files (chunked import)",
+                           self.stream_var)
+        self._option_check(main_frame, 'workers', "Validate large files using all CPU cores",
+                           self.parallel_var)
+        self._option_check(main_frame, 'delta', "Delta import: only write new and changed rows, keep existing ids",
+                           self.delta_var)
+        self._option_check(main_frame, 'swap', "Shadow load: fill a copy and swap it in (tables stay readable)",
+                           self.swap_var)
+        self._option_check(main_frame, 'bulk', "Bulk mode: rebuild indexes once after the load",
+                           self.bulk_var)
+        self._option_check(main_frame, 'resume', "Resumable import: commit in batches, continue after a failure",
+                           self.resume_var)
+        self._option_check(main_frame, 'incremental', "Incremental export: only rows changed since the last export",
+                           self.incremental_var)
+        self._option_check(main_frame, 'parts', "Export large tables using all CPU cores (sharded)",
+                           self.sharded_var)
+        
+        tk.Checkbutton(
+            main_frame,
+            text="Compress exports (.csv.gz)",
+            variable=self.compress_var,
+            font=("Arial", 10)
+        ).pack(anchor="w")
+        
+        # csv, binary (PostgreSQL COPY) or parquet
+        format_frame = tk.Frame(main_frame)
+        format_frame.pack(anchor="w")
+        tk.Label(format_frame, text="Export format:", font=("Arial", 10)).pack(side=tk.LEFT)
+        tk.OptionMenu(format_frame, self.format_var, *EXPORT_FORMATS).pack(side=tk.LEFT)
+        
         # ====== FIXED: REORGANIZED FRAME STRUCTURE ======
         # Create container for buttons and instructions
         content_frame = tk.Frame(main_frame)
@@ -538,6 +674,18 @@ class MainApp:
         )
         self.export_btn.pack(pady=10)
         
+        # All four tables from one consistent snapshot
+        self.export_all_btn = tk.Button(
+            button_frame, 
+            text="Export All Tables", 
+            font=("Arial", 12, "bold"), 
+            command=lambda: self.export_action(EXPORT_ALL),
+            width=20, 
+            bg="#4CAF50", 
+            fg="white"
+        )
+        self.export_all_btn.pack(pady=(0, 10))
+        
         # Add spacer below buttons
         spacer_bottom = tk.Frame(button_container, height=20)
         spacer_bottom.pack(fill=tk.X, expand=True)
@@ -553,7 +701,8 @@ class MainApp:
             "1. Exported CSV files are stored in the same folder as this program\n"
             "2. For Special Operations (Foodie/Authorized User):\n"
             "   - Import requires both auth_user.csv and foodie_contact.csv\n"
-            "   - Export will create both Authorized_User.csv and Foodie.csv"
+            "   - Export will create both Authorized_User.csv and Foodie.csv\n"
+            "3. Multi-table exports are read from one snapshot, so the files always match"
         )
         
         notes_label = tk.Label(
@@ -576,6 +725,11 @@ class MainApp:
         )
         instructions.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
         
+        # Progress of background imports
+        self.progress = ProgressPanel(self.root)
+        self.progress.pack(side=tk.BOTTOM, fill=tk.X, padx=20, pady=(0, 5))
+        self.task = None
+        
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = tk.Label(
@@ -587,364 +741,185 @@ class MainApp:
         )
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
     
+    def _option_check(self, parent, name, text, variable):
+        check = tk.Checkbutton(parent, text=text, variable=variable, command=self._options_changed,
+                               font=("Arial", 10))
+        check.pack(anchor="w")
+        self.option_checks[name] = (variable, check)
+    
+    def _options(self):
+        return {name: variable.get() for name, (variable, _) in self.option_checks.items()}
+    
+    def _options_changed(self):
+        options = self._options()
+        for name, (variable, check) in self.option_checks.items():
+            blocked = option_conflicts(dict(options, **{name: True}), [name])
+            check.config(state=tk.DISABLED if blocked and not variable.get() else tk.NORMAL)
+    
     def import_admin_user(self, file_path):
-        # Updated to match the actual CSV structure
-        expected_columns = ['id', 'admin_name', 'admin_photo', 'admin_desc', 'admin_email']
-        errors = []
-        rows = []
-        seen_names = set()
-        seen_emails = set()
-        
-        # Read and validate CSV
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-                if header != expected_columns:
-                    errors.append(f"Header mismatch. Expected: {expected_columns}, got: {header}")
-                    messagebox.showerror("Header Error", "\n".join(errors))
-                    return
-                
-                for i, row in enumerate(reader, start=2):
-                    if len(row) != len(expected_columns):
-                        errors.append(f"Row {i}: Incorrect number of columns")
-                        continue
-                    
-                    row_dict = dict(zip(expected_columns, row))
-                    name_val = row_dict['admin_name']
-                    email_val = row_dict['admin_email']
-                    desc_val = row_dict['admin_desc']
-                    photo_val = row_dict['admin_photo']
-                    
-                    # Check uniqueness
-                    if not name_val:
-                        errors.append(f"Row {i}: admin_name is missing")
-                    elif name_val in seen_names:
-                        errors.append(f"Row {i}: Duplicate admin_name {name_val}")
-                    else:
-                        seen_names.add(name_val)
-                    
-                    if not email_val:
-                        errors.append(f"Row {i}: admin_email is missing")
-                    elif email_val in seen_emails:
-                        errors.append(f"Row {i}: Duplicate admin_email {email_val}")
-                    else:
-                        seen_emails.add(email_val)
-                    
-                    # Handle empty description
-                    if not desc_val.strip():
-                        desc_val = None
-                    
-                    # Handle empty photo - provide default value
-                    if not photo_val.strip() or photo_val.lower() in ['none', 'null']:
-                        photo_val = 'default_admin.png'
-                    elif photo_val:
-                        ext = os.path.splitext(photo_val)[1].lower()
-                        if ext not in ['.png', '.jpg', '.jpeg']:
-                            errors.append(f"Row {i}: Invalid image extension '{ext}' for photo")
-                    
-                    rows.append((name_val, email_val, desc_val, photo_val))
-        except Exception as e:
-            errors.append(f"Error reading file: {str(e)}")
-        
-        if errors:
-            messagebox.showerror("Validation Error", "\n".join(errors))
-            return
+        workers = self._validation_workers()
+        delta = self.delta_var.get()
+        swap = self.swap_var.get()
+        bulk = self.bulk_var.get()
+        
+        def work(monitor, log):
+            valid, rows, errors = validate_admin_user(file_path, monitor, workers)
+            if not valid:
+                return errors
+            with self.db.connection() as conn:
+                if delta:
+                    upsert_admin_user(conn, rows, monitor=monitor)
+                elif swap:
+                    swap_admin_user(conn, rows, log, monitor)
+                else:
+                    load_admin_user(conn, rows, monitor, bulk)
+            return None
         
-        # Import to database
-        try:
-            with self.db.conn:
-                with self.db.conn.cursor() as cur:
-                    cur.execute("DELETE FROM adminusers_adminuser")
-                    cur.execute("ALTER SEQUENCE adminusers_adminuser_id_seq RESTART WITH 1")
-                    query = """
-                        INSERT INTO adminusers_adminuser 
-                        (admin_name, admin_email, admin_desc, admin_photo)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cur.executemany(query, rows)
-            messagebox.showinfo("Success", "Admin User data imported successfully!")
-            self.status_var.set("Admin User data imported")
-            self.root.destroy()
-        except Exception as e:
-            messagebox.showerror("Database Error", str(e))
-            self.status_var.set(f"Error: {str(e)}")
+        self._run_import(work, "Admin User")
     
     def import_restaurant(self, file_path):
-        expected_columns = [
-            "id", "restaurant_name", "list_date", "edit_date", "restaurant_photo_main", 
-            "restaurant_area", "restaurant_district", "restaurant_street", "restaurant_address", 
-            "fullday", "openhour_fullday", "closehour_fullday", 
-            "afternoon", "openhour_afternoon", "closehour_afternoon", 
-            "night", "openhour_night", "closehour_night", 
-             "nightsnack", "openhour_nightsnack", "closehour_nightsnack", 
-            "category_chinese", "category_western", "category_seafood", "category_veg", "category_japan", 
-            "menu", 
-            "menu_photo1", "menu_photo2", "menu_photo3", "menu_photo4", "menu_photo5", "menu_photo6", 
-            "two_dish_price", "three_dish_price", "drink_price", "soup_price", 
-            "payment_cash", "payment_octopus", "payment_alipayhk", "payment_wechatpay", "payment_payeme", 
-            "dine_in", "takeaway", "takeaway_self", "takeaway_keeta", "takeaway_foodpanda", 
-            "is_published", "discount_coupon"
-        ]
-        
-        # Define field lists
-        boolean_fields = [
-            'fullday', 'afternoon', 'night', 'nightsnack',
-            'category_chinese', 'category_western', 'category_seafood', 'category_veg', 'category_japan',
-            'payment_cash', 'payment_octopus', 'payment_alipayhk', 'payment_wechatpay', 'payment_payeme',
-            'dine_in', 'takeaway', 'takeaway_self', 'takeaway_keeta', 'takeaway_foodpanda',
-            'is_published', 'discount_coupon'
-        ]
-        price_fields = ['two_dish_price', 'three_dish_price', 'drink_price', 'soup_price']
-        photo_fields = [
-            'restaurant_photo_main',
-            'menu_photo1', 'menu_photo2', 'menu_photo3', 'menu_photo4', 'menu_photo5', 'menu_photo6'
-        ]
-        time_groups = [
-            ('fullday', 'openhour_fullday', 'closehour_fullday'),
-            ('afternoon', 'openhour_afternoon', 'closehour_afternoon'),
-            ('night', 'openhour_night', 'closehour_night'),
-            ('nightsnack', 'openhour_nightsnack', 'closehour_nightsnack')
-        ]
-        
-        errors = []
-        rows = []
-        seen_names = set()
-        
-        # Read and validate CSV
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-                if header != expected_columns:
-                    errors.append(f"Header mismatch. Expected: {expected_columns}, got: {header}")
-                    messagebox.showerror("Header Error", "\n".join(errors))
-                    return
-                
-                for i, row in enumerate(reader, start=2):
-                    if len(row) != len(expected_columns):
-                        errors.append(f"Row {i}: Incorrect number of columns")
-                        continue
-                    
-                    row_dict = dict(zip(expected_columns, row))
-                    
-                    # Normalize boolean fields
-                    for field in boolean_fields:
-                        value = row_dict[field].strip().upper()
-                        if value in ['TRUE', 'T', '1']:
-                            row_dict[field] = 'TRUE'
-                        elif value in ['FALSE', 'F', '0']:
-                            row_dict[field] = 'FALSE'
-                        # Update the row to have normalized value
-                        idx = expected_columns.index(field)
-                        row[idx] = row_dict[field]
-                    
-                    # Validate restaurant_name
-                    name_val = row_dict['restaurant_name']
-                    if not name_val.strip():
-                        errors.append(f"Row {i}: restaurant_name is missing")
-                    elif name_val in seen_names:
-                        errors.append(f"Row {i}: Duplicate restaurant_name {name_val}")
-                    else:
-                        seen_names.add(name_val)
-                    
-                    # Validate list_date
-                    if not row_dict['list_date'].strip():
-                        errors.append(f"Row {i}: list_date is missing")
-                    else:
-                        try:
-                            dt = datetime.fromisoformat(row_dict['list_date'])
-                        except ValueError:
-                            errors.append(f"Row {i}: list_date has invalid ISO format")
-                    
-                    # Validate edit_date
-                    if not row_dict['edit_date'].strip():
-                        errors.append(f"Row {i}: edit_date is missing")
-                    else:
-                        try:
-                            # Try ISO format first
-                            dt = datetime.strptime(row_dict['edit_date'], "%Y-%m-%d")
-                            # Convert to expected format
-                            row_dict['edit_date'] = dt.strftime("%d/%m/%Y")
-                            # Update the row
-                            idx = expected_columns.index('edit_date')
-                            row[idx] = row_dict['edit_date']
-                        except ValueError:
-                            try:
-                                datetime.strptime(row_dict['edit_date'], "%d/%m/%Y")
-                            except ValueError:
-                                errors.append(f"Row {i}: edit_date has invalid format (expected dd/mm/yyyy)")
-                    
-                    # Validate boolean fields
-                    for field in boolean_fields:
-                        if row_dict[field] not in ['TRUE', 'FALSE']:
-                            errors.append(f"Row {i}: {field} must be 'TRUE' or 'FALSE'")
-                    
-                    # Validate price fields
-                    for field in price_fields:
-                        if not row_dict[field].strip():
-                            errors.append(f"Row {i}: {field} is missing")
-                        else:
-                            try:
-                                float(row_dict[field])
-                            except ValueError:
-                                errors.append(f"Row {i}: {field} must be a number")
-                    
-                    # Validate photo fields
-                    for field in photo_fields:
-                        value = row_dict[field].strip()
-                        if value in ['', 'None', 'null']:
-                            continue
-                        elif value:
-                            ext = os.path.splitext(value)[1].lower()
-                            if ext not in ['.png', '.jpg', '.jpeg']:
-                                errors.append(f"Row {i}: {field} has invalid file extension")
-                    
-                    # Validate time groups
-                    for group in time_groups:
-                        flag_field, open_field, close_field = group
-                        if row_dict[flag_field] == 'TRUE':
-                            if not row_dict[open_field].strip() or not row_dict[close_field].strip():
-                                errors.append(f"Row {i}: {open_field} and {close_field} are required when {flag_field} is TRUE")
-                            else:
-                                try:
-                                    # Normalize time format to HH:MM
-                                    open_time = row_dict[open_field].strip()
-                                    close_time = row_dict[close_field].strip()
-                                    
-                                    # Add leading zero if needed
-                                    if len(open_time.split(':')[0]) == 1:
-                                        open_time = '0' + open_time
-                                    if len(close_time.split(':')[0]) == 1:
-                                        close_time = '0' + close_time
-                                    
-                                    # Update values
-                                    row_dict[open_field] = open_time
-                                    row_dict[close_field] = close_time
-                                    
-                                    # Update the row
-                                    open_idx = expected_columns.index(open_field)
-                                    close_idx = expected_columns.index(close_field)
-                                    row[open_idx] = open_time
-                                    row[close_idx] = close_time
-                                    
-                                    # Validate format
-                                    time.fromisoformat(open_time)
-                                    time.fromisoformat(close_time)
-                                except ValueError:
-                                    errors.append(f"Row {i}: {open_field} or {close_field} has invalid time format")
-                    
-                    # If no errors, add to rows
-                    if not any(e.startswith(f"Row {i}:") for e in errors):
-                        # Remove ID column
-                        row_without_id = row[1:]
-                        rows.append(row_without_id)
-        except Exception as e:
-            errors.append(f"Error reading file: {str(e)}")
-        
-        if errors:
-            messagebox.showerror("Validation Error", "\n".join(errors))
+        delta = self.delta_var.get()
+        swap = self.swap_var.get()
+        bulk = self.bulk_var.get()
+        if self.stream_var.get():
+            def work(monitor, log):
+                with self.db.connection() as conn:
+                    valid, row_count, errors = import_restaurant_streaming(conn, file_path, monitor, bulk=bulk)
+                return None if valid else errors
+            
+            self._run_import(work, "Restaurant")
             return
         
-        # Prepare data for import
-        converted_rows = []
-        insert_columns = expected_columns[1:]  # Skip ID column
-        for row in rows:
-            conv_row = {}
-            
-            # Convert list_date
-            try:
-                dt_list = datetime.fromisoformat(row[insert_columns.index('list_date')])
-                conv_row['list_date'] = dt_list.astimezone().replace(tzinfo=None)
-            except Exception:
-                conv_row['list_date'] = None
-            
-            # Convert edit_date
-            try:
-                edit_date_str = row[insert_columns.index('edit_date')]
-                conv_row['edit_date'] = datetime.strptime(edit_date_str, "%d/%m/%Y")
-            except Exception:
-                conv_row['edit_date'] = None
-            
-            # Convert menu - use original value even if empty
-            menu_val = row[insert_columns.index('menu')]
-            conv_row['menu'] = menu_val if menu_val != '' else ''
-            
-            # Convert boolean fields
-            for field in boolean_fields:
-                conv_row[field] = (row[insert_columns.index(field)] == 'TRUE')
-            
-            # Convert price fields
-            for field in price_fields:
-                conv_row[field] = float(row[insert_columns.index(field)])
-            
-            # Convert photo fields
-            for field in photo_fields:
-                value = row[insert_columns.index(field)].strip()
-                if value in ['', 'None', 'null']:
-                    conv_row[field] = 'None'
-                else:
-                    conv_row[field] = value
-            
-            # Convert time groups
-            for group in time_groups:
-                flag_field, open_field, close_field = group
-                if conv_row[flag_field]:
-                    open_time_str = row[insert_columns.index(open_field)]
-                    close_time_str = row[insert_columns.index(close_field)]
-                    
-                    try:
-                        conv_row[open_field] = time.fromisoformat(open_time_str)
-                        conv_row[close_field] = time.fromisoformat(close_time_str)
-                    except ValueError:
-                        conv_row[open_field] = None
-                        conv_row[close_field] = None
+        workers = self._validation_workers()
+        
+        def work(monitor, log):
+            valid, converted_rows, errors = validate_restaurant(file_path, monitor, workers)
+            if not valid:
+                return errors
+            with self.db.connection() as conn:
+                if delta:
+                    upsert_restaurant(conn, converted_rows, monitor=monitor)
+                elif swap:
+                    swap_restaurant(conn, converted_rows, log, monitor)
                 else:
-                    conv_row[open_field] = None
-                    conv_row[close_field] = None
-            
-            # Add other fields
-            for field in ['restaurant_name', 'restaurant_area', 'restaurant_district', 
-                          'restaurant_street', 'restaurant_address']:
-                conv_row[field] = row[insert_columns.index(field)]
-            
-            # Create tuple in correct order
-            row_tuple = tuple(conv_row[col] for col in insert_columns)
-            converted_rows.append(row_tuple)
+                    load_restaurant(conn, converted_rows, monitor, bulk)
+            return None
         
-        # Import to database
-        try:
-            with self.db.conn:
-                with self.db.conn.cursor() as cur:
-                    cur.execute("DELETE FROM listings_two_dish_rice")
-                    cur.execute("ALTER SEQUENCE listings_two_dish_rice_id_seq RESTART WITH 1")
-                    placeholders = ', '.join(['%s'] * len(insert_columns))
-                    query = f"""
-                        INSERT INTO listings_two_dish_rice ({', '.join(insert_columns)})
-                        VALUES ({placeholders})
-                    """
-                    cur.executemany(query, converted_rows)
-            messagebox.showinfo("Success", "Restaurant data imported successfully!")
-            self.status_var.set("Restaurant data imported")
-            self.root.destroy()
-        except Exception as e:
-            messagebox.showerror("Database Error", str(e))
-            self.status_var.set(f"Error: {str(e)}")
+        self._run_import(work, "Restaurant")
+    
+    def import_typed(self, option, file_path):
+        # .pgcopy / .parquet exports skip validation and keep their ids
+        table_name = EXPORT_TARGETS[option][0][0]
+        bulk = self.bulk_var.get()
+        
+        def work(monitor, log):
+            with self.db.connection() as conn:
+                load_typed(conn, [(table_name, file_path)], log, monitor, bulk)
+            return None
+        
+        self._run_import(work, "Admin User" if option == 1 else "Restaurant")
+    
+    def import_resumable(self, option, file_path):
+        # Importing the same file again continues from its checkpoint
+        importer = import_admin_resumable if option == 1 else import_restaurant_resumable
+        bulk = self.bulk_var.get()
+        
+        def work(monitor, log):
+            with self.db.connection() as conn:
+                valid, row_count, errors = importer(conn, file_path, log, monitor, bulk)
+            return None if valid else errors
+        
+        self._run_import(work, "Admin User" if option == 1 else "Restaurant")
+    
+    def _run_import(self, work, label):
+        # Validation and the DB write run on a worker thread; results come
+        # back through the task's queue, polled from the Tk mainloop
+        self._set_buttons_state(tk.DISABLED)
+        self.status_var.set(f"Importing {label} data...")
+        self.task = BackgroundTask(
+            self.root, work,
+            on_done=lambda errors: self._import_finished(label, errors),
+            on_error=lambda e: self._import_failed(e),
+            on_progress=self.progress.update_progress,
+            on_cancelled=self._import_cancelled,
+            metrics=RunMetrics('import', data_type=label)
+        )
+        self.progress.attach(self.task)
+        self.task.start()
+    
+    def _import_finished(self, label, errors):
+        self.progress.reset()
+        self._set_buttons_state(tk.NORMAL)
+        if errors:
+            messagebox.showerror("Validation Error", "\n".join(error_summary(errors, DIALOG_EXAMPLES)))
+            self.status_var.set("Validation failed")
+            return
+        message = f"{label} data imported successfully!"
+        for table, stats in self.task.monitor.cache_stats.items():
+            message += f"\n\nValue cache hits for {table}:\n{format_cache_stats(stats)}"
+        message += "\n\nTiming:\n" + "\n".join(format_metrics(self.task.metrics.record))
+        messagebox.showinfo("Success", message)
+        self.status_var.set(f"{label} data imported")
+        self.root.destroy()
+    
+    def _import_failed(self, e):
+        self.progress.reset()
+        self._set_buttons_state(tk.NORMAL)
+        if isinstance(e, HeaderError):
+            messagebox.showerror("Header Error", str(e))
+            self.status_var.set("Header mismatch")
+            return
+        messagebox.showerror("Database Error", str(e))
+        self.status_var.set(f"Error: {str(e)}")
+    
+    def _import_cancelled(self):
+        self.progress.reset("Cancelled")
+        self._set_buttons_state(tk.NORMAL)
+        self.status_var.set("Import cancelled, database unchanged")
+    
+    def _validation_workers(self):
+        return os.cpu_count() if self.parallel_var.get() else None
+    
+    def _set_buttons_state(self, state):
+        self.browse_btn.config(state=state)
+        self.export_btn.config(state=state)
+        self.export_all_btn.config(state=state)
+    
+    def _check_options(self, option, file_path=None):
+        # Shows an error and returns False for options the import would ignore
+        options = self._options()
+        errors = option_errors(options, file_path is not None and is_typed(file_path))
+        if options['stream'] and option != 2:
+            errors.append("Stream is only for Restaurant imports")
+        if errors:
+            messagebox.showerror("Import Options", "\n".join(errors))
+            self.status_var.set("Conflicting import options")
+        return not errors
     
     def import_action(self):
         option = self.option_var.get()
+        if not self._check_options(option):
+            return
         
         if option == 3:
-            gui2 = GUI2(self.root)
+            gui2 = GUI2(
+                self.root, workers=self._validation_workers(),
+                delta=self.delta_var.get(), swap=self.swap_var.get(), bulk=self.bulk_var.get(),
+                resume=self.resume_var.get()
+            )
             self.status_var.set("Special Import GUI opened")
             return
         
-        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-        if not file_path:
+        file_path = filedialog.askopenfilename(filetypes=IMPORT_FILETYPES)
+        if not file_path or not self._check_options(option, file_path):
             return
         
         try:
-            if option == 1:
+            if is_typed(file_path):
+                self.import_typed(option, file_path)
+            elif self.resume_var.get():
+                self.import_resumable(option, file_path)
+            elif option == 1:
                 self.import_admin_user(file_path)
             elif option == 2:
                 self.import_restaurant(file_path)
@@ -952,32 +927,34 @@ class MainApp:
             messagebox.showerror("Error", f"Import failed: {str(e)}")
             self.status_var.set(f"Error: {str(e)}")
     
-    def export_action(self):
-        option = self.option_var.get()
+    def export_action(self, option=None):
+        option = option or self.option_var.get()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
+        compression = 'gz' if self.compress_var.get() else None
+        fmt = self.format_var.get()
+        
         try:
+            with RunMetrics('export', data_type=option):
+                if self.sharded_var.get():
+                    # Stitched, so the user still gets one file per table
+                    filenames = export_option_sharded(self.db, option, timestamp, stitch=True,
+                                                      compression=compression, fmt=fmt)
+                else:
+                    filenames = export_option(self.db, option, timestamp, incremental=self.incremental_var.get(),
+                                              compression=compression, fmt=fmt)
             if option == 1:
-                filename = f"Adminuser_{timestamp}.csv"
-                self.db.export_csv('adminusers_adminuser', filename)
-                messagebox.showinfo("Success", f"Admin User data exported successfully!\nFile: {filename}")
-                self.status_var.set(f"Admin User data exported to {filename}")
+                messagebox.showinfo("Success", f"Admin User data exported successfully!\nFile: {filenames[0]}")
+                self.status_var.set(f"Admin User data exported to {filenames[0]}")
                 self.root.destroy()
                 
             elif option == 2:
-                filename = f"Restaurant_{timestamp}.csv"
-                self.db.export_csv('listings_two_dish_rice', filename)
-                messagebox.showinfo("Success", f"Restaurant data exported successfully!\nFile: {filename}")
-                self.status_var.set(f"Restaurant data exported to {filename}")
+                messagebox.showinfo("Success", f"Restaurant data exported successfully!\nFile: {filenames[0]}")
+                self.status_var.set(f"Restaurant data exported to {filenames[0]}")
                 self.root.destroy()
                 
             elif option == 3:
-                auth_filename = f"Authorized_User_{timestamp}.csv"
-                self.db.export_csv('auth_user', auth_filename)
-                
-                foodie_filename = f"Foodie_{timestamp}.csv"
-                self.db.export_csv('foodie_contact', foodie_filename)
-                
+                auth_filename, foodie_filename = filenames
                 messagebox.showinfo(
                     "Success", 
                     f"Both tables exported successfully!\n"
@@ -987,6 +964,14 @@ class MainApp:
                 self.status_var.set("Auth User and Foodie Contact data exported")
                 self.root.destroy()
                 
+            elif option == EXPORT_ALL:
+                messagebox.showinfo(
+                    "Success",
+                    "All tables exported successfully!\n" + "\n".join(filenames)
+                )
+                self.status_var.set("All tables exported")
+                self.root.destroy()
+                
         except Exception as e:
             messagebox.showerror("Error", f"Export failed: {str(e)}")
             self.status_var.set(f"Error: {str(e)}")
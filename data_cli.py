@@ -0,0 +1,378 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from time import perf_counter
+
+from data_delta import upsert_admin_user, upsert_restaurant, upsert_users
+from data_swap import swap_admin_user, swap_restaurant, swap_users
+from data_shard import export_option_sharded
+from data_formats import EXPORT_FORMATS
+from data_resume import import_admin_resumable, import_restaurant_resumable, import_users_resumable
+from data_errors import ERROR_BUDGET, ErrorCollector, error_report_path
+from data_metrics import METRICS_FILE, RunMetrics, read_metrics
+from data_core import (
+    DatabaseManager, HeaderError, ImportMonitor, export_option, EXPORT_ALL, EXPORT_TARGETS,
+    CSV_ONLY_OPTIONS, is_typed, load_typed, option_conflicts,
+    validate_admin_user, load_admin_user, validate_restaurant, load_restaurant,
+    import_restaurant_streaming,
+    validate_auth_user, validate_foodie_contact, load_users, import_users_staged
+)
+
+# Headless entry point: the same validation and load logic as the Tk app,
+# reporting progress to stdout as one JSON object per line.
+
+EXIT_OK = 0
+EXIT_VALIDATION = 1
+EXIT_DATABASE = 3
+
+# Data type names map onto the radio button options of MainApp
+OPTIONS = {'admin': 1, 'restaurant': 2, 'users': 3}
+# 'all' writes every table from one snapshot, export only
+EXPORT_OPTIONS = dict(OPTIONS, all=EXPORT_ALL)
+
+def emit(event, **fields):
+    record = {'event': event, 'time': datetime.now().isoformat(timespec='seconds')}
+    record.update(fields)
+    print(json.dumps(record, ensure_ascii=False, default=str), flush=True)
+
+def log_to_stdout(message, tag=None):
+    emit('log', level=tag or 'info', message=message)
+
+def emit_progress(stage, done, total, rate):
+    emit('progress', stage=stage, rows=done, total=total, rows_per_sec=round(rate, 1))
+
+# Rows between progress records; large enough to keep stdout quiet
+PROGRESS_EVERY = 10000
+
+def _validation_failed(file_path, errors):
+    # An ErrorCollector only holds the first errors of each category; its
+    # counts and the full report go into one 'error_summary' record
+    for error in errors:
+        emit('validation_error', file=file_path, message=error)
+    if isinstance(errors, ErrorCollector):
+        emit('error_summary', file=file_path, counts=errors.counts, stopped_early=errors.exhausted,
+             report=errors.report_path if len(errors) else None)
+    emit('failed', stage='validate', errors=len(errors))
+    return EXIT_VALIDATION
+
+def emit_cache_stats(monitor):
+    # Hit rates of the per-import value caches, one record per table
+    for table, stats in monitor.cache_stats.items():
+        emit('value_cache', table=table, columns=stats)
+    monitor.cache_stats.clear()
+
+def _collector(file_path, max_errors):
+    return ErrorCollector(error_report_path(file_path), budget=max_errors)
+
+def _validate(validator, file_path, *args, monitor=None, workers=None, max_errors=ERROR_BUDGET):
+    start = perf_counter()
+    valid, data, errors = validator(file_path, *args, monitor=monitor, workers=workers,
+                                    errors=_collector(file_path, max_errors))
+    emit('validated', file=file_path, valid=valid,
+         rows=len(data) if data else 0, seconds=round(perf_counter() - start, 3))
+    emit_cache_stats(monitor)
+    return valid, data, errors
+
+def run_import(db, data_type, files, staged=False, stream=False, workers=None,
+               delta=False, delete_missing=False, swap=False, bulk=False, resume=False,
+               max_errors=ERROR_BUDGET):
+    # Returns (exit code, error message or None)
+    monitor = ImportMonitor(callback=emit_progress, every=PROGRESS_EVERY)
+    try:
+        with db.connection() as conn:
+            code = _import_files(conn, monitor, data_type, files, staged, stream, workers,
+                                 delta, delete_missing, swap, bulk, resume, max_errors)
+        return code, None
+    except HeaderError as e:
+        emit('validation_error', message=str(e))
+        emit('failed', stage='header', errors=1)
+        return EXIT_VALIDATION, str(e)
+    except Exception as e:
+        emit('failed', stage='load', message=str(e))
+        return EXIT_DATABASE, str(e)
+    finally:
+        # A stage that raised never reached finish(); record it as failed
+        monitor.abort()
+
+def _import_files(conn, monitor, data_type, files, staged, stream, workers,
+                  delta, delete_missing, swap, bulk, resume, max_errors):
+    if is_typed(files[0]):
+        return _run_typed_import(conn, data_type, files, monitor, bulk)
+    if delta:
+        return _run_delta_import(conn, data_type, files, workers, delete_missing, monitor, max_errors)
+    if resume:
+        return _run_resumable_import(conn, data_type, files, monitor, bulk, max_errors)
+    if data_type == 'restaurant' and stream:
+        file_path = files[0]
+        start = perf_counter()
+        valid, count, errors = import_restaurant_streaming(conn, file_path, monitor, bulk=bulk,
+                                                           errors=_collector(file_path, max_errors))
+        emit_cache_stats(monitor)
+        if not valid:
+            return _validation_failed(file_path, errors)
+        emit('loaded', table='listings_two_dish_rice', rows=count,
+             seconds=round(perf_counter() - start, 3))
+    elif data_type == 'users' and staged:
+        auth_file, foodie_file = files
+        start = perf_counter()
+        valid, counts, errors = import_users_staged(conn, auth_file, foodie_file, log_to_stdout, monitor,
+                                                   bulk=bulk, errors=_collector(auth_file, max_errors))
+        if not valid:
+            return _validation_failed(f"{auth_file},{foodie_file}", errors)
+        emit('loaded', table='auth_user', rows=counts[0])
+        emit('loaded', table='foodie_contact', rows=counts[1],
+             seconds=round(perf_counter() - start, 3))
+    elif data_type == 'users':
+        auth_file, foodie_file = files
+        valid, auth_data, errors = _validate(validate_auth_user, auth_file, monitor=monitor, workers=workers,
+                                             max_errors=max_errors)
+        if not valid:
+            return _validation_failed(auth_file, errors)
+        valid, foodie_data, errors = _validate(validate_foodie_contact, foodie_file, auth_data, monitor=monitor,
+                                               workers=workers, max_errors=max_errors)
+        if not valid:
+            return _validation_failed(foodie_file, errors)
+        start = perf_counter()
+        if swap:
+            auth_count, foodie_count = swap_users(conn, auth_data, foodie_data,
+                                                  log=log_to_stdout, monitor=monitor)
+        else:
+            auth_count, foodie_count = load_users(conn, auth_data, foodie_data,
+                                                  log=log_to_stdout, monitor=monitor, bulk=bulk)
+        emit('loaded', table='auth_user', rows=auth_count)
+        emit('loaded', table='foodie_contact', rows=foodie_count,
+             seconds=round(perf_counter() - start, 3))
+    else:
+        file_path = files[0]
+        if data_type == 'admin':
+            validator, loader, table = validate_admin_user, load_admin_user, 'adminusers_adminuser'
+        else:
+            validator, loader, table = validate_restaurant, load_restaurant, 'listings_two_dish_rice'
+        valid, rows, errors = _validate(validator, file_path, monitor=monitor, workers=workers,
+                                        max_errors=max_errors)
+        if not valid:
+            return _validation_failed(file_path, errors)
+        start = perf_counter()
+        if swap:
+            loader = swap_admin_user if data_type == 'admin' else swap_restaurant
+            count = loader(conn, rows, log_to_stdout, monitor)
+        else:
+            count = loader(conn, rows, monitor, bulk)
+        emit('loaded', table=table, rows=count, seconds=round(perf_counter() - start, 3))
+    return EXIT_OK
+
+def _run_typed_import(conn, data_type, files, monitor, bulk):
+    tables = [table for table, _ in EXPORT_TARGETS[OPTIONS[data_type]]]
+    start = perf_counter()
+    counts = load_typed(conn, list(zip(tables, files)), log_to_stdout, monitor, bulk)
+    for table, count in zip(tables, counts):
+        emit('loaded', table=table, rows=count, seconds=round(perf_counter() - start, 3))
+    return EXIT_OK
+
+def _run_resumable_import(conn, data_type, files, monitor, bulk, max_errors=ERROR_BUDGET):
+    # Rerunning the same command resumes from the checkpoint files
+    start = perf_counter()
+    if data_type == 'users':
+        valid, counts, errors = import_users_resumable(conn, files[0], files[1], log_to_stdout, monitor, bulk,
+                                                       errors=_collector(files[0], max_errors))
+        if not valid:
+            return _validation_failed(','.join(files), errors)
+        emit('loaded', table='auth_user', rows=counts[0])
+        emit('loaded', table='foodie_contact', rows=counts[1], seconds=round(perf_counter() - start, 3))
+        return EXIT_OK
+    if data_type == 'admin':
+        importer, table = import_admin_resumable, 'adminusers_adminuser'
+    else:
+        importer, table = import_restaurant_resumable, 'listings_two_dish_rice'
+    valid, count, errors = importer(conn, files[0], log_to_stdout, monitor, bulk,
+                                    errors=_collector(files[0], max_errors))
+    if not valid:
+        return _validation_failed(files[0], errors)
+    emit('loaded', table=table, rows=count, seconds=round(perf_counter() - start, 3))
+    return EXIT_OK
+
+def _run_delta_import(conn, data_type, files, workers, delete_missing, monitor, max_errors=ERROR_BUDGET):
+    if data_type == 'users':
+        auth_file, foodie_file = files
+        valid, auth_data, errors = _validate(validate_auth_user, auth_file, monitor=monitor, workers=workers,
+                                             max_errors=max_errors)
+        if not valid:
+            return _validation_failed(auth_file, errors)
+        valid, foodie_data, errors = _validate(validate_foodie_contact, foodie_file, auth_data,
+                                               monitor=monitor, workers=workers, max_errors=max_errors)
+        if not valid:
+            return _validation_failed(foodie_file, errors)
+        start = perf_counter()
+        auth_stats, foodie_stats = upsert_users(conn, auth_data, foodie_data, delete_missing,
+                                                log=log_to_stdout, monitor=monitor)
+        emit('delta', table='auth_user', **auth_stats)
+        emit('delta', table='foodie_contact', seconds=round(perf_counter() - start, 3), **foodie_stats)
+        return EXIT_OK
+    
+    file_path = files[0]
+    if data_type == 'admin':
+        validator, upsert, table = validate_admin_user, upsert_admin_user, 'adminusers_adminuser'
+    else:
+        validator, upsert, table = validate_restaurant, upsert_restaurant, 'listings_two_dish_rice'
+    valid, rows, errors = _validate(validator, file_path, monitor=monitor, workers=workers,
+                                    max_errors=max_errors)
+    if not valid:
+        return _validation_failed(file_path, errors)
+    start = perf_counter()
+    stats = upsert(conn, rows, delete_missing, monitor)
+    emit('delta', table=table, seconds=round(perf_counter() - start, 3), **stats)
+    return EXIT_OK
+
+def run_export(db, data_type, directory, incremental=False, columns=None, filters=None,
+               parts=None, stitch=False, workers=None, compression=None, fmt='csv'):
+    # Returns (exit code, error message or None)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    start = perf_counter()
+    try:
+        if parts:
+            filenames = export_option_sharded(db, EXPORT_OPTIONS[data_type], timestamp, directory,
+                                              parts, workers, stitch, compression, fmt)
+        else:
+            filenames = export_option(db, EXPORT_OPTIONS[data_type], timestamp, directory,
+                                      incremental, columns, filters, compression, fmt)
+    except Exception as e:
+        emit('failed', stage='export', message=str(e))
+        return EXIT_DATABASE, str(e)
+    emit('exported', files=filenames, stats=db.last_export_stats,
+         seconds=round(perf_counter() - start, 3))
+    return EXIT_OK, None
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Two-Dish-Rice data manager (headless)",
+        epilog=f"Exit codes: {EXIT_OK} success, {EXIT_VALIDATION} validation failed, "
+               f"{EXIT_DATABASE} database or file error.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    import_parser = commands.add_parser('import', help="Validate a CSV file and load it")
+    import_parser.add_argument('data_type', choices=sorted(OPTIONS))
+    import_parser.add_argument('files', nargs='+',
+                               help="CSV file, or auth_user.csv and foodie_contact.csv for 'users'; "
+                                    ".pgcopy and .parquet exports are loaded without validation")
+    import_parser.add_argument('--staged', action='store_true',
+                               help="'users' only: validate and join in PostgreSQL staging tables")
+    import_parser.add_argument('--stream', action='store_true',
+                               help="'restaurant' only: validate and load in pipelined chunks")
+    import_parser.add_argument('--workers', type=int, default=None,
+                               help="Validate in this many processes (default: one)")
+    mode = import_parser.add_mutually_exclusive_group()
+    mode.add_argument('--delta', action='store_true',
+                      help="Only insert new and update changed rows, keeping existing ids")
+    mode.add_argument('--swap', action='store_true',
+                      help="Load into a shadow table and swap it in with a short lock")
+    mode.add_argument('--resume', action='store_true',
+                      help="Commit in batches with a checkpoint file; rerun to continue after a failure")
+    import_parser.add_argument('--bulk', action='store_true',
+                               help="Drop secondary indexes during the load and rebuild them at the end")
+    import_parser.add_argument('--delete-missing', action='store_true',
+                               help="With --delta: also delete rows that are not in the file")
+    import_parser.add_argument('--max-errors', type=int, default=ERROR_BUDGET,
+                               help=f"Stop validating after this many errors, 0 for no limit (default: {ERROR_BUDGET}); "
+                                    "every error is written to <file>.errors.csv")
+    
+    export_parser = commands.add_parser('export', help="Export tables to timestamped CSV files")
+    export_parser.add_argument('data_type', choices=sorted(EXPORT_OPTIONS))
+    export_parser.add_argument('--dir', default=None, help="Output directory (default: current)")
+    export_parser.add_argument('--incremental', action='store_true',
+                               help="Only rows changed since the last incremental export")
+    export_parser.add_argument('--columns', type=lambda v: [c.strip() for c in v.split(',') if c.strip()],
+                               default=None, help="With --incremental: comma-separated columns to export")
+    export_parser.add_argument('--where', action='append', default=[], metavar='COLUMN=VALUE',
+                               help="With --incremental: only rows where COLUMN equals VALUE (repeatable)")
+    export_parser.add_argument('--parts', type=int, default=None,
+                               help="Split each table into this many id ranges exported in parallel")
+    export_parser.add_argument('--workers', type=int, default=None,
+                               help="With --parts: processes to use (default: all cores)")
+    export_parser.add_argument('--stitch', action='store_true',
+                               help="With --parts: join the parts into one CSV with a single header")
+    export_parser.add_argument('--compress', choices=['gz', 'zst'], default=None,
+                               help="Write .csv.gz or .csv.zst files (zst needs the zstandard package)")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv',
+                               help="csv, binary (PostgreSQL COPY, .pgcopy) or parquet (needs pyarrow)")
+    
+    for command_parser in (import_parser, export_parser):
+        command_parser.add_argument('--metrics-file', default=METRICS_FILE,
+                                    help=f"Append this run's phase timings here (default: {METRICS_FILE})")
+        command_parser.add_argument('--slow-sql', type=float, default=None, metavar='SECONDS',
+                                    help="Also record SQL statements slower than this, with their row counts")
+    
+    metrics_parser = commands.add_parser('metrics', help="Print recorded run metrics as JSON lines")
+    metrics_parser.add_argument('--file', default=METRICS_FILE, help=f"Metrics file (default: {METRICS_FILE})")
+    metrics_parser.add_argument('--last', type=int, default=None, help="Only the newest N runs")
+    return parser
+
+def parse_filters(parser, items):
+    filters = {}
+    for item in items:
+        column, sep, value = item.partition('=')
+        if not sep or not column.strip():
+            parser.error(f"--where expects COLUMN=VALUE, got '{item}'")
+        filters[column.strip()] = value
+    return filters
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'metrics':
+        for record in read_metrics(args.file, args.last):
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+        return EXIT_OK
+    if args.command == 'import':
+        expected = 2 if args.data_type == 'users' else 1
+        if len(args.files) != expected:
+            parser.error(f"'{args.data_type}' import takes {expected} file(s)")
+        typed = [is_typed(f) for f in args.files]
+        if any(typed) and not all(typed):
+            parser.error("CSV and binary/Parquet files cannot be mixed")
+        if any(typed) and any(getattr(args, name) for name in CSV_ONLY_OPTIONS):
+            parser.error(f"{', '.join('--' + name for name in CSV_ONLY_OPTIONS)} need CSV files")
+        if args.staged and args.data_type != 'users':
+            parser.error("--staged is only for 'users' imports")
+        if args.stream and args.data_type != 'restaurant':
+            parser.error("--stream is only for 'restaurant' imports")
+        if args.delete_missing and not args.delta:
+            parser.error("--delete-missing needs --delta")
+    elif (args.columns or args.where) and not args.incremental:
+        parser.error("--columns and --where need --incremental")
+    elif (args.stitch or args.workers) and not args.parts:
+        parser.error("--stitch and --workers need --parts")
+    elif args.compress and args.format == 'parquet':
+        parser.error("Parquet files are compressed internally, --compress does not apply")
+    for first, second in option_conflicts(vars(args)):
+        parser.error(f"--{first} cannot be combined with --{second}")
+    
+    emit('start', command=args.command, data_type=args.data_type)
+    start = perf_counter()
+    try:
+        db = DatabaseManager()
+    except Exception as e:
+        emit('failed', stage='connect', message=str(e))
+        return EXIT_DATABASE
+    metrics = RunMetrics(args.command, args.metrics_file, args.slow_sql,
+                         data_type=args.data_type, files=getattr(args, 'files', None))
+    try:
+        with metrics:
+            if args.command == 'import':
+                code, error = run_import(db, args.data_type, args.files, args.staged, args.stream,
+                                         args.workers, args.delta, args.delete_missing, args.swap,
+                                         args.bulk, args.resume, args.max_errors)
+            else:
+                code, error = run_export(db, args.data_type, args.dir, args.incremental,
+                                         args.columns, parse_filters(parser, args.where),
+                                         args.parts, args.stitch, args.workers, args.compress, args.format)
+            # Both catch their errors, so the run itself never raises
+            metrics.set_outcome(code, error)
+    finally:
+        db.close()
+    emit('metrics', **metrics.record)
+    emit('finished', exit_code=code, seconds=round(perf_counter() - start, 3))
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
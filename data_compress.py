@@ -0,0 +1,119 @@
+import gzip
+import io
+import os
+import queue
+import threading
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Transparent .csv.gz / .csv.zst support. open_csv() behaves like open() for
+# plain files; compressed files are streamed, and when writing, compression
+# runs on its own thread so it overlaps with fetching rows from the DB.
+
+COMPRESSION_SUFFIXES = {'.gz': 'gz', '.zst': 'zst'}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Uncompressed bytes handed to the compression thread per chunk
+WRITE_BUFFER_BYTES = 1024 * 1024
+COMPRESS_QUEUE_DEPTH = 4
+
+def compression_of(path):
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+def is_compressed(path):
+    return compression_of(path) is not None
+
+def split_suffix(path):
+    # ('Restaurant_x', '.csv.gz') for compressed names, like splitext otherwise
+    root, ext = os.path.splitext(path)
+    if ext.lower() in COMPRESSION_SUFFIXES:
+        root, inner = os.path.splitext(root)
+        ext = inner + ext
+    return root, ext
+
+def csv_suffix(compression=None):
+    return f".csv.{compression}" if compression else ".csv"
+
+def _require_zstandard():
+    if zstandard is None:
+        raise Exception("Reading or writing .zst files needs the 'zstandard' package (pip install zstandard)")
+
+class _CompressWriter(io.RawIOBase):
+    """Raw stream that hands written bytes to a compressing thread"""
+    def __init__(self, raw, make_stream):
+        self._raw = raw
+        self._chunks = queue.Queue(maxsize=COMPRESS_QUEUE_DEPTH)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(make_stream,), daemon=True)
+        self._thread.start()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._error:
+            raise self._error
+        data = bytes(data)
+        self._chunks.put(data)
+        return len(data)
+
+    def _run(self, make_stream):
+        try:
+            stream = make_stream(self._raw)
+            while True:
+                data = self._chunks.get()
+                if data is None:
+                    break
+                stream.write(data)
+            # Writes the gzip trailer / zstd frame end
+            stream.close()
+        except Exception as e:
+            self._error = e
+            # Keep consuming so the writer never blocks on a full queue
+            while self._chunks.get() is not None:
+                pass
+
+    def close(self):
+        if self.closed:
+            return
+        self._chunks.put(None)
+        self._thread.join()
+        self._raw.close()
+        super().close()
+        if self._error:
+            raise self._error
+
+def _gzip_writer(raw):
+    # mtime=0 keeps the output identical for identical data
+    return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0)
+
+def _zstd_writer(raw):
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+
+def open_csv(path, mode='r', encoding=None, newline=''):
+    # mode is 'r', 'w', 'rb' or 'wb'; text modes take encoding/newline
+    # exactly like open()
+    kind = compression_of(path)
+    binary = 'b' in mode
+    if kind is None:
+        if binary:
+            return open(path, mode)
+        return open(path, mode, encoding=encoding, newline=newline)
+    if kind == 'zst':
+        _require_zstandard()
+
+    if mode.startswith('r'):
+        if kind == 'gz':
+            stream = gzip.open(path, 'rb')
+        else:
+            reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            stream = io.BufferedReader(reader)
+    else:
+        make_stream = _gzip_writer if kind == 'gz' else _zstd_writer
+        stream = io.BufferedWriter(_CompressWriter(open(path, 'wb'), make_stream), WRITE_BUFFER_BYTES)
+    if binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
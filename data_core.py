@@ -0,0 +1,1322 @@
+import csv
+import psycopg2
+from psycopg2.extras import execute_values
+import io
+import json
+import locale
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+from time import perf_counter
+from data_schema import (
+    HeaderError, ADMIN_USER, RESTAURANT, AUTH_USER, FOODIE_CONTACT, SCHEMAS, compile_schema
+)
+from data_parallel import validate_parallel
+from data_pool import get_pool, close_pool
+from data_compress import open_csv, is_compressed
+from data_errors import ErrorBudgetExceeded, ErrorCollector, RowError, error_report_path
+from data_metrics import span, start_span
+from data_formats import (
+    format_of, format_suffix, write_binary, write_parquet, copy_binary, iter_parquet, parquet_row_count
+)
+
+# Rows fetched per round trip when streaming exports from a server-side cursor
+EXPORT_ITERSIZE = 2000
+
+class CsvCopyStream:
+    """File-like reader that re-encodes csv rows for COPY ... FROM STDIN"""
+    def __init__(self, reader, drop_index=None):
+        self.reader = reader
+        self.drop_index = drop_index
+        self.row_count = 0
+        self._buffer = io.StringIO()
+        # Quote every value so empty strings stay '' instead of becoming NULL,
+        # matching what the per-row INSERT path stores
+        self._writer = csv.writer(self._buffer, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 1 << 16
+        while self._buffer.tell() < size:
+            row = next(self.reader, None)
+            if row is None:
+                break
+            if self.drop_index is not None:
+                row.pop(self.drop_index)
+            self._writer.writerow(row)
+            self.row_count += 1
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffer.write(data[size:])
+        return data[:size]
+
+# Exports stream through a named (server-side) cursor so only `itersize`
+# rows are held in client memory at any time
+def write_export(conn, table_name, file_path, itersize=EXPORT_ITERSIZE, query=None, params=None):
+    # The file name picks the format: .csv, .pgcopy or .parquet
+    with span(f"export {table_name}") as timing:
+        timing.rows = _write_export(conn, table_name, file_path, itersize, query, params)
+        timing.bytes = os.path.getsize(file_path)
+    return timing.rows
+
+def _write_export(conn, table_name, file_path, itersize, query, params):
+    fmt = format_of(file_path)
+    if fmt == 'binary':
+        return write_binary(conn, table_name, file_path, query, params)
+    if fmt == 'parquet':
+        return write_parquet(conn, table_name, file_path, itersize, query, params)
+    cur = conn.cursor(name=f"export_{table_name}")
+    cur.itersize = itersize
+    try:
+        cur.execute(query or f"SELECT * FROM {table_name}", params)
+        row_count = 0
+        with open_csv(file_path, 'w') as f:
+            writer = csv.writer(f)
+            # Named cursors only expose description after the first fetch
+            rows = cur.fetchmany(itersize)
+            # Write headers
+            writer.writerow([desc[0] for desc in cur.description])
+            while rows:
+                writer.writerows(rows)
+                row_count += len(rows)
+                rows = cur.fetchmany(itersize)
+        return row_count
+    finally:
+        cur.close()
+
+def begin_snapshot(conn):
+    # Start a read-only transaction and return its exported snapshot id;
+    # the snapshot can only be joined while this transaction stays open
+    cur = conn.cursor()
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    cur.execute("SELECT pg_export_snapshot()")
+    snapshot = cur.fetchone()[0]
+    cur.close()
+    return snapshot
+
+def join_snapshot(conn, snapshot):
+    cur = conn.cursor()
+    cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+    cur.close()
+
+class DatabaseManager:
+    def __init__(self, pool=None):
+        # Opening the pool connects once up front, so bad settings are
+        # reported at startup; each operation then borrows a connection
+        self.shared_pool = pool is None
+        self.pool = pool or get_pool()
+        self.last_import_stats = None
+        self.last_export_stats = None
+    
+    def connection(self):
+        return self.pool.connection()
+    
+    def import_csv(self, table_name, file_path, mode="insert", bulk=False, resumable=False):
+        # mode="insert" sends one INSERT per row, mode="copy" streams the
+        # whole file through COPY ... FROM STDIN and falls back to per-row
+        # inserts to locate the offending line if COPY rejects the batch.
+        # bulk=True drops secondary indexes for the load (see defer_indexes).
+        # resumable=True commits batches into a staging table and can pick
+        # up after a failure from its checkpoint file (see data_resume)
+        if mode not in ("insert", "copy"):
+            raise ValueError(f"Unknown import mode: {mode}")
+        start = perf_counter()
+        if is_typed(file_path):
+            with self.connection() as conn:
+                row_count = load_typed(conn, [(table_name, file_path)], bulk=bulk)[0]
+            self.last_import_stats = self._make_stats(table_name, format_of(file_path), row_count,
+                                                      perf_counter() - start)
+            return True
+        if resumable:
+            # Imported here because data_resume builds on this module
+            from data_resume import import_csv_resumable
+            with self.connection() as conn:
+                row_count = import_csv_resumable(conn, table_name, file_path, bulk=bulk)
+            self.last_import_stats = self._make_stats(table_name, "resumable", row_count,
+                                                      perf_counter() - start)
+            return True
+        with self.connection() as conn:
+            cur = conn.cursor()
+            try:
+                with open_csv(file_path, 'r') as f:
+                    reader = csv.reader(f)
+                    headers = next(reader)
+                    
+                    # Remove 'id' column if present
+                    id_index = None
+                    if 'id' in headers:
+                        id_index = headers.index('id')
+                        headers.pop(id_index)
+                    
+                    # Clear table before import
+                    dropped = defer_indexes(cur, [table_name]) if bulk else []
+                    self._reset_table(cur, table_name)
+                    
+                    if mode == "copy":
+                        try:
+                            with span(f"copy {table_name}") as timing:
+                                row_count = timing.rows = self._copy_rows(cur, table_name, headers, reader, id_index)
+                        except psycopg2.Error:
+                            # COPY aborts the whole batch without telling us which
+                            # record was bad, so replay row by row to find it
+                            conn.rollback()
+                            mode = "copy-fallback"
+                            # Reopen rather than seek, compressed streams
+                            # cannot rewind
+                            with open_csv(file_path, 'r') as retry:
+                                reader = csv.reader(retry)
+                                next(reader)
+                                # The rollback restored the indexes, drop them again
+                                dropped = defer_indexes(cur, [table_name]) if bulk else []
+                                self._reset_table(cur, table_name)
+                                with span(f"insert {table_name}") as timing:
+                                    row_count = timing.rows = self._insert_rows(cur, table_name, headers,
+                                                                                reader, id_index)
+                    else:
+                        with span(f"insert {table_name}") as timing:
+                            row_count = timing.rows = self._insert_rows(cur, table_name, headers, reader, id_index)
+                    rebuild_indexes(cur, dropped)
+                conn.commit()
+                self.last_import_stats = self._make_stats(table_name, mode, row_count, perf_counter() - start)
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                cur.close()
+        return True
+    
+    def _reset_table(self, cur, table_name):
+        with span(f"reset {table_name}"):
+            cur.execute(f"DELETE FROM {table_name}")
+            # Reset sequence
+            cur.execute(f"ALTER SEQUENCE {table_name}_id_seq RESTART WITH 1")
+    
+    def _insert_rows(self, cur, table_name, headers, reader, id_index):
+        columns = ', '.join(headers)
+        placeholders = ', '.join(['%s'] * len(headers))
+        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        row_count = 0
+        for i, row in enumerate(reader, start=2):
+            # Remove id value if exists
+            if id_index is not None:
+                row.pop(id_index)
+            try:
+                cur.execute(query, row)
+            except psycopg2.Error as e:
+                raise Exception(f"Row {i}: {e.pgerror or e}") from e
+            row_count += 1
+        return row_count
+    
+    def _copy_rows(self, cur, table_name, headers, reader, id_index):
+        stream = CsvCopyStream(reader, id_index)
+        cur.copy_expert(
+            f"COPY {table_name} ({', '.join(headers)}) FROM STDIN WITH (FORMAT csv)",
+            stream
+        )
+        return stream.row_count
+    
+    def _make_stats(self, table_name, mode, row_count, seconds):
+        return {
+            'table': table_name,
+            'mode': mode,
+            'rows': row_count,
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(row_count / seconds, 1) if seconds > 0 else 0.0,
+        }
+    
+    def export_csv(self, table_name, file_path, itersize=EXPORT_ITERSIZE):
+        start = perf_counter()
+        with self.connection() as conn:
+            row_count = write_export(conn, table_name, file_path, itersize)
+        self.last_export_stats = self._make_stats(table_name, "cursor", row_count, perf_counter() - start)
+        return True
+    
+    def export_snapshot(self, targets, itersize=EXPORT_ITERSIZE):
+        # Export [(table_name, file_path)] in parallel, one pooled connection
+        # per table, all reading the same exported snapshot so the files
+        # agree with each other even while the site keeps writing
+        start = perf_counter()
+        with self.connection() as conn:
+            # Stays open until every table is written
+            snapshot = begin_snapshot(conn)
+            if self.pool.maxconn < 2:
+                # No connection to spare for workers (pool_max = 1); the
+                # snapshot's own transaction writes the tables one by one
+                table_stats = [self._export_on(conn, table_name, file_path, itersize)
+                               for table_name, file_path in targets]
+            else:
+                workers = min(len(targets), self.pool.maxconn - 1)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self._export_in_snapshot, snapshot, table_name, file_path,
+                                               itersize)
+                               for table_name, file_path in targets]
+                    table_stats = [future.result() for future in futures]
+            conn.rollback()
+        stats = self._make_stats(', '.join(t for t, _ in targets), "snapshot",
+                                 sum(s['rows'] for s in table_stats), perf_counter() - start)
+        stats['tables'] = table_stats
+        self.last_export_stats = stats
+        return True
+    
+    def export_incremental(self, table_name, file_path, watermark_path=None,
+                           columns=None, filters=None, itersize=EXPORT_ITERSIZE):
+        # Export only rows changed since the last run for the same table and
+        # filters, then move that run's high-water mark forward. columns
+        # projects the output, filters ({column: value}) keeps matching rows.
+        start = perf_counter()
+        schema = SCHEMAS[table_name]
+        if not schema.watermark:
+            raise ValueError(f"{table_name} has no change-tracking column for incremental export")
+        watermark_path = watermark_path or WATERMARK_FILE
+        select_list, where, filter_params = _export_query_parts(schema, columns, filters)
+        # Each filter keeps its own mark, e.g. listings_two_dish_rice?is_published=true
+        key = table_name
+        if filters:
+            key += '?' + '&'.join(f"{c}={v}" for c, v in sorted(filters.items()))
+        marks = load_watermarks(watermark_path)
+        saved = marks.get(key)
+        if isinstance(saved, str):
+            # Marks written before the id high-water mark was kept
+            saved = {'mark': saved, 'id': None}
+        since = saved['mark'] if saved else None
+        since_id = saved['id'] if saved else None
+        
+        # greatest() skips NULLs, so a row counts as changed when any of the
+        # columns moved. Date-only columns compare with >= because later
+        # edits on the boundary day carry the same value. Rows where every
+        # column is NULL never pass that test, so those are tracked by id
+        # instead: anything above the highest id seen so far is new.
+        mark_sql = f"greatest({', '.join(schema.watermark)})"
+        inclusive = any(schema.field(c).kind == 'date' for c in schema.watermark)
+        conditions = [where] if where else []
+        params = list(filter_params)
+        if saved:
+            if since is not None:
+                changed = f"{mark_sql} {'>=' if inclusive else '>'} %s"
+                params.append(since)
+            else:
+                changed = f"{mark_sql} IS NOT NULL"
+            if since_id is not None:
+                changed = f"({changed} OR ({mark_sql} IS NULL AND id > %s))"
+                params.append(since_id)
+            conditions.append(changed)
+        query = f"SELECT {select_list} FROM {table_name}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        
+        with self.connection() as conn:
+            cur = conn.cursor()
+            # The new marks and the exported rows come from one snapshot
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cur.execute(f"SELECT max({mark_sql})::text, max(id) FROM {table_name}"
+                        + (f" WHERE {where}" if where else ""), filter_params)
+            until, until_id = cur.fetchone()
+            cur.close()
+            row_count = write_export(conn, table_name, file_path, itersize, query, params)
+            conn.rollback()
+        
+        # Only advance the marks once the file is safely written
+        if until is None:
+            until = since
+        if until_id is None:
+            until_id = since_id
+        if until is not None or until_id is not None:
+            marks[key] = {'mark': until, 'id': until_id}
+            save_watermarks(watermark_path, marks)
+        stats = self._make_stats(table_name, "incremental", row_count, perf_counter() - start)
+        stats['since'] = since
+        stats['until'] = until
+        self.last_export_stats = stats
+        return True
+    
+    def _export_in_snapshot(self, snapshot, table_name, file_path, itersize):
+        with self.connection() as conn:
+            join_snapshot(conn, snapshot)
+            stats = self._export_on(conn, table_name, file_path, itersize)
+            conn.rollback()
+        return stats
+    
+    def _export_on(self, conn, table_name, file_path, itersize):
+        start = perf_counter()
+        row_count = write_export(conn, table_name, file_path, itersize)
+        return self._make_stats(table_name, "snapshot", row_count, perf_counter() - start)
+    
+    def close(self):
+        if self.shared_pool:
+            close_pool()
+        else:
+            self.pool.close()
+
+
+class ImportCancelled(Exception):
+    """Raised inside a running import when the user asked to cancel it"""
+    pass
+
+def _no_log(message, tag=None):
+    pass
+
+# Rows written per executemany call; cancellation is checked between batches
+LOAD_BATCH_SIZE = 1000
+
+def format_cache_stats(stats):
+    # "gender 100%, updated_date 97%" from ValueCache.stats()
+    return ', '.join(f"{column} {s['hit_rate']:.0%}" for column, s in stats.items())
+
+class ImportMonitor:
+    """Progress reporting and cancellation shared by a worker and its caller"""
+    def __init__(self, callback=None, every=500):
+        # callback(stage, done, total, rows_per_sec) is called every `every` rows
+        self.callback = callback
+        self.every = every
+        self.cancel_event = threading.Event()
+        self.stage = None
+        self.total = None
+        self.done = 0
+        self._next_report = every
+        self._started = perf_counter()
+        # {table: ValueCache.stats()} of the files converted so far
+        self.cache_stats = {}
+        # Each stage is also a timing span of the active RunMetrics
+        self._span = None
+    
+    def begin(self, stage, total=None):
+        self.check()
+        self._end_span()
+        self._span = start_span(stage)
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self._next_report = self.every
+        self._started = perf_counter()
+        self._report()
+    
+    def advance(self, count=1):
+        self.done += count
+        if self.done >= self._next_report:
+            self.check()
+            self._next_report = self.done + self.every
+            self._report()
+    
+    def finish(self):
+        self._report()
+        self._end_span()
+    
+    def abort(self):
+        # Closes the running stage's span as failed; a no-op after finish()
+        self._end_span(failed=True)
+    
+    def count_bytes(self, count):
+        # Input bytes read by the current stage
+        if self._span is not None:
+            self._span.bytes = (self._span.bytes or 0) + count
+    
+    def _end_span(self, failed=False):
+        if self._span is not None:
+            self._span.close(rows=self.done, failed=failed)
+            self._span = None
+    
+    def rows_per_sec(self):
+        elapsed = perf_counter() - self._started
+        return self.done / elapsed if elapsed > 0 else 0.0
+    
+    def record_cache(self, table, cache):
+        self.cache_stats[table] = cache.stats()
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+    
+    def check(self):
+        if self.cancel_event.is_set():
+            raise ImportCancelled("Import cancelled by user")
+    
+    def _report(self):
+        if self.callback:
+            self.callback(self.stage, self.done, self.total, self.rows_per_sec())
+
+# Rows sent per multi-row INSERT when loading auth_user / foodie_contact
+USER_PAGE_SIZE = 1000
+
+def _batches(rows, size=None):
+    size = size or LOAD_BATCH_SIZE
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+# ---- Bulk mode ----
+# Secondary indexes are dropped for the load and rebuilt once at the end,
+# and deferrable constraints are checked once after the load instead of per
+# row. All of it happens inside the load transaction, so a failed or
+# cancelled load rolls back to the original indexes.
+
+# Memory for the index rebuild sorts, for the load transaction only
+BULK_MAINTENANCE_WORK_MEM = '512MB'
+
+def defer_indexes(cur, tables, log=_no_log):
+    # Returns [(index name, CREATE INDEX statement)] for rebuild_indexes.
+    # Primary keys and indexes behind a constraint stay in place.
+    cur.execute("SET CONSTRAINTS ALL DEFERRED")
+    dropped = []
+    for table in tables:
+        cur.execute("""
+            SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            WHERE i.indrelid = %s::regclass AND NOT i.indisprimary
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        """, (table,))
+        indexes = cur.fetchall()
+        for name, definition in indexes:
+            cur.execute(f"DROP INDEX {name}")
+        dropped.extend(indexes)
+        if indexes:
+            log(f"Bulk mode: dropped {len(indexes)} index(es) on {table}", "info")
+    return dropped
+
+def rebuild_indexes(cur, dropped, log=_no_log):
+    # The deferred foreign key checks run first: CREATE INDEX refuses a
+    # table that still has queued trigger events
+    cur.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    if not dropped:
+        return
+    cur.execute(f"SET LOCAL maintenance_work_mem = '{BULK_MAINTENANCE_WORK_MEM}'")
+    for name, definition in dropped:
+        cur.execute(definition)
+    log(f"Bulk mode: rebuilt {len(dropped)} index(es)", "info")
+
+# Export targets per data type: (table name, file prefix)
+EXPORT_TARGETS = {
+    1: [('adminusers_adminuser', 'Adminuser')],
+    2: [('listings_two_dish_rice', 'Restaurant')],
+    3: [('auth_user', 'Authorized_User'), ('foodie_contact', 'Foodie')],
+}
+# Export-only option: every table in one consistent snapshot
+EXPORT_ALL = 4
+EXPORT_TARGETS[EXPORT_ALL] = EXPORT_TARGETS[1] + EXPORT_TARGETS[2] + EXPORT_TARGETS[3]
+
+def export_filename(prefix, timestamp, compression=None, fmt='csv'):
+    # compression: None, 'gz' or 'zst'; fmt: 'csv', 'binary' or 'parquet'
+    return f"{prefix}_{timestamp}{format_suffix(fmt, compression)}"
+
+def export_option(db, option, timestamp, directory=None, incremental=False,
+                  columns=None, filters=None, compression=None, fmt='csv'):
+    # Export every table of a data type and return the written file names.
+    # Several tables are written in parallel from one snapshot.
+    if incremental:
+        return _export_option_incremental(db, option, timestamp, directory, columns, filters,
+                                          compression, fmt)
+    targets = []
+    for table_name, prefix in EXPORT_TARGETS[option]:
+        filename = export_filename(prefix, timestamp, compression, fmt)
+        if directory:
+            filename = os.path.join(directory, filename)
+        targets.append((table_name, filename))
+    if len(targets) == 1:
+        db.export_csv(*targets[0])
+    else:
+        db.export_snapshot(targets)
+    return [filename for _, filename in targets]
+
+def _export_option_incremental(db, option, timestamp, directory, columns, filters, compression, fmt):
+    filenames = []
+    table_stats = []
+    watermark_path = os.path.join(directory, WATERMARK_FILE) if directory else WATERMARK_FILE
+    for table_name, prefix in EXPORT_TARGETS[option]:
+        # Tables without a change-tracking column (adminusers_adminuser)
+        # are small and always exported in full
+        tracked = bool(SCHEMAS[table_name].watermark)
+        filename = export_filename(f"{prefix}_changes" if tracked else prefix, timestamp, compression, fmt)
+        if directory:
+            filename = os.path.join(directory, filename)
+        if tracked:
+            db.export_incremental(table_name, filename, watermark_path, columns, filters)
+        else:
+            db.export_csv(table_name, filename)
+        filenames.append(filename)
+        table_stats.append(db.last_export_stats)
+    if len(table_stats) > 1:
+        db.last_export_stats = {'mode': "incremental", 'rows': sum(s['rows'] for s in table_stats),
+                                'tables': table_stats}
+    return filenames
+
+# ---- Typed (binary COPY / Parquet) imports ----
+
+def is_typed(file_path):
+    return format_of(file_path) != 'csv'
+
+# ---- Import and export options ----
+# Pairs of options that would silently ignore one another, named as the
+# CLI flags. The CLI rejects them and the GUI greys out the checkboxes.
+OPTION_CONFLICTS = [
+    ('delta', 'swap'), ('delta', 'resume'), ('swap', 'resume'),
+    ('stream', 'workers'), ('staged', 'workers'), ('resume', 'workers'),
+    ('resume', 'staged'), ('resume', 'stream'),
+    ('delta', 'staged'), ('delta', 'stream'), ('delta', 'bulk'),
+    ('swap', 'staged'), ('swap', 'stream'), ('swap', 'bulk'),
+    ('parts', 'incremental'),
+]
+# Binary COPY and Parquet files are loaded as they are, without these
+CSV_ONLY_OPTIONS = ['staged', 'stream', 'delta', 'swap', 'resume', 'workers']
+
+def option_conflicts(options, names=None):
+    # The OPTION_CONFLICTS pairs that are both set in options ({name: value});
+    # with names, only the pairs involving one of them
+    return [
+        (first, second) for first, second in OPTION_CONFLICTS
+        if options.get(first) and options.get(second) and (names is None or {first, second} & set(names))
+    ]
+
+def load_typed(conn, loads, log=_no_log, monitor=None, bulk=False):
+    # loads: [(table_name, file_path)] of .pgcopy or .parquet exports,
+    # parents first. The values are already typed, so there is no
+    # validation pass; rows keep their exported ids, which keeps the
+    # foodie_contact -> auth_user links, and sequences continue after them.
+    monitor = monitor or ImportMonitor()
+    tables = [table_name for table_name, _ in loads]
+    counts = []
+    with conn:
+        cur = conn.cursor()
+        dropped = defer_indexes(cur, tables, log) if bulk else []
+        for table_name in reversed(tables):
+            with span(f"reset {table_name}"):
+                cur.execute(f"DELETE FROM {table_name}")
+        for table_name, file_path in loads:
+            if format_of(file_path) == 'binary':
+                monitor.begin(f"copy {table_name}")
+                row_count = copy_binary(cur, table_name, file_path)
+                monitor.advance(row_count)
+            else:
+                monitor.begin(f"load {table_name}", parquet_row_count(file_path))
+                row_count = 0
+                for columns, rows in iter_parquet(file_path):
+                    query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s"
+                    for batch in _batches(rows):
+                        execute_values(cur, query, batch, page_size=len(batch))
+                        monitor.advance(len(batch))
+                    row_count += len(rows)
+            cur.execute(f"SELECT setval('{table_name}_id_seq', coalesce(max(id), 0) + 1, false) FROM {table_name}")
+            log(f"Imported {row_count} records to {table_name} table", "info")
+            counts.append(row_count)
+        rebuild_indexes(cur, dropped, log)
+        cur.close()
+    monitor.finish()
+    return counts
+
+# ---- Incremental export ----
+# High-water marks ({'mark': newest change, 'id': highest id}) are kept per
+# table (and per filter) in a small JSON file next to the exported CSVs.
+
+WATERMARK_FILE = 'export_watermarks.json'
+
+def load_watermarks(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_watermarks(path, marks):
+    # Write-then-rename so a crash never leaves a half-written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(marks, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def _export_query_parts(schema, columns, filters):
+    # Returns (select list, where clause, params). Names are checked against
+    # the schema registry; values are always passed as parameters.
+    unknown = [c for c in list(columns or []) + list(filters or {}) if c not in schema.columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {schema.table}: {unknown}")
+    select_list = ', '.join(columns) if columns else '*'
+    conditions = []
+    params = []
+    for column, value in sorted((filters or {}).items()):
+        if value is None:
+            conditions.append(f"{column} IS NULL")
+        else:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    return select_list, ' AND '.join(conditions), params
+
+def iter_converted_rows(file_path, table, monitor=None, encoding='utf-8'):
+    # Streaming validate-and-convert pipeline: every field is parsed exactly
+    # once and each CSV record yields (line number, DB tuple, its errors)
+    # without the file ever being held in memory
+    monitor = monitor or ImportMonitor()
+    monitor.count_bytes(os.path.getsize(file_path))
+    with open_csv(file_path, 'r', encoding=encoding) as f:
+        reader = csv.reader(f)
+        schema = compile_schema(table, next(reader))
+        state = schema.new_state()
+        cache = schema.new_cache()
+        convert = schema.convert
+        for i, row in enumerate(reader, start=2):
+            monitor.advance()
+            values, row_errors = convert(row, i, state, cache)
+            yield i, values, row_errors
+        monitor.record_cache(table, cache)
+
+def _use_workers(file_path, workers):
+    # Compressed files cannot be cut into byte ranges, so they are
+    # validated on one core
+    return bool(workers and workers > 1 and not is_compressed(file_path))
+
+def _collector(errors, file_path):
+    # The caller's ErrorCollector, or one reporting next to the input file
+    return errors if errors is not None else ErrorCollector(error_report_path(file_path))
+
+def _validate_with_workers(file_path, table, monitor, workers, errors, encoding='utf-8', sort_by_id=False):
+    # Parallel validation across `workers` processes; see data_parallel.
+    # Chunks stop being handed out once the error budget is spent.
+    rows = None
+    monitor.count_bytes(os.path.getsize(file_path))
+    try:
+        with errors:
+            _, rows, messages = validate_parallel(file_path, table, monitor, workers, encoding=encoding,
+                                                  sort_by_id=sort_by_id, max_errors=errors.budget)
+            errors.extend(messages)
+    except ErrorBudgetExceeded:
+        pass
+    except (HeaderError, ImportCancelled):
+        raise
+    except Exception as e:
+        errors.note(f"Error reading file: {str(e)}")
+    return (len(errors) == 0, rows, errors)
+
+def validate_admin_user(file_path, monitor=None, workers=None, errors=None):
+    # workers > 1 validates byte-range chunks in a process pool. errors is
+    # an ErrorCollector; by default it writes <file>.errors.csv on failure.
+    monitor = monitor or ImportMonitor()
+    monitor.begin("validate adminusers_adminuser")
+    errors = _collector(errors, file_path)
+    if _use_workers(file_path, workers):
+        result = _validate_with_workers(file_path, ADMIN_USER.table, monitor, workers, errors)
+        monitor.finish()
+        return result
+    rows = []
+    
+    # Read and validate CSV
+    try:
+        with errors:
+            for i, values, row_errors in iter_converted_rows(file_path, ADMIN_USER.table, monitor):
+                if row_errors:
+                    errors.extend(row_errors)
+                elif not errors:
+                    rows.append(values)
+    except ErrorBudgetExceeded:
+        pass
+    except (HeaderError, ImportCancelled):
+        raise
+    except Exception as e:
+        errors.note(f"Error reading file: {str(e)}")
+    
+    monitor.finish()
+    return (len(errors) == 0, rows, errors)
+
+def load_admin_user(conn, rows, monitor=None, bulk=False):
+    monitor = monitor or ImportMonitor()
+    monitor.begin("load adminusers_adminuser", len(rows))
+    columns = ADMIN_USER.insert_columns
+    with conn:
+        with conn.cursor() as cur:
+            dropped = defer_indexes(cur, ['adminusers_adminuser']) if bulk else []
+            with span("reset adminusers_adminuser"):
+                cur.execute("DELETE FROM adminusers_adminuser")
+                cur.execute("ALTER SEQUENCE adminusers_adminuser_id_seq RESTART WITH 1")
+            query = f"""
+                INSERT INTO adminusers_adminuser 
+                ({', '.join(columns)})
+                VALUES ({', '.join(['%s'] * len(columns))})
+            """
+            for batch in _batches(rows):
+                cur.executemany(query, batch)
+                monitor.advance(len(batch))
+            rebuild_indexes(cur, dropped)
+            # Last chance to cancel before the transaction commits
+            monitor.check()
+    monitor.finish()
+    return len(rows)
+
+def validate_restaurant(file_path, monitor=None, workers=None, errors=None):
+    # Returns rows already converted to DB tuples (without the id column)
+    monitor = monitor or ImportMonitor()
+    monitor.begin("validate listings_two_dish_rice")
+    errors = _collector(errors, file_path)
+    if _use_workers(file_path, workers):
+        valid, rows, errors = _validate_with_workers(file_path, RESTAURANT.table, monitor, workers, errors)
+        monitor.finish()
+        return (valid, rows if valid else None, errors)
+    rows = []
+    
+    # Read, validate and convert in one pass
+    try:
+        with errors:
+            for i, values, row_errors in iter_converted_rows(file_path, RESTAURANT.table, monitor):
+                if row_errors:
+                    errors.extend(row_errors)
+                elif not errors:
+                    # Once the file has failed its rows will be discarded anyway,
+                    # so stop keeping them and only collect the remaining errors
+                    rows.append(values)
+    except ErrorBudgetExceeded:
+        pass
+    except (HeaderError, ImportCancelled):
+        raise
+    except Exception as e:
+        errors.note(f"Error reading file: {str(e)}")
+    
+    monitor.finish()
+    if errors:
+        return (False, None, errors)
+    return (True, rows, errors)
+
+def load_restaurant(conn, rows, monitor=None, bulk=False):
+    monitor = monitor or ImportMonitor()
+    monitor.begin("load listings_two_dish_rice", len(rows))
+    insert_columns = RESTAURANT.insert_columns  # Skip ID column
+    with conn:
+        with conn.cursor() as cur:
+            dropped = defer_indexes(cur, ['listings_two_dish_rice']) if bulk else []
+            with span("reset listings_two_dish_rice"):
+                cur.execute("DELETE FROM listings_two_dish_rice")
+                cur.execute("ALTER SEQUENCE listings_two_dish_rice_id_seq RESTART WITH 1")
+            placeholders = ', '.join(['%s'] * len(insert_columns))
+            query = f"""
+                INSERT INTO listings_two_dish_rice ({', '.join(insert_columns)})
+                VALUES ({placeholders})
+            """
+            for batch in _batches(rows):
+                cur.executemany(query, batch)
+                monitor.advance(len(batch))
+            rebuild_indexes(cur, dropped)
+            # Last chance to cancel before the transaction commits
+            monitor.check()
+    monitor.finish()
+    return len(rows)
+
+# Streaming restaurant import: rows per chunk and chunks buffered between
+# the parsing thread and the DB writer. Peak memory is about
+# (STREAM_QUEUE_DEPTH + 2) * STREAM_CHUNK_SIZE converted rows.
+STREAM_CHUNK_SIZE = 5000
+STREAM_QUEUE_DEPTH = 2
+
+class _RollbackImport(Exception):
+    pass
+
+def import_restaurant_streaming(conn, file_path, monitor=None, chunk_size=None, bulk=False, errors=None):
+    # Validates and converts fixed-size chunks on a producer thread while
+    # this thread writes earlier chunks in the same transaction. Returns
+    # (valid, row_count, errors); any error rolls the whole load back.
+    monitor = monitor or ImportMonitor()
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+    stop = threading.Event()
+    errors = _collector(errors, file_path)
+    done = object()
+    
+    def put(item):
+        # Give up if the writer has stopped listening
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        chunk = []
+        try:
+            for i, values, row_errors in iter_converted_rows(file_path, RESTAURANT.table, monitor):
+                if stop.is_set():
+                    return
+                if row_errors:
+                    # Keep parsing to report errors up to the budget, but
+                    # stop sending rows
+                    errors.extend(row_errors)
+                    chunk = []
+                elif not errors:
+                    chunk.append(values)
+                    if len(chunk) >= chunk_size:
+                        if not put(chunk):
+                            return
+                        chunk = []
+            if chunk and not errors:
+                put(chunk)
+            put(done)
+        except Exception as e:
+            put(e)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    insert_columns = RESTAURANT.insert_columns
+    query = f"""
+        INSERT INTO listings_two_dish_rice ({', '.join(insert_columns)})
+        VALUES ({', '.join(['%s'] * len(insert_columns))})
+    """
+    row_count = 0
+    monitor.begin("stream listings_two_dish_rice")
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                producer.start()
+                dropped = defer_indexes(cur, ['listings_two_dish_rice']) if bulk else []
+                with span("reset listings_two_dish_rice"):
+                    cur.execute("DELETE FROM listings_two_dish_rice")
+                    cur.execute("ALTER SEQUENCE listings_two_dish_rice_id_seq RESTART WITH 1")
+                while True:
+                    item = chunks.get()
+                    if item is done:
+                        break
+                    if isinstance(item, (HeaderError, ImportCancelled)):
+                        raise item
+                    if isinstance(item, ErrorBudgetExceeded):
+                        break
+                    if isinstance(item, Exception):
+                        errors.note(f"Error reading file: {str(item)}")
+                        break
+                    cur.executemany(query, item)
+                    row_count += len(item)
+                    monitor.check()
+                if errors:
+                    raise _RollbackImport()
+                rebuild_indexes(cur, dropped)
+                # Last chance to cancel before the transaction commits
+                monitor.check()
+    except _RollbackImport:
+        monitor.finish()
+        return (False, 0, errors)
+    finally:
+        stop.set()
+        if producer.ident is not None:
+            producer.join()
+        errors.close()
+    monitor.finish()
+    return (True, row_count, errors)
+
+class PackedRows:
+    """Converted rows kept compactly: the boolean columns of each row are
+    packed into one int bitmask. Reads give back plain insert tuples."""
+    __slots__ = ('width', '_flag_pos', '_keep_pos', '_rows')
+    
+    def __init__(self, schema, rows=()):
+        columns = schema.insert_columns
+        bools = set(schema.fields_of_kind('bool'))
+        self.width = len(columns)
+        self._flag_pos = [n for n, c in enumerate(columns) if c in bools]
+        self._keep_pos = [n for n, c in enumerate(columns) if c not in bools]
+        self._rows = []
+        for values in rows:
+            self.append(values)
+    
+    def append(self, values):
+        mask = 0
+        for bit, pos in enumerate(self._flag_pos):
+            if values[pos]:
+                mask |= 1 << bit
+        self._rows.append(tuple([values[pos] for pos in self._keep_pos]) + (mask,))
+    
+    def _unpack(self, packed):
+        values = [None] * self.width
+        for pos, value in zip(self._keep_pos, packed):
+            values[pos] = value
+        mask = packed[-1]
+        for bit, pos in enumerate(self._flag_pos):
+            values[pos] = bool(mask >> bit & 1)
+        return tuple(values)
+    
+    def column(self, pos):
+        # Values of one non-boolean insert column, without unpacking rows
+        n = self._keep_pos.index(pos)
+        return (packed[n] for packed in self._rows)
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def __iter__(self):
+        return map(self._unpack, self._rows)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._unpack(packed) for packed in self._rows[index]]
+        return self._unpack(self._rows[index])
+
+def _convert_in_id_order(file_path, table, monitor, errors, check=None):
+    # Returns PackedRows converted in ascending id order. Files that are
+    # already sorted (our own exports) are streamed without holding the raw
+    # rows; otherwise the file is read again and sorted in memory.
+    # check(schema, row) returns extra errors for a converted row.
+    stage = monitor.stage
+    for presorted in (True, False):
+        errors.clear()
+        monitor.count_bytes(os.path.getsize(file_path))
+        data = PackedRows(SCHEMAS[table])
+        with open_csv(file_path, 'r', newline=None) as f:
+            reader = csv.reader(f)
+            schema = compile_schema(table, next(reader))
+            state = schema.new_state()
+            cache = schema.new_cache()
+            id_pos = schema.positions['id']
+            if presorted:
+                rows = enumerate(reader, start=2)
+                # Held back until the whole file is known to be sorted, so an
+                # unsorted file reports its errors once, in id order, and only
+                # stops at the budget on the sorted pass
+                found = []
+            else:
+                monitor.begin(stage)
+                rows = _read_sorted_by_id(reader, schema, errors)
+                found = errors
+            last_id = None
+            for i, row in rows:
+                if presorted:
+                    try:
+                        row_id = int(row[id_pos])
+                    except (IndexError, ValueError):
+                        break
+                    if last_id is not None and row_id < last_id:
+                        break
+                    last_id = row_id
+                    if errors.budget and len(found) >= errors.budget:
+                        # Rejected already, only the id order is left to check
+                        continue
+                monitor.advance()
+                values, row_errors = schema.convert(row, i, state, cache)
+                found.extend(row_errors)
+                if values is None:
+                    continue
+                if check:
+                    found.extend(check(schema, row))
+                data.append(values)
+            else:
+                if presorted:
+                    errors.extend(found)
+                monitor.record_cache(table, cache)
+                return data
+
+def _read_sorted_by_id(reader, schema, errors):
+    # Returns (line number, row) pairs sorted by 'id' in ascending order
+    numbered = list(enumerate(reader, start=2))
+    id_pos = schema.positions['id']
+    try:
+        numbered.sort(key=lambda pair: int(pair[1][id_pos]))
+    except (IndexError, ValueError) as e:
+        errors.append(f"Error sorting by ID: {str(e)}")
+    return numbered
+
+def validate_auth_user(file_path, monitor=None, workers=None, errors=None):
+    # Rows come back as PackedRows of AUTH_USER.insert_columns tuples
+    monitor = monitor or ImportMonitor()
+    monitor.begin("validate auth_user")
+    errors = _collector(errors, file_path)
+    if _use_workers(file_path, workers):
+        try:
+            valid, data, errors = _validate_with_workers(file_path, AUTH_USER.table, monitor, workers, errors,
+                                                         encoding=locale.getpreferredencoding(False), sort_by_id=True)
+        except HeaderError as e:
+            errors.note(f"Error reading file: {str(e)}")
+            return (False, None, errors)
+        monitor.finish()
+        return (valid, PackedRows(AUTH_USER, data) if data is not None else None, errors)
+    
+    try:
+        with errors:
+            data = _convert_in_id_order(file_path, AUTH_USER.table, monitor, errors)
+        monitor.finish()
+        return (len(errors) == 0, data, errors)
+    
+    except ErrorBudgetExceeded:
+        monitor.finish()
+        return (False, None, errors)
+    except ImportCancelled:
+        raise
+    except Exception as e:
+        errors.note(f"Error reading file: {str(e)}")
+        return (False, None, errors)
+
+def validate_foodie_contact(file_path, auth_data, monitor=None, workers=None, errors=None):
+    # Rows come back as PackedRows of FOODIE_CONTACT.insert_columns tuples
+    monitor = monitor or ImportMonitor()
+    monitor.begin("validate foodie_contact")
+    errors = _collector(errors, file_path)
+    data = []
+    
+    # Create lowercase username set for case-insensitive matching
+    username_pos = AUTH_USER.insert_position('username')
+    usernames = (auth_data.column(username_pos) if isinstance(auth_data, PackedRows)
+                 else (row[username_pos] for row in auth_data))
+    auth_usernames_lower = {username.lower() for username in usernames}
+    
+    if _use_workers(file_path, workers):
+        try:
+            valid, data, errors = _validate_with_workers(file_path, FOODIE_CONTACT.table, monitor, workers, errors,
+                                                         encoding=locale.getpreferredencoding(False), sort_by_id=True)
+        except HeaderError as e:
+            errors.note(f"Error reading file: {str(e)}")
+            return (False, None, errors)
+        data = PackedRows(FOODIE_CONTACT, data or [])
+        # Case-insensitive matching against auth_user, done once after the merge
+        name_pos = FOODIE_CONTACT.insert_position('foodie_name')
+        try:
+            with errors:
+                for row in data or []:
+                    if row[name_pos].lower() not in auth_usernames_lower:
+                        errors.append(RowError(FOODIE_CONTACT.messages['reference'].format(key=row[name_pos]),
+                                               'reference'))
+        except ErrorBudgetExceeded:
+            pass
+        monitor.finish()
+        return (len(errors) == 0, data, errors)
+    
+    def check_reference(schema, row):
+        # Case-insensitive matching
+        foodie_name = row[schema.positions['foodie_name']]
+        if foodie_name.lower() not in auth_usernames_lower:
+            return [schema.message('reference', key=foodie_name)]
+        return []
+    
+    try:
+        with errors:
+            data = _convert_in_id_order(file_path, FOODIE_CONTACT.table, monitor, errors, check_reference)
+        monitor.finish()
+        return (len(errors) == 0, data, errors)
+    
+    except ErrorBudgetExceeded:
+        monitor.finish()
+        return (False, None, errors)
+    except ImportCancelled:
+        raise
+    except Exception as e:
+        errors.note(f"Error reading file: {str(e)}")
+        return (False, None, errors)
+
+def load_users(conn, auth_data, foodie_data, log=_no_log, monitor=None, bulk=False):
+    # Runs in a single transaction; the caller owns the connection
+    monitor = monitor or ImportMonitor()
+    auth_columns = AUTH_USER.insert_columns
+    foodie_columns = FOODIE_CONTACT.insert_columns + ['user_id']
+    foodie_name_pos = FOODIE_CONTACT.insert_position('foodie_name')
+    with conn:
+        cur = conn.cursor()
+        
+        dropped = defer_indexes(cur, ['auth_user', 'foodie_contact'], log) if bulk else []
+        # Delete existing records and reset sequences
+        with span("reset foodie_contact, auth_user"):
+            cur.execute("DELETE FROM foodie_contact;")
+            cur.execute("ALTER SEQUENCE foodie_contact_id_seq RESTART WITH 1;")
+            cur.execute("DELETE FROM auth_user;")
+            cur.execute("ALTER SEQUENCE auth_user_id_seq RESTART WITH 1;")
+        log("Cleared existing records and reset sequences", "info")
+        
+        # Create case-insensitive mapping of username to new ID
+        username_id_map = {}
+        
+        # Import auth_user data one page per round trip. RETURNING order is
+        # not guaranteed for multi-row inserts, so map ids back by username
+        monitor.begin("load auth_user", len(auth_data))
+        for batch in _batches(auth_data, USER_PAGE_SIZE):
+            returned = execute_values(cur, f"""
+                INSERT INTO auth_user ({', '.join(auth_columns)})
+                VALUES %s
+                RETURNING id, username;
+            """, batch, page_size=len(batch), fetch=True)
+            for new_id, username in returned:
+                # Map lowercase username to ID
+                username_id_map[username.lower()] = new_id
+            monitor.advance(len(batch))
+        
+        log(f"Imported {len(auth_data)} records to auth_user table", "info")
+        
+        # Import foodie_contact data
+        monitor.begin("load foodie_contact", len(foodie_data))
+        foodie_rows = []
+        for row in foodie_data:
+            # Lookup user ID using lowercase username
+            foodie_name = row[foodie_name_pos]
+            user_id = username_id_map.get(foodie_name.lower())
+            if not user_id:
+                raise ValueError(f"User ID not found for {foodie_name}")
+            foodie_rows.append(row + (user_id,))
+        for batch in _batches(foodie_rows, USER_PAGE_SIZE):
+            execute_values(cur, f"""
+                INSERT INTO foodie_contact ({', '.join(foodie_columns)})
+                VALUES %s
+            """, batch, page_size=len(batch))
+            monitor.advance(len(batch))
+        log(f"Imported {len(foodie_data)} records to foodie_contact table", "info")
+        rebuild_indexes(cur, dropped, log)
+        # Last chance to cancel before the transaction commits
+        monitor.check()
+        cur.close()
+    monitor.finish()
+    return len(auth_data), len(foodie_data)
+
+# ---- Staging-table pipeline for auth_user / foodie_contact ----
+# Both CSV files are COPYed into temporary text tables and every check and
+# the user_id lookup runs inside PostgreSQL, so Python only streams bytes.
+
+IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+STAGED_AUTH_BOOLEANS = AUTH_USER.fields_of_kind('bool')
+STAGED_FOODIE_BOOLEANS = FOODIE_CONTACT.fields_of_kind('bool')
+
+def _copy_to_staging(cur, file_path, stage_table, required_columns):
+    with open_csv(file_path, 'r') as f:
+        header = next(csv.reader(f))
+    missing = [c for c in required_columns if c not in header]
+    if missing:
+        raise HeaderError(f"Header mismatch. Missing columns: {missing}, got: {header}")
+    invalid = [c for c in header if not IDENTIFIER_RE.match(c)]
+    if invalid:
+        raise HeaderError(f"Header mismatch. Invalid column names: {invalid}")
+    
+    columns = ', '.join(header)
+    cur.execute(
+        f"CREATE TEMP TABLE {stage_table} ({', '.join(f'{c} text' for c in header)}) ON COMMIT DROP"
+    )
+    # Stream the raw (decompressed) bytes; PostgreSQL does the CSV parsing
+    with open_csv(file_path, 'rb') as f:
+        cur.copy_expert(
+            f"COPY {stage_table} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')",
+            f
+        )
+    row_count = cur.rowcount
+    cur.execute(f"ANALYZE {stage_table}")
+    return row_count
+
+def _staged_checks(cur, checks, errors, prefix):
+    # checks: [(category, query returning messages)]. Each query stops at
+    # the rest of the error budget, one more row would only be discarded.
+    for kind, query in checks:
+        if errors.budget:
+            query += f" LIMIT {errors.budget - len(errors)}"
+        cur.execute(query)
+        errors.extend(RowError(f"{prefix}: {message}", kind) for (message,) in cur.fetchall())
+
+def _bool_sql(column, prefix=''):
+    return f"upper(trim({prefix}{column})) = 'TRUE'"
+
+def import_users_staged(conn, auth_file, foodie_file, log=_no_log, monitor=None, bulk=False, errors=None):
+    # Returns (valid, (auth_count, foodie_count), errors); nothing is written
+    # to the live tables unless every check passes. errors is an
+    # ErrorCollector for both files, by default reporting next to auth_file.
+    monitor = monitor or ImportMonitor()
+    errors = _collector(errors, auth_file)
+    with conn:
+        cur = conn.cursor()
+        
+        monitor.begin("copy auth_user to staging")
+        auth_count = _copy_to_staging(cur, auth_file, 'stage_auth_user', AUTH_USER.columns)
+        monitor.advance(auth_count)
+        monitor.begin("copy foodie_contact to staging")
+        foodie_count = _copy_to_staging(cur, foodie_file, 'stage_foodie_contact', FOODIE_CONTACT.columns)
+        monitor.advance(foodie_count)
+        log(f"Staged {auth_count} auth_user and {foodie_count} foodie_contact rows", "info")
+        
+        monitor.begin("validate staged users")
+        try:
+            with errors:
+                _staged_checks(cur, [
+                    ('id', "SELECT 'Error sorting by ID: invalid id ' || quote_nullable(id) "
+                           "FROM stage_auth_user WHERE id IS NULL OR id !~ '^\\s*-?\\d+\\s*$'"),
+                    ('duplicate', "SELECT 'Duplicate username: ' || coalesce(username, '') "
+                                  "FROM stage_auth_user GROUP BY username HAVING count(*) > 1"),
+                    ('duplicate_casefold',
+                     "SELECT 'Duplicate username (case-insensitive): ' || coalesce(min(username), '') "
+                     "FROM stage_auth_user GROUP BY lower(username) HAVING count(*) > 1"),
+                ] + [
+                    ('missing', f"SELECT 'Missing {field} for user ' || coalesce(username, '') "
+                                f"FROM stage_auth_user WHERE trim(coalesce({field}, '')) = ''")
+                    for field in AUTH_USER.required_fields()
+                ] + [
+                    ('bool', f"SELECT 'Invalid {field} value ' || quote_literal(coalesce({field}, '')) "
+                             f"|| ' for user ' || coalesce(username, '') "
+                             f"FROM stage_auth_user WHERE upper(trim(coalesce({field}, ''))) NOT IN ('TRUE', 'FALSE')")
+                    for field in STAGED_AUTH_BOOLEANS
+                ], errors, "AUTH")
+                _staged_checks(cur, [
+                    ('id', "SELECT 'Error sorting by ID: invalid id ' || quote_nullable(id) "
+                           "FROM stage_foodie_contact WHERE id IS NULL OR id !~ '^\\s*-?\\d+\\s*$'"),
+                    ('duplicate', "SELECT 'Duplicate foodie_name: ' || coalesce(foodie_name, '') "
+                                  "FROM stage_foodie_contact GROUP BY foodie_name HAVING count(*) > 1"),
+                ] + [
+                    ('missing', f"SELECT 'Missing {field} for foodie ' || coalesce(foodie_name, '') "
+                                f"FROM stage_foodie_contact WHERE trim(coalesce({field}, '')) = ''")
+                    for field in FOODIE_CONTACT.required_fields()
+                ] + [
+                    ('bool', f"SELECT 'Invalid {field} value ' || quote_literal(coalesce({field}, '')) "
+                             f"|| ' for foodie ' || coalesce(foodie_name, '') "
+                             f"FROM stage_foodie_contact WHERE upper(trim(coalesce({field}, ''))) NOT IN ('TRUE', 'FALSE')")
+                    for field in STAGED_FOODIE_BOOLEANS
+                ] + [
+                    # Case-insensitive matching
+                    ('reference', "SELECT 'Username ' || coalesce(f.foodie_name, '') "
+                                  "|| ' not found in auth_user for foodie ' || coalesce(f.foodie_name, '') "
+                                  "FROM stage_foodie_contact f "
+                                  "LEFT JOIN stage_auth_user a ON lower(a.username) = lower(f.foodie_name) "
+                                  "WHERE a.username IS NULL"),
+                ], errors, "FOODIE")
+        except ErrorBudgetExceeded:
+            pass
+        if errors:
+            monitor.finish()
+            return (False, (auth_count, foodie_count), errors)
+        monitor.check()
+        
+        dropped = defer_indexes(cur, ['auth_user', 'foodie_contact'], log) if bulk else []
+        # Delete existing records and reset sequences
+        with span("reset foodie_contact, auth_user"):
+            cur.execute("DELETE FROM foodie_contact;")
+            cur.execute("ALTER SEQUENCE foodie_contact_id_seq RESTART WITH 1;")
+            cur.execute("DELETE FROM auth_user;")
+            cur.execute("ALTER SEQUENCE auth_user_id_seq RESTART WITH 1;")
+        log("Cleared existing records and reset sequences", "info")
+        
+        monitor.begin("load auth_user", auth_count)
+        cur.execute(f"""
+            INSERT INTO auth_user (password, last_login, is_superuser, username, 
+                first_name, last_name, email, is_staff, is_active, date_joined)
+            SELECT coalesce(password, ''), NULLIF(last_login, '')::timestamptz,
+                {_bool_sql('is_superuser')}, username,
+                CASE WHEN trim(coalesce(first_name, '')) = '' THEN NULL ELSE first_name END,
+                CASE WHEN trim(coalesce(last_name, '')) = '' THEN NULL ELSE last_name END,
+                email, {_bool_sql('is_staff')}, {_bool_sql('is_active')},
+                date_joined::timestamptz
+            FROM stage_auth_user
+            ORDER BY id::bigint
+        """)
+        monitor.advance(cur.rowcount)
+        log(f"Imported {cur.rowcount} records to auth_user table", "info")
+        monitor.check()
+        
+        # Resolve user_id with one join on the freshly loaded auth_user rows
+        monitor.begin("load foodie_contact", foodie_count)
+        favor_columns = ', '.join(STAGED_FOODIE_BOOLEANS)
+        favor_values = ', '.join(_bool_sql(c, 'f.') for c in STAGED_FOODIE_BOOLEANS)
+        cur.execute(f"""
+            INSERT INTO foodie_contact (
+                foodie_name, updated_date, gender, age_range, occupation, live_district,
+                foodie_desc, foodie_photo, {favor_columns}, user_id
+            )
+            SELECT f.foodie_name, NULLIF(f.updated_date, '')::timestamptz,
+                f.gender, f.age_range, f.occupation, f.live_district,
+                coalesce(f.foodie_desc, ''), coalesce(f.foodie_photo, ''),
+                {favor_values}, a.id
+            FROM stage_foodie_contact f
+            JOIN auth_user a ON lower(a.username) = lower(f.foodie_name)
+            ORDER BY f.id::bigint
+        """)
+        monitor.advance(cur.rowcount)
+        log(f"Imported {cur.rowcount} records to foodie_contact table", "info")
+        rebuild_indexes(cur, dropped, log)
+        # Last chance to cancel before the transaction commits
+        monitor.check()
+        cur.close()
+    monitor.finish()
+    return (True, (auth_count, foodie_count), errors)
@@ -0,0 +1,124 @@
+from psycopg2.extras import execute_values
+from data_core import ImportMonitor, USER_PAGE_SIZE, _batches, _no_log
+from data_schema import ADMIN_USER, RESTAURANT, AUTH_USER, FOODIE_CONTACT
+
+# Delta imports: instead of DELETE + sequence reset + full reload, the
+# validated rows are staged in a temp table with the target's column types
+# and compared with the live rows on each table's natural key. Only new rows
+# are inserted and only rows whose content differs are updated, so existing
+# ids stay stable and a small daily change writes a small number of rows.
+
+def _stage_rows(cur, schema, columns, rows, monitor):
+    stage = f"delta_{schema.table}"
+    # CREATE TABLE AS ... WITH NO DATA copies the column types without the
+    # id default, so staging never consumes sequence values
+    cur.execute(
+        f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+        f"SELECT 0 AS delta_ord, {', '.join(columns)} FROM {schema.table} WITH NO DATA"
+    )
+    for start, batch in _numbered_batches(rows):
+        execute_values(cur, f"INSERT INTO {stage} VALUES %s",
+                       [(start + n,) + tuple(row) for n, row in enumerate(batch)],
+                       page_size=len(batch))
+        monitor.advance(len(batch))
+    cur.execute(f"CREATE INDEX ON {stage} (({schema.key_sql()}))")
+    cur.execute(f"ANALYZE {stage}")
+    return stage
+
+def _numbered_batches(rows):
+    start = 0
+    for batch in _batches(rows, USER_PAGE_SIZE):
+        yield start, batch
+        start += len(batch)
+
+def _apply_delta(cur, schema, stage, columns, delete_missing):
+    # Returns {'inserted', 'updated', 'deleted'} row counts
+    live_key, stage_key = schema.key_sql('t'), schema.key_sql('s')
+    column_list = ', '.join(columns)
+    stage_list = ', '.join(f's.{c}' for c in columns)
+    live_list = ', '.join(f't.{c}' for c in columns)
+    stats = {}
+
+    # Changed rows only: IS DISTINCT FROM also treats NULL = NULL as equal
+    cur.execute(f"""
+        UPDATE {schema.table} t SET ({column_list}) = ROW({stage_list})
+        FROM {stage} s
+        WHERE {live_key} = {stage_key}
+          AND ({live_list}) IS DISTINCT FROM ({stage_list})
+    """)
+    stats['updated'] = cur.rowcount
+
+    cur.execute(f"""
+        INSERT INTO {schema.table} ({column_list})
+        SELECT {stage_list} FROM {stage} s
+        WHERE NOT EXISTS (SELECT 1 FROM {schema.table} t WHERE {live_key} = {stage_key})
+        ORDER BY s.delta_ord
+    """)
+    stats['inserted'] = cur.rowcount
+
+    stats['deleted'] = _delete_missing(cur, schema, stage) if delete_missing else 0
+    return stats
+
+def _delete_missing(cur, schema, stage):
+    cur.execute(f"""
+        DELETE FROM {schema.table} t
+        WHERE NOT EXISTS (SELECT 1 FROM {stage} s WHERE {schema.key_sql('t')} = {schema.key_sql('s')})
+    """)
+    return cur.rowcount
+
+def _finish_stats(stats, total):
+    stats['unchanged'] = total - stats['updated'] - stats['inserted']
+    return stats
+
+def upsert_rows(conn, schema, rows, delete_missing=False, monitor=None):
+    # Delta-load validated rows (tuples in schema.insert_columns order)
+    monitor = monitor or ImportMonitor()
+    monitor.begin(f"delta {schema.table}", len(rows))
+    columns = schema.insert_columns
+    with conn:
+        with conn.cursor() as cur:
+            stage = _stage_rows(cur, schema, columns, rows, monitor)
+            stats = _apply_delta(cur, schema, stage, columns, delete_missing)
+            # Last chance to cancel before the transaction commits
+            monitor.check()
+    monitor.finish()
+    return _finish_stats(stats, len(rows))
+
+def upsert_admin_user(conn, rows, delete_missing=False, monitor=None):
+    return upsert_rows(conn, ADMIN_USER, rows, delete_missing, monitor)
+
+def upsert_restaurant(conn, rows, delete_missing=False, monitor=None):
+    return upsert_rows(conn, RESTAURANT, rows, delete_missing, monitor)
+
+def upsert_users(conn, auth_data, foodie_data, delete_missing=False, log=_no_log, monitor=None):
+    # auth_user is applied first so new users have ids before foodie_contact
+    # resolves user_id; deletes go the other way round for the foreign key
+    monitor = monitor or ImportMonitor()
+    auth_columns = AUTH_USER.insert_columns
+    foodie_columns = FOODIE_CONTACT.insert_columns + ['user_id']
+    with conn:
+        with conn.cursor() as cur:
+            monitor.begin("delta auth_user", len(auth_data))
+            auth_stage = _stage_rows(cur, AUTH_USER, auth_columns, auth_data, monitor)
+            monitor.begin("delta foodie_contact", len(foodie_data))
+            foodie_stage = _stage_rows(cur, FOODIE_CONTACT, foodie_columns,
+                                       [row + (None,) for row in foodie_data], monitor)
+
+            deleted_foodies = _delete_missing(cur, FOODIE_CONTACT, foodie_stage) if delete_missing else 0
+            auth_stats = _apply_delta(cur, AUTH_USER, auth_stage, auth_columns, delete_missing)
+            log(f"auth_user: {auth_stats['inserted']} inserted, {auth_stats['updated']} updated, "
+                f"{auth_stats['deleted']} deleted", "info")
+
+            # Resolve user_id with one case-insensitive join
+            cur.execute(f"""
+                UPDATE {foodie_stage} s SET user_id = a.id
+                FROM auth_user a WHERE lower(a.username) = lower(s.foodie_name)
+            """)
+            foodie_stats = _apply_delta(cur, FOODIE_CONTACT, foodie_stage, foodie_columns, False)
+            foodie_stats['deleted'] = deleted_foodies
+            log(f"foodie_contact: {foodie_stats['inserted']} inserted, {foodie_stats['updated']} updated, "
+                f"{foodie_stats['deleted']} deleted", "info")
+            # Last chance to cancel before the transaction commits
+            monitor.check()
+    monitor.finish()
+    return _finish_stats(auth_stats, len(auth_data)), _finish_stats(foodie_stats, len(foodie_data))
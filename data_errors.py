@@ -0,0 +1,130 @@
+import csv
+from data_compress import split_suffix
+
+# Bounded error collection for validation. Errors are counted per category
+# (missing field, bad boolean, duplicate, ...); only the first few of each
+# category stay in memory, every error is streamed to a CSV report, and a
+# run stops once its error budget is spent instead of checking a file that
+# is already rejected.
+
+EXAMPLES_PER_CATEGORY = 20
+ERROR_BUDGET = 1000
+# Examples shown in a message box; the log and the report get more
+DIALOG_EXAMPLES = 15
+
+class ErrorBudgetExceeded(Exception):
+    """Raised by ErrorCollector.append once the error budget is spent"""
+    pass
+
+class RowError(str):
+    """Error message that remembers its category and CSV row"""
+    def __new__(cls, text, kind='other', row=None):
+        message = super().__new__(cls, text)
+        message.kind = kind
+        message.row = row
+        return message
+
+def error_report_path(file_path):
+    # Foodie_20250626.csv -> Foodie_20250626.errors.csv
+    return f"{split_suffix(file_path)[0]}.errors.csv"
+
+class ErrorCollector:
+    """Drop-in for the list of messages a validator returns. len() is the
+    total error count, iterating gives the kept examples."""
+    def __init__(self, report_path=None, examples=EXAMPLES_PER_CATEGORY, budget=ERROR_BUDGET):
+        self.report_path = report_path
+        self.examples = examples
+        # None or 0 checks the whole file
+        self.budget = budget or None
+        self._report = None
+        self.clear()
+
+    def clear(self):
+        self.close()
+        self.counts = {}
+        self.kept = []
+        self.total = 0
+        self.exhausted = False
+        self._started = False
+
+    def append(self, message):
+        if self.exhausted:
+            return
+        self._record(message)
+        if self.budget and self.total >= self.budget:
+            self.exhausted = True
+            self.close()
+            raise ErrorBudgetExceeded(f"Stopped after {self.total} errors")
+
+    def note(self, message):
+        # File-level errors (unreadable file, bad header): always recorded,
+        # never raises, and closes the report since validation is over
+        self._record(message)
+        self.close()
+
+    def _record(self, message):
+        kind = getattr(message, 'kind', 'other')
+        self.total += 1
+        count = self.counts[kind] = self.counts.get(kind, 0) + 1
+        if count <= self.examples:
+            self.kept.append(message)
+        self._write(getattr(message, 'row', None), kind, message)
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def _write(self, row, kind, message):
+        if not self.report_path:
+            return
+        if self._report is None:
+            # Truncated on the first error of a run, appended to after that
+            self._report = open(self.report_path, 'a' if self._started else 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._report)
+            if not self._started:
+                self._writer.writerow(['row', 'category', 'message'])
+            self._started = True
+        self._writer.writerow([row if row is not None else '', kind, message])
+
+    def close(self):
+        if self._report is not None:
+            self._report.close()
+            self._report = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.total
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __iter__(self):
+        return iter(self.kept)
+
+    def summary(self, limit=None):
+        # Counts per category, then the kept examples
+        counts = sorted(self.counts.items(), key=lambda item: -item[1])
+        lines = [f"{self.total} error(s): " + ', '.join(f"{kind} {count}" for kind, count in counts)]
+        if self.exhausted:
+            lines.append(f"Stopped at the error budget of {self.budget}, the rest of the file was not checked")
+        if self._started:
+            lines.append(f"Full list: {self.report_path}")
+        examples = self.kept if limit is None else self.kept[:limit]
+        lines.extend(examples)
+        if len(examples) < self.total:
+            lines.append(f"... and {self.total - len(examples)} more")
+        return lines
+
+def error_summary(errors, limit=None):
+    # Lines to show for a validator's errors, whether a collector or a list
+    if isinstance(errors, ErrorCollector):
+        return errors.summary(limit)
+    errors = list(errors)
+    if limit is not None and len(errors) > limit:
+        return errors[:limit] + [f"... and {len(errors) - limit} more"]
+    return errors
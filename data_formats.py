@@ -0,0 +1,158 @@
+from data_compress import open_csv, split_suffix, csv_suffix
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+# Typed alternatives to CSV. PostgreSQL binary COPY (.pgcopy) and Parquet
+# (.parquet) carry timestamps, floats and booleans as values, so a round
+# trip skips csv.writer on the way out and fromisoformat()/float() on the
+# way back in. Both hold every exported column including id and are
+# loaded as-is, without the CSV validation step.
+
+FORMAT_SUFFIXES = {'.csv': 'csv', '.pgcopy': 'binary', '.parquet': 'parquet'}
+EXPORT_FORMATS = ('csv', 'binary', 'parquet')
+# File dialog filter for everything the import flows accept
+IMPORT_FILETYPES = [
+    ("Data files", "*.csv *.csv.gz *.csv.zst *.pgcopy *.pgcopy.gz *.pgcopy.zst *.parquet"),
+    ("All files", "*.*"),
+]
+
+# Rows per Parquet row group; also the batch size when reading one back
+PARQUET_ROW_GROUP = 65536
+PARQUET_COMPRESSION = 'zstd'
+
+# PGCOPY signature, flags field and extension area length; the trailer
+# is a field count of -1
+BINARY_HEADER = 19
+BINARY_TRAILER = b'\xff\xff'
+
+def format_of(path):
+    # 'binary' for X.pgcopy and X.pgcopy.gz, 'parquet', otherwise 'csv'
+    parts = split_suffix(path)[1].lower().split('.')
+    return FORMAT_SUFFIXES.get('.' + parts[1], 'csv') if len(parts) > 1 else 'csv'
+
+def format_suffix(fmt='csv', compression=None):
+    if fmt == 'binary':
+        return '.pgcopy' + (f".{compression}" if compression else '')
+    if fmt == 'parquet':
+        # Parquet compresses its column chunks itself
+        return '.parquet'
+    return csv_suffix(compression)
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise Exception("Parquet files need the 'pyarrow' package (pip install pyarrow)")
+
+# --- binary COPY ---
+
+def write_binary(conn, table_name, file_path, query=None, params=None):
+    cur = conn.cursor()
+    try:
+        select = cur.mogrify(query or f"SELECT * FROM {table_name}", params).decode()
+        with open_csv(file_path, 'wb') as f:
+            cur.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT binary)", f)
+        return cur.rowcount
+    finally:
+        cur.close()
+
+def copy_binary(cur, table_name, file_path):
+    # Binary COPY has no header, the file must hold every column of the
+    # table in table order (a full export, not a --columns projection)
+    with open_csv(file_path, 'rb') as f:
+        cur.copy_expert(f"COPY {table_name} FROM STDIN WITH (FORMAT binary)", f)
+    return cur.rowcount
+
+def stitch_binary(part_paths, file_path):
+    # Keep the first header and the last trailer, the tuples in between
+    # are self-delimiting
+    with open_csv(file_path, 'wb') as out:
+        for n, part_path in enumerate(part_paths):
+            with open_csv(part_path, 'rb') as part:
+                header = part.read(BINARY_HEADER)
+                header += part.read(int.from_bytes(header[-4:], 'big'))
+                if n == 0:
+                    out.write(header)
+                tail = b''
+                while True:
+                    chunk = part.read(1 << 20)
+                    if not chunk:
+                        break
+                    data = tail + chunk
+                    out.write(data[:-len(BINARY_TRAILER)])
+                    tail = data[-len(BINARY_TRAILER):]
+        out.write(BINARY_TRAILER)
+
+# --- Parquet ---
+
+def _arrow_type(type_code):
+    # PostgreSQL type oid -> arrow type; anything else is stored as text
+    return {
+        16: pyarrow.bool_(),
+        20: pyarrow.int64(), 21: pyarrow.int16(), 23: pyarrow.int32(),
+        700: pyarrow.float32(), 701: pyarrow.float64(),
+        1082: pyarrow.date32(), 1083: pyarrow.time64('us'),
+        1114: pyarrow.timestamp('us'), 1184: pyarrow.timestamp('us', tz='UTC'),
+    }.get(type_code, pyarrow.string())
+
+def _arrow_table(schema, rows):
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pyarrow.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pyarrow.array(values, type=field.type))
+    return pyarrow.Table.from_arrays(arrays, schema=schema)
+
+def write_parquet(conn, table_name, file_path, itersize, query=None, params=None):
+    _require_pyarrow()
+    cur = conn.cursor(name=f"export_{table_name}")
+    cur.itersize = itersize
+    writer = None
+    try:
+        cur.execute(query or f"SELECT * FROM {table_name}", params)
+        # Named cursors only expose description after the first fetch
+        rows = cur.fetchmany(itersize)
+        schema = pyarrow.schema([(desc[0], _arrow_type(desc[1])) for desc in cur.description])
+        writer = parquet.ParquetWriter(file_path, schema, compression=PARQUET_COMPRESSION)
+        row_count = 0
+        pending = []
+        while rows:
+            pending.extend(rows)
+            row_count += len(rows)
+            if len(pending) >= PARQUET_ROW_GROUP:
+                writer.write_table(_arrow_table(schema, pending))
+                pending = []
+            rows = cur.fetchmany(itersize)
+        if pending:
+            writer.write_table(_arrow_table(schema, pending))
+        return row_count
+    finally:
+        if writer is not None:
+            writer.close()
+        cur.close()
+
+def parquet_row_count(file_path):
+    _require_pyarrow()
+    return parquet.ParquetFile(file_path).metadata.num_rows
+
+def iter_parquet(file_path, batch_size=PARQUET_ROW_GROUP):
+    # Yields (column names, [row tuples]) one batch at a time
+    _require_pyarrow()
+    source = parquet.ParquetFile(file_path)
+    for batch in source.iter_batches(batch_size=batch_size):
+        yield batch.schema.names, list(zip(*(column.to_pylist() for column in batch.columns)))
+
+def stitch_parquet(part_paths, file_path):
+    _require_pyarrow()
+    writer = None
+    try:
+        for part_path in part_paths:
+            source = parquet.ParquetFile(part_path)
+            if writer is None:
+                writer = parquet.ParquetWriter(file_path, source.schema_arrow, compression=PARQUET_COMPRESSION)
+            for n in range(source.num_row_groups):
+                writer.write_table(source.read_row_group(n))
+    finally:
+        if writer is not None:
+            writer.close()
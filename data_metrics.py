@@ -0,0 +1,228 @@
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter, process_time
+from psycopg2 import extensions
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, peak RSS is reported as None
+    resource = None
+
+# Per-run timing. A RunMetrics is active while an import or export runs;
+# named spans (ImportMonitor stages such as "validate auth_user", table
+# resets, exports, commits; they may nest) record rows, bytes, wall and
+# CPU time and the peak RSS so far. A span still open when the run ends,
+# or closed by an exception, is kept and marked failed. At the end of the
+# run one JSON line is appended to METRICS_FILE. Connections from data_pool use TimedConnection,
+# so commits become spans and, with slow_sql set, slow statements are kept
+# with their row counts.
+
+METRICS_FILE = 'import_metrics.jsonl'
+# Slow statements kept per run; the rest are only counted
+SLOW_SQL_KEEP = 100
+SQL_TEXT_CHARS = 200
+
+_active = None
+_file_lock = threading.Lock()
+
+def _cpu_seconds():
+    # Process CPU time, including finished child processes (parallel
+    # validation and sharded export workers)
+    t = os.times()
+    return process_time() + t.children_user + t.children_system
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class Span:
+    """One timed phase; rows and bytes can be filled in before close()"""
+    def __init__(self, run, name, rows=None, bytes=None):
+        self.run = run
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+        self._wall = perf_counter()
+        self._cpu = _cpu_seconds()
+        if run is not None:
+            run._open_span(self)
+
+    def close(self, rows=None, bytes=None, failed=False):
+        if self.run is None:
+            return
+        if rows is not None:
+            self.rows = rows
+        if bytes is not None:
+            self.bytes = bytes
+        seconds = perf_counter() - self._wall
+        record = {
+            'name': self.name,
+            'start': round(self._wall - self.run.started, 3),
+            'seconds': round(seconds, 3),
+            'cpu_seconds': round(_cpu_seconds() - self._cpu, 3),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rows_per_sec': round(self.rows / seconds, 1) if self.rows and seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'failed': failed,
+        }
+        self.run._add_span(self, record)
+        self.run = None
+
+class RunMetrics:
+    """with RunMetrics('import', data_type='restaurant'): ... records one run.
+    slow_sql is a threshold in seconds, None to skip statement timing.
+    Callers that catch their own errors report them with set_outcome()."""
+    def __init__(self, command, path=METRICS_FILE, slow_sql=None, **info):
+        self.command = command
+        self.path = path
+        self.slow_sql = slow_sql
+        self.info = info
+        self.spans = []
+        self.exit_code = None
+        self.error = None
+        self._open = []
+        self.slow = []
+        self.slow_count = 0
+        self.record = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        global _active
+        self.started = perf_counter()
+        self._started_at = datetime.now()
+        self._cpu = _cpu_seconds()
+        _active = self
+        return self
+
+    def set_outcome(self, exit_code, error=None):
+        self.exit_code = exit_code
+        self.error = error
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        for current in list(self._open):
+            current.close(failed=True)
+        _active = None
+        self.record = {
+            'command': self.command,
+            'started': self._started_at.isoformat(timespec='seconds'),
+            'seconds': round(perf_counter() - self.started, 3),
+            'cpu_seconds': round(_cpu_seconds() - self._cpu, 3),
+            'peak_rss_mb': peak_rss_mb(),
+            'ok': exc_type is None and self.error is None and not self.exit_code,
+            'exit_code': self.exit_code,
+            'error': str(exc) if exc is not None else self.error,
+        }
+        self.record.update(self.info)
+        self.record['spans'] = sorted(self.spans, key=lambda s: s['start'])
+        if self.slow_sql is not None:
+            self.record['slow_sql'] = self.slow
+            self.record['slow_sql_count'] = self.slow_count
+        if self.path:
+            write_metrics(self.record, self.path)
+        return False
+
+    def _open_span(self, current):
+        with self._lock:
+            self._open.append(current)
+
+    def _add_span(self, current, record):
+        with self._lock:
+            self._open.remove(current)
+            self.spans.append(record)
+
+    def _add_sql(self, query, seconds, rows):
+        with self._lock:
+            self.slow_count += 1
+            if len(self.slow) < SLOW_SQL_KEEP:
+                self.slow.append({'sql': ' '.join(query.split())[:SQL_TEXT_CHARS],
+                                  'seconds': round(seconds, 3), 'rows': rows})
+
+def start_span(name, rows=None, bytes=None):
+    # A Span of the active run; without one, close() does nothing
+    return Span(_active, name, rows, bytes)
+
+@contextmanager
+def span(name, rows=None, bytes=None):
+    current = start_span(name, rows, bytes)
+    try:
+        yield current
+    except BaseException:
+        current.close(failed=True)
+        raise
+    current.close()
+
+def write_metrics(record, path=METRICS_FILE):
+    with _file_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+def read_metrics(path=METRICS_FILE, last=None):
+    # Run records, oldest first; last=n keeps only the newest n
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return records[-last:] if last else records
+
+def format_metrics(record):
+    # One line per span, for dialogs and log windows
+    lines = []
+    for s in record['spans']:
+        line = f"{s['name']}: {s['seconds']:.2f} s (cpu {s['cpu_seconds']:.2f} s)"
+        if s['rows'] is not None:
+            line += f", {s['rows']} rows"
+        if s['rows_per_sec']:
+            line += f", {s['rows_per_sec']:,.0f} rows/s"
+        if s.get('failed'):
+            line += ", failed"
+        lines.append(line)
+    total = f"total: {record['seconds']:.2f} s (cpu {record['cpu_seconds']:.2f} s)"
+    if record['peak_rss_mb'] is not None:
+        total += f", peak RSS {record['peak_rss_mb']:.0f} MB"
+    lines.append(total)
+    if record.get('slow_sql_count'):
+        lines.append(f"{record['slow_sql_count']} slow SQL statement(s) in the metrics file")
+    return lines
+
+# --- connection and cursor classes for data_pool ---
+
+def _timed(cursor, method, query, *args):
+    start = perf_counter()
+    try:
+        return method(query, *args)
+    finally:
+        run = _active
+        if run is not None and run.slow_sql is not None:
+            seconds = perf_counter() - start
+            if seconds >= run.slow_sql:
+                run._add_sql(query if isinstance(query, str) else query.decode(errors='replace'),
+                             seconds, cursor.rowcount)
+
+class TimedCursor(extensions.cursor):
+    def execute(self, query, vars=None):
+        return _timed(self, super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return _timed(self, super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return _timed(self, super().copy_expert, sql, file, size)
+
+class TimedConnection(extensions.connection):
+    """Hands out TimedCursors and records each commit as a span"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = TimedCursor
+
+    def commit(self):
+        with span("commit"):
+            return super().commit()
@@ -0,0 +1,186 @@
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from data_schema import compile_schema
+
+# Multi-process validation for very large CSV files. The file is cut into
+# byte ranges that start on record boundaries (outside quoted fields, so
+# multi-line `menu` values are never split), each range is validated in a
+# worker process, and the cross-chunk uniqueness checks are merged here.
+
+# Target size of one chunk handed to a worker process
+PARALLEL_CHUNK_BYTES = 8 * 1024 * 1024
+READ_BLOCK_BYTES = 1024 * 1024
+
+def split_csv_records(file_path, chunk_bytes=None):
+    # Returns (header_end, ranges) where ranges are (start, end, first_row)
+    # byte ranges aligned to record boundaries. first_row is the row number
+    # of the range's first record, counted the same way as
+    # enumerate(reader, start=2) over the data rows.
+    chunk_bytes = chunk_bytes or PARALLEL_CHUNK_BYTES
+    header_end = None
+    target = None
+    records = 0
+    boundaries = []
+    in_quotes = False
+    offset = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(READ_BLOCK_BYTES)
+            if not block:
+                break
+            segments = block.split(b'"')
+            last = len(segments) - 1
+            pos = offset
+            for k, segment in enumerate(segments):
+                # Newlines only end a record outside quotes; "" escapes
+                # toggle twice and cancel out
+                if not in_quotes and b'\n' in segment:
+                    seg_end = pos + len(segment)
+                    if header_end is None or target <= seg_end:
+                        # Walk this segment newline by newline, it holds a cut
+                        i = segment.find(b'\n')
+                        while i >= 0:
+                            records += 1
+                            at = pos + i + 1
+                            if header_end is None:
+                                header_end = at
+                                target = at + chunk_bytes
+                            elif at >= target:
+                                boundaries.append((at, records))
+                                target = at + chunk_bytes
+                            i = segment.find(b'\n', i + 1)
+                    else:
+                        records += segment.count(b'\n')
+                if k < last:
+                    in_quotes = not in_quotes
+                    pos += len(segment) + 1
+            offset += len(block)
+    size = offset
+    if header_end is None:
+        return size, []
+
+    ranges = []
+    start, first_row = header_end, 2
+    for at, records_before in boundaries:
+        if at > start:
+            ranges.append((start, at, first_row))
+        start, first_row = at, records_before + 1
+    if size > start:
+        ranges.append((start, size, first_row))
+    return header_end, ranges
+
+def read_header(file_path, header_end, encoding='utf-8'):
+    with open(file_path, 'rb') as f:
+        text = f.read(header_end).decode(encoding)
+    return next(csv.reader(io.StringIO(text, newline='')), [])
+
+def validate_chunk(file_path, table, header, start, end, first_row, encoding='utf-8', with_id=False):
+    # Worker entry point. Uniqueness is not checked here; every row's unique
+    # values are returned for the parent to merge in file order.
+    schema = compile_schema(table, header)
+    id_pos = schema.positions.get('id')
+    key_pos = schema.key_pos
+    # Shared values also stay shared when the rows are pickled back
+    cache = schema.new_cache()
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    rows = []
+    errors = []
+    uniques = []
+    count = 0
+    for row_no, row in enumerate(csv.reader(io.StringIO(text, newline='')), start=first_row):
+        count += 1
+        values, row_errors = schema.convert(row, row_no, None, cache)
+        errors.extend((row_no, e) for e in row_errors)
+        if values is None:
+            continue
+        row_id = row[id_pos] if with_id else None
+        key = row[key_pos] if key_pos is not None else ''
+        uniques.append((row_no, row_id, key, schema.unique_values(row)))
+        if not row_errors:
+            rows.append((row_no, row_id, values))
+    return rows, errors, uniques, count
+
+def _run_chunks(file_path, table, header, ranges, encoding, with_id, workers, monitor, max_errors=None):
+    # Stops early, leaving None for unvalidated chunks, once max_errors
+    # errors have been found
+    args = [(file_path, table, header, start, end, first_row, encoding, with_id)
+            for start, end, first_row in ranges]
+    failed = 0
+    if len(args) <= 1 or workers <= 1:
+        results = []
+        for a in args:
+            results.append(validate_chunk(*a))
+            monitor.advance(results[-1][3])
+            failed += len(results[-1][1])
+            if max_errors and failed >= max_errors:
+                break
+        return results
+
+    results = [None] * len(args)
+    # spawn, not fork: validation is started from a GUI worker thread and
+    # forking a threaded Tk process is unsafe
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(args)),
+                                   mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = {executor.submit(validate_chunk, *a): n for n, a in enumerate(args)}
+        for future in as_completed(futures):
+            n = futures[future]
+            results[n] = future.result()
+            monitor.advance(results[n][3])
+            failed += len(results[n][1])
+            if max_errors and failed >= max_errors:
+                break
+    finally:
+        # Drop queued chunks if we stopped early (cancel, worker error or
+        # too many errors)
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+def validate_parallel(file_path, table, monitor, workers=None, chunk_bytes=None,
+                      encoding='utf-8', sort_by_id=False, max_errors=None):
+    # Returns (valid, rows, errors) like the sequential validators. Errors
+    # keep their original row numbers and are ordered by row. With
+    # max_errors the remaining chunks are skipped once that many are found.
+    workers = workers or os.cpu_count() or 1
+    header_end, ranges = split_csv_records(file_path, chunk_bytes)
+    header = read_header(file_path, header_end, encoding)
+    schema = compile_schema(table, header)
+    results = _run_chunks(file_path, table, header, ranges, encoding, sort_by_id, workers, monitor, max_errors)
+    results = [result for result in results if result is not None]
+
+    rows = []
+    errors = []
+    uniques = []
+    for chunk_rows, chunk_errors, chunk_uniques, _ in results:
+        rows.extend(chunk_rows)
+        errors.extend(chunk_errors)
+        uniques.extend(chunk_uniques)
+
+    if sort_by_id:
+        # Sort rows by 'id' in ascending order, as the sequential path does
+        try:
+            rows.sort(key=lambda r: int(r[1]))
+            uniques.sort(key=lambda u: int(u[1]))
+        except ValueError as e:
+            errors.insert(0, (0, f"Error sorting by ID: {str(e)}"))
+
+    # Cross-chunk uniqueness, replayed in (sorted) file order
+    seen = [set() for _ in schema.unique_specs]
+    for row_no, _, key, values in uniques:
+        for n, ((_, name, mode, _), raw) in enumerate(zip(schema.unique_specs, values)):
+            if raw is None:
+                continue
+            seen_value = raw.lower() if mode == 'casefold' else raw
+            if seen_value in seen[n]:
+                errors.append((row_no, schema.duplicate_message(name, mode, row_no, raw, key)))
+            else:
+                seen[n].add(seen_value)
+
+    errors.sort(key=lambda e: e[0])
+    messages = [message for _, message in errors]
+    return (len(messages) == 0, [values for _, _, values in rows], messages)
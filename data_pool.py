@@ -0,0 +1,137 @@
+import configparser
+import os
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import extensions, pool
+from data_metrics import TimedConnection
+
+# One connection pool per process, shared by the GUI, its background
+# workers and the CLI. Settings come from, in increasing priority:
+# the defaults below, the [database] section of dishdb.ini (or the file
+# named by DISHDB_CONFIG) and DISHDB_* environment variables.
+
+DEFAULT_SETTINGS = {
+    'host': 'localhost',
+    'port': '5432',
+    'dbname': 'dishdb',
+    'user': 'postgres',
+    # No default: it has to come from dishdb.ini or DISHDB_PASSWORD. An
+    # empty value is allowed, for servers that do not ask for one.
+    'password': None,
+    'pool_min': '1',
+    'pool_max': '8',
+    # Seconds to wait for a free connection before giving up
+    'pool_timeout': '30',
+}
+CONFIG_FILE = 'dishdb.ini'
+CONNECT_KEYS = ('host', 'port', 'dbname', 'user', 'password')
+
+def load_settings(config_path=None):
+    settings = dict(DEFAULT_SETTINGS)
+    config_path = config_path or os.environ.get('DISHDB_CONFIG', CONFIG_FILE)
+    parser = configparser.ConfigParser()
+    if parser.read(config_path) and parser.has_section('database'):
+        settings.update(parser['database'])
+    for key in settings:
+        value = os.environ.get(f"DISHDB_{key.upper()}")
+        if value is not None:
+            settings[key] = value
+    return settings
+
+def connect_args(settings):
+    # The psycopg2.connect() keywords out of a settings dict
+    if settings.get('password') is None:
+        raise Exception(f"No database password: set password in the [database] section of "
+                        f"{CONFIG_FILE} or the DISHDB_PASSWORD environment variable")
+    return {key: settings[key] for key in CONNECT_KEYS}
+
+def connect(settings=None):
+    # A standalone connection, for processes that cannot share the pool
+    settings = settings or load_settings()
+    return psycopg2.connect(connection_factory=TimedConnection, **connect_args(settings))
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool that waits for a free connection"""
+    def __init__(self, settings=None):
+        settings = settings or load_settings()
+        # Kept so worker processes can open their own connections
+        self.settings = settings
+        self.maxconn = int(settings['pool_max'])
+        self.timeout = float(settings['pool_timeout'])
+        # ThreadedConnectionPool raises when exhausted; the semaphore makes
+        # callers queue for a connection instead
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._pool = pool.ThreadedConnectionPool(
+            int(settings['pool_min']), self.maxconn, connection_factory=TimedConnection,
+            **connect_args(settings)
+        )
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise Exception(f"No database connection free after {self.timeout:g} seconds")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def _checkout(self):
+        # A server restart or idle timeout leaves dead connections in the
+        # pool; ping before handing one out and replace it if needed
+        for attempt in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if not conn.closed and self._healthy(conn):
+                return conn
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Could not get a working database connection")
+
+    def _healthy(self, conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def _checkin(self, conn):
+        if conn.closed:
+            self._pool.putconn(conn, close=True)
+            return
+        # Never hand the next caller a half-finished transaction
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._pool.putconn(conn, close=True)
+                return
+        self._pool.putconn(conn)
+
+    def close(self):
+        self._pool.closeall()
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+def get_pool():
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool()
+        return _shared_pool
+
+def connection():
+    # with connection() as conn: ... borrows from the shared pool
+    return get_pool().connection()
+
+def close_pool():
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is not None:
+            _shared_pool.close()
+            _shared_pool = None
@@ -0,0 +1,349 @@
+import csv
+import hashlib
+import io
+import json
+import locale
+import os
+import psycopg2
+from psycopg2.extras import execute_values
+from data_core import ImportMonitor, USER_PAGE_SIZE, _collector, _no_log, defer_indexes, rebuild_indexes
+from data_errors import ErrorBudgetExceeded, RowError
+from data_metrics import span
+from data_compress import is_compressed
+from data_parallel import split_csv_records, read_header
+from data_schema import ADMIN_USER, RESTAURANT, AUTH_USER, FOODIE_CONTACT, compile_schema
+
+# Resumable imports for very large files. The CSV is cut into record
+# aligned batches which are converted and committed one at a time into an
+# UNLOGGED staging table, and a checkpoint file next to the CSV records the
+# byte offset and row number after the last committed batch. After a
+# dropped connection, a cancel or a bad row the next run carries on from
+# there; only the final move into the live table is one transaction.
+
+RESUME_BATCH_BYTES = 4 * 1024 * 1024
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+HASH_BLOCK_BYTES = 1024 * 1024
+
+def checkpoint_file(file_path):
+    return file_path + CHECKPOINT_SUFFIX
+
+class ResumableStage:
+    """One CSV file staged batch by batch, with its checkpoint"""
+    def __init__(self, conn, file_path, table_name, encoding='utf-8', batch_bytes=None,
+                 checkpoint_path=None, log=_no_log):
+        if is_compressed(file_path):
+            raise Exception("Resumable imports need an uncompressed CSV file")
+        self.conn = conn
+        self.file_path = file_path
+        self.table_name = table_name
+        self.stage = f"{table_name[:48]}_import_stage"
+        self.encoding = encoding
+        self.checkpoint_path = checkpoint_path or checkpoint_file(file_path)
+        self.log = log
+        self.header_end, self.ranges = split_csv_records(file_path, batch_bytes or RESUME_BATCH_BYTES)
+        self.header = read_header(file_path, self.header_end, encoding)
+        self.columns = None
+        self.rows = 0
+        self._offset = self.header_end
+        self._next_row = 2
+        self._hash = None
+
+    def prepare(self, columns):
+        # Pick up the checkpoint if it still matches the file and the
+        # staging table, otherwise start with an empty staging table
+        self.columns = list(columns)
+        checkpoint = self._resume_point()
+        if checkpoint:
+            self._offset, self.rows = checkpoint['offset'], checkpoint['rows']
+            self._next_row = checkpoint['row']
+            self.log(f"Resuming {self.table_name} at row {checkpoint['row']} "
+                     f"({self.rows} rows already staged)", "info")
+            return
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {self.stage}")
+                # Column types of the live table without its constraints,
+                # defaults or indexes
+                cur.execute(f"CREATE UNLOGGED TABLE {self.stage} AS "
+                            f"SELECT {', '.join(self.columns)} FROM {self.table_name} WITH NO DATA")
+                cur.execute(f"ALTER TABLE {self.stage} ADD COLUMN import_row integer, "
+                            f"ADD COLUMN import_key bigint")
+        self._hash = self._prefix_hash(self.header_end)
+        self._offset = self.header_end
+        self._next_row = 2
+        self.rows = 0
+        self._save()
+
+    def _resume_point(self):
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        if checkpoint.get('table') != self.table_name or checkpoint.get('columns') != self.columns:
+            return None
+        # Rows after the checkpoint may have been fixed, the part already
+        # staged must be byte for byte the same
+        offset = checkpoint['offset']
+        if offset > os.path.getsize(self.file_path):
+            return None
+        self._hash = self._prefix_hash(offset)
+        if self._hash.hexdigest() != checkpoint['prefix_sha256']:
+            self.log(f"{self.file_path} changed before the checkpoint, starting over", "info")
+            return None
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT to_regclass(%s)", (self.stage,))
+                if cur.fetchone()[0] is None:
+                    return None
+                # A batch committed just before a crash, without its
+                # checkpoint, is staged again
+                cur.execute(f"DELETE FROM {self.stage} WHERE import_row >= %s", (checkpoint['row'],))
+                cur.execute(f"SELECT count(*) FROM {self.stage}")
+                # Crash recovery empties UNLOGGED tables
+                if cur.fetchone()[0] != checkpoint['rows']:
+                    return None
+        return checkpoint
+
+    def _prefix_hash(self, offset):
+        digest = hashlib.sha256()
+        with open(self.file_path, 'rb') as f:
+            remaining = offset
+            while remaining > 0:
+                block = f.read(min(HASH_BLOCK_BYTES, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+        return digest
+
+    def _save(self):
+        checkpoint = {
+            'file': os.path.abspath(self.file_path),
+            'table': self.table_name,
+            'columns': self.columns,
+            'offset': self._offset,
+            'row': self._next_row,
+            'rows': self.rows,
+            'prefix_sha256': self._hash.hexdigest(),
+        }
+        # Write-then-rename so a crash never leaves a half-written file
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def staged_values(self, column):
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute(f"SELECT {column} FROM {self.stage} WHERE {column} IS NOT NULL")
+                return [value for (value,) in cur.fetchall()]
+
+    def load(self, convert, monitor=None, errors=None):
+        # convert(row, row_no) -> (values, sort key, errors). Returns an
+        # ErrorCollector with the errors of the first batch that has any;
+        # earlier batches stay staged and the checkpoint points at the bad
+        # batch.
+        monitor = monitor or ImportMonitor()
+        errors = _collector(errors, self.file_path)
+        monitor.begin(f"stage {self.table_name}")
+        monitor.advance(self.rows)
+        query = (f"INSERT INTO {self.stage} ({', '.join(self.columns)}, import_row, import_key) "
+                 f"VALUES %s")
+        with open(self.file_path, 'rb') as f:
+            for start, end, first_row in self.ranges:
+                if end <= self._offset:
+                    continue
+                if start < self._offset:
+                    # Rows were appended to a file that had been fully
+                    # staged; the checkpoint is always on a record boundary
+                    start, first_row = self._offset, self._next_row
+                monitor.check()
+                f.seek(start)
+                data = f.read(end - start)
+                batch = []
+                next_row = first_row
+                try:
+                    with errors:
+                        for row in csv.reader(io.StringIO(data.decode(self.encoding), newline='')):
+                            values, key, row_errors = convert(row, next_row)
+                            errors.extend(row_errors)
+                            if not row_errors:
+                                batch.append(tuple(values) + (next_row, key))
+                            next_row += 1
+                except ErrorBudgetExceeded:
+                    pass
+                if errors:
+                    return errors
+                try:
+                    with self.conn:
+                        with self.conn.cursor() as cur:
+                            if batch:
+                                execute_values(cur, query, batch, page_size=USER_PAGE_SIZE)
+                except psycopg2.Error as e:
+                    raise Exception(f"Rows {first_row}-{next_row - 1}: {e.pgerror or e}") from e
+                self._hash.update(data)
+                self._offset = end
+                self._next_row = next_row
+                self.rows += len(batch)
+                self._save()
+                monitor.advance(len(batch))
+        monitor.finish()
+        return errors
+
+    def drop(self, cur):
+        cur.execute(f"DROP TABLE IF EXISTS {self.stage}")
+
+    def remove_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+def _schema_converter(stage, schema, sort_by_id=False):
+    # The unique checks carry on from the values already staged; unique
+    # columns are all text and stored exactly as read
+    state = schema.new_state()
+    for (name, mode), seen in state.items():
+        for value in stage.staged_values(name):
+            seen.add(value.lower() if mode == 'casefold' else value)
+    id_pos = schema.positions['id'] if sort_by_id else None
+    cache = schema.new_cache()
+
+    def convert(row, row_no):
+        values, errors = schema.convert(row, row_no, state, cache)
+        key = row_no
+        if id_pos is not None and values is not None:
+            # Users are loaded in id order, as the other importers do
+            try:
+                key = int(row[id_pos])
+            except ValueError as e:
+                errors = errors + [f"Error sorting by ID: {str(e)}"]
+        return values, key, errors
+    return convert
+
+def _replace_from_stage(cur, stage, extra=(), join=''):
+    # extra: [(column, expression)] filled from the joined tables
+    table_name = stage.table_name
+    columns = stage.columns + [column for column, _ in extra]
+    selected = [f"s.{c}" for c in stage.columns] + [expression for _, expression in extra]
+    with span(f"reset {table_name}"):
+        cur.execute(f"DELETE FROM {table_name}")
+        cur.execute(f"ALTER SEQUENCE {table_name}_id_seq RESTART WITH 1")
+    cur.execute(f"""
+        INSERT INTO {table_name} ({', '.join(columns)})
+        SELECT {', '.join(selected)}
+        FROM {stage.stage} s {join}
+        ORDER BY s.import_key
+    """)
+    return cur.rowcount
+
+def _import_schema_resumable(conn, schema, file_path, log, monitor, bulk, checkpoint_path, batch_bytes, errors):
+    stage = ResumableStage(conn, file_path, schema.table, batch_bytes=batch_bytes,
+                           checkpoint_path=checkpoint_path, log=log)
+    compiled = compile_schema(schema.table, stage.header)
+    stage.prepare(schema.insert_columns)
+    errors = stage.load(_schema_converter(stage, compiled), monitor, errors)
+    if errors:
+        return (False, stage.rows, errors)
+    with conn:
+        with conn.cursor() as cur:
+            dropped = defer_indexes(cur, [schema.table], log) if bulk else []
+            row_count = _replace_from_stage(cur, stage)
+            rebuild_indexes(cur, dropped, log)
+            stage.drop(cur)
+    stage.remove_checkpoint()
+    log(f"Imported {row_count} records to {schema.table} table", "info")
+    return (True, row_count, errors)
+
+def import_admin_resumable(conn, file_path, log=_no_log, monitor=None, bulk=False,
+                           checkpoint_path=None, batch_bytes=None, errors=None):
+    return _import_schema_resumable(conn, ADMIN_USER, file_path, log, monitor, bulk,
+                                    checkpoint_path, batch_bytes, errors)
+
+def import_restaurant_resumable(conn, file_path, log=_no_log, monitor=None, bulk=False,
+                                checkpoint_path=None, batch_bytes=None, errors=None):
+    # Returns (valid, row_count, errors); while not valid row_count is
+    # the number of rows staged so far. errors is an ErrorCollector, by
+    # default reporting next to the file.
+    return _import_schema_resumable(conn, RESTAURANT, file_path, log, monitor, bulk,
+                                    checkpoint_path, batch_bytes, errors)
+
+def import_users_resumable(conn, auth_file, foodie_file, log=_no_log, monitor=None, bulk=False,
+                           batch_bytes=None, errors=None):
+    # Both files get their own checkpoint; foodie_contact rows are matched
+    # to auth_user in SQL once both are staged. One ErrorCollector covers
+    # both files, by default reporting next to auth_file.
+    encoding = locale.getpreferredencoding(False)
+    errors = _collector(errors, auth_file)
+    auth_stage = ResumableStage(conn, auth_file, AUTH_USER.table, encoding, batch_bytes, log=log)
+    auth_schema = compile_schema(AUTH_USER.table, auth_stage.header)
+    auth_stage.prepare(AUTH_USER.insert_columns)
+    auth_stage.load(_schema_converter(auth_stage, auth_schema, sort_by_id=True), monitor, errors)
+    if errors:
+        return (False, (auth_stage.rows, 0), errors)
+
+    foodie_stage = ResumableStage(conn, foodie_file, FOODIE_CONTACT.table, encoding, batch_bytes, log=log)
+    foodie_schema = compile_schema(FOODIE_CONTACT.table, foodie_stage.header)
+    foodie_stage.prepare(FOODIE_CONTACT.insert_columns)
+    foodie_stage.load(_schema_converter(foodie_stage, foodie_schema, sort_by_id=True), monitor, errors)
+    if errors:
+        return (False, (auth_stage.rows, foodie_stage.rows), errors)
+
+    with conn:
+        with conn.cursor() as cur:
+            limit = f"LIMIT {errors.budget}" if errors.budget else ""
+            cur.execute(f"""
+                SELECT s.import_row, s.foodie_name FROM {foodie_stage.stage} s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {auth_stage.stage} a WHERE lower(a.username) = lower(s.foodie_name)
+                )
+                ORDER BY s.import_row {limit}
+            """)
+            try:
+                with errors:
+                    for row_no, name in cur.fetchall():
+                        errors.append(RowError(FOODIE_CONTACT.messages['reference'].format(key=name),
+                                               'reference', row_no))
+            except ErrorBudgetExceeded:
+                pass
+            if errors:
+                return (False, (auth_stage.rows, foodie_stage.rows), errors)
+
+            dropped = defer_indexes(cur, ['auth_user', 'foodie_contact'], log) if bulk else []
+            cur.execute("DELETE FROM foodie_contact")
+            auth_count = _replace_from_stage(cur, auth_stage)
+            foodie_count = _replace_from_stage(
+                cur, foodie_stage, [('user_id', 'a.id')],
+                "JOIN auth_user a ON lower(a.username) = lower(s.foodie_name)")
+            rebuild_indexes(cur, dropped, log)
+            foodie_stage.drop(cur)
+            auth_stage.drop(cur)
+    auth_stage.remove_checkpoint()
+    foodie_stage.remove_checkpoint()
+    log(f"Imported {auth_count} records to auth_user table", "info")
+    log(f"Imported {foodie_count} records to foodie_contact table", "info")
+    return (True, (auth_count, foodie_count), errors)
+
+def import_csv_resumable(conn, table_name, file_path, log=_no_log, monitor=None, bulk=False,
+                         checkpoint_path=None, batch_bytes=None):
+    # Raw variant behind DatabaseManager.import_csv: values go in as text
+    # and PostgreSQL casts them, as in the per-row path
+    stage = ResumableStage(conn, file_path, table_name, batch_bytes=batch_bytes,
+                           checkpoint_path=checkpoint_path, log=log)
+    headers = list(stage.header)
+    id_index = headers.index('id') if 'id' in headers else None
+
+    def convert(row, row_no):
+        if id_index is not None and len(row) > id_index:
+            row.pop(id_index)
+        return row, row_no, []
+
+    stage.prepare([h for h in headers if h != 'id'])
+    stage.load(convert, monitor)
+    with conn:
+        with conn.cursor() as cur:
+            dropped = defer_indexes(cur, [table_name], log) if bulk else []
+            row_count = _replace_from_stage(cur, stage)
+            rebuild_indexes(cur, dropped, log)
+            stage.drop(cur)
+    stage.remove_checkpoint()
+    return row_count
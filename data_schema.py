@@ -0,0 +1,462 @@
+import os
+from datetime import datetime, time
+from functools import lru_cache
+from data_errors import RowError
+
+# Declarative schemas for the four tables the data manager imports.
+# Each schema is compiled once per CSV header into a CompiledSchema that
+# knows every column position up front and holds one converter per field,
+# so validating a row is a single linear pass over its columns.
+
+class HeaderError(Exception):
+    """Raised when a CSV header does not match the expected columns"""
+    pass
+
+class FieldError(Exception):
+    """Raised by a converter; `kind` selects the schema's message template"""
+    def __init__(self, kind, **extra):
+        super().__init__(kind)
+        self.kind = kind
+        self.extra = extra
+
+class Field:
+    def __init__(self, name, kind='text', required=False, unique=(), insert=True,
+                 blank_to_none=False, truthy=('TRUE',), falsy=('FALSE',),
+                 default=None, formats=(), to_local=False, repeated=False):
+        self.name = name
+        # text, bool, number, photo, datetime, date or time
+        self.kind = kind
+        self.required = required
+        # 'exact' and/or 'casefold' uniqueness across the file
+        self.unique = unique
+        self.insert = insert
+        self.blank_to_none = blank_to_none
+        self.truthy = truthy
+        self.falsy = falsy
+        self.default = default
+        self.formats = formats
+        self.to_local = to_local
+        # Few distinct values across many rows (categories, shared
+        # timestamps): each import converts a value once and shares it
+        self.repeated = repeated
+
+class TableSchema:
+    def __init__(self, table, fields, insert_columns=None, time_groups=(),
+                 key_field=None, messages=None, strict_header=True,
+                 natural_key=None, casefold_key=False, watermark=()):
+        self.table = table
+        self.fields = fields
+        self.columns = [f.name for f in fields]
+        self.insert_columns = insert_columns or [f.name for f in fields if f.insert]
+        # (flag, open, close) triples; open/close are required when flag is TRUE
+        self.time_groups = time_groups
+        # Column used as {key} in messages (e.g. the username)
+        self.key_field = key_field
+        self.messages = dict(BASE_MESSAGES)
+        self.messages.update(messages or {})
+        # Strict schemas need the header to match `columns` exactly, the
+        # others only need every column to be present in any order
+        self.strict_header = strict_header
+        # Column identifying a row across reloads (compared lower-cased
+        # when casefold_key is set), used by delta imports
+        self.natural_key = natural_key
+        self.casefold_key = casefold_key
+        # Columns whose greatest value says when a row last changed, used
+        # by incremental exports
+        self.watermark = watermark
+
+    def field(self, name):
+        for f in self.fields:
+            if f.name == name:
+                return f
+        raise KeyError(name)
+
+    def required_fields(self):
+        return [f.name for f in self.fields if f.required]
+
+    def fields_of_kind(self, kind):
+        return [f.name for f in self.fields if f.kind == kind]
+
+    def insert_position(self, name):
+        return self.insert_columns.index(name)
+
+    def key_sql(self, alias=None):
+        key = f"{alias}.{self.natural_key}" if alias else self.natural_key
+        return f"lower({key})" if self.casefold_key else key
+
+BASE_MESSAGES = {
+    'header': "Header mismatch. Expected: {expected}, got: {header}",
+    'columns': "Row {row}: Incorrect number of columns",
+    'missing': "Row {row}: {field} is missing",
+    'duplicate': "Row {row}: Duplicate {field} {value}",
+    'duplicate_casefold': "Row {row}: Duplicate {field} (case-insensitive) {value}",
+    'bool': "Row {row}: {field} must be 'TRUE' or 'FALSE'",
+    'number': "Row {row}: {field} must be a number",
+    'photo_ext': "Row {row}: {field} has invalid file extension",
+    'datetime': "Row {row}: {field} has invalid ISO format",
+    'date': "Row {row}: {field} has invalid format (expected dd/mm/yyyy)",
+    'time_required': "Row {row}: {open} and {close} are required when {flag} is TRUE",
+    'time': "Row {row}: {open} or {close} has invalid time format",
+}
+
+PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+PHOTO_BLANKS = ('', 'none', 'null')
+
+# ---- converters ----
+
+def _text_converter(field):
+    required, blank_to_none = field.required, field.blank_to_none
+    def convert(raw):
+        if not raw.strip():
+            if required:
+                raise FieldError('missing')
+            if blank_to_none:
+                return None
+        return raw
+    return convert
+
+def _bool_converter(field):
+    lookup = {v: True for v in field.truthy}
+    lookup.update({v: False for v in field.falsy})
+    def convert(raw):
+        try:
+            return lookup[raw.strip().upper()]
+        except KeyError:
+            raise FieldError('bool')
+    return convert
+
+def _number_converter(field):
+    def convert(raw):
+        if not raw.strip():
+            raise FieldError('missing')
+        try:
+            return float(raw)
+        except ValueError:
+            raise FieldError('number')
+    return convert
+
+def _photo_converter(field):
+    default = field.default
+    def convert(raw):
+        value = raw.strip()
+        if value.lower() in PHOTO_BLANKS:
+            return default
+        ext = os.path.splitext(value)[1].lower()
+        if ext not in PHOTO_EXTENSIONS:
+            raise FieldError('photo_ext', ext=ext)
+        return value
+    return convert
+
+def _datetime_converter(field):
+    to_local = field.to_local
+    def convert(raw):
+        if not raw.strip():
+            raise FieldError('missing')
+        try:
+            value = datetime.fromisoformat(raw)
+        except ValueError:
+            raise FieldError('datetime')
+        if to_local:
+            value = value.astimezone().replace(tzinfo=None)
+        return value
+    return convert
+
+def _date_converter(field):
+    formats = field.formats
+    def convert(raw):
+        if not raw.strip():
+            raise FieldError('missing')
+        for fmt in formats:
+            try:
+                return datetime.strptime(raw, fmt)
+            except ValueError:
+                pass
+        raise FieldError('date')
+    return convert
+
+def parse_time(raw):
+    # Normalize time format to HH:MM, adding a leading zero if needed
+    value = raw.strip()
+    if len(value.split(':')[0]) == 1:
+        value = '0' + value
+    return time.fromisoformat(value)
+
+# Distinct values remembered per column and per import
+VALUE_CACHE_SIZE = 4096
+
+class ValueCache:
+    """Per-import memo for the repeated columns of one compiled schema.
+    Equal raw strings convert to one shared object, so categorical text is
+    interned and timestamps/times are parsed once; hit counts are kept."""
+    def __init__(self, compiled):
+        self._cached = {}
+        self.steps = []
+        for pos, out, field, convert in compiled.steps:
+            if field.repeated:
+                convert = self._cached[field.name] = lru_cache(maxsize=VALUE_CACHE_SIZE)(convert)
+            self.steps.append((pos, out, field, convert))
+        self.parse_time = parse_time
+        if compiled.groups:
+            self.parse_time = self._cached['opening hours'] = lru_cache(maxsize=VALUE_CACHE_SIZE)(parse_time)
+
+    def stats(self):
+        # {column: {'hits', 'misses', 'hit_rate'}}
+        result = {}
+        for name, cached in self._cached.items():
+            info = cached.cache_info()
+            lookups = info.hits + info.misses
+            result[name] = {
+                'hits': info.hits,
+                'misses': info.misses,
+                'hit_rate': round(info.hits / lookups, 3) if lookups else 0.0,
+            }
+        return result
+
+CONVERTERS = {
+    'text': _text_converter,
+    'bool': _bool_converter,
+    'number': _number_converter,
+    'photo': _photo_converter,
+    'datetime': _datetime_converter,
+    'date': _date_converter,
+}
+
+class CompiledSchema:
+    def __init__(self, schema, header):
+        self.schema = schema
+        self.header = list(header)
+        self.width = len(header)
+        self.messages = schema.messages
+        positions = {name: i for i, name in enumerate(header)}
+        self.positions = positions
+        out_positions = {name: i for i, name in enumerate(schema.insert_columns)}
+        self.out_width = len(schema.insert_columns)
+        self.key_pos = positions.get(schema.key_field)
+
+        # One step per converted column: (csv pos, output pos or None, field, converter)
+        self.steps = []
+        for field in schema.fields:
+            if field.kind == 'time':
+                continue
+            step = (positions[field.name], out_positions.get(field.name), field,
+                    CONVERTERS[field.kind](field))
+            self.steps.append(step)
+        # (csv pos, field name, mode, required) for every uniqueness rule
+        self.unique_specs = [
+            (pos, field.name, mode, field.required)
+            for pos, _, field, _ in self.steps for mode in field.unique
+        ]
+        self.groups = [
+            (out_positions[flag], positions[open_field], positions[close_field],
+             out_positions[open_field], out_positions[close_field], flag, open_field, close_field)
+            for flag, open_field, close_field in schema.time_groups
+        ]
+
+    def new_cache(self):
+        return ValueCache(self)
+
+    def new_state(self):
+        # Values seen so far for the unique checks, per (field, mode)
+        return {(field.name, mode): set() for _, _, field, _ in self.steps for mode in field.unique}
+
+    def message(self, kind, **values):
+        # The message text, tagged with its kind as the error category
+        return RowError(self.messages[kind].format(**values), kind, values.get('row'))
+
+    def unique_values(self, row):
+        # Raw values of the unique columns (None where a required one is
+        # blank), used to merge uniqueness checks done elsewhere
+        return tuple(
+            None if required and not row[pos].strip() else row[pos]
+            for pos, _, _, required in self.unique_specs
+        )
+
+    def duplicate_message(self, name, mode, row_no, value, key):
+        kind = 'duplicate_casefold' if mode == 'casefold' else 'duplicate'
+        return self.message(kind, row=row_no, field=name, value=value, key=key)
+
+    def convert(self, row, row_no, state, cache=None):
+        # Returns (values in insert_columns order, errors) for one CSV row.
+        # Pass state=None to skip the cross-row uniqueness checks and a
+        # ValueCache from new_cache() to share repeated values.
+        if len(row) != self.width:
+            return None, [self.message('columns', row=row_no)]
+        errors = []
+        values = [None] * self.out_width
+        key = row[self.key_pos] if self.key_pos is not None else ''
+
+        steps, parse = (self.steps, parse_time) if cache is None else (cache.steps, cache.parse_time)
+        for pos, out, field, convert in steps:
+            raw = row[pos]
+            try:
+                value = convert(raw)
+            except FieldError as e:
+                errors.append(self.message(e.kind, row=row_no, field=field.name, value=raw, key=key, **e.extra))
+                continue
+            if out is not None:
+                values[out] = value
+            if state is None:
+                continue
+            for mode in field.unique:
+                seen_value = raw.lower() if mode == 'casefold' else raw
+                seen = state[(field.name, mode)]
+                if seen_value in seen:
+                    errors.append(self.duplicate_message(field.name, mode, row_no, raw, key))
+                else:
+                    seen.add(seen_value)
+
+        for flag_out, open_pos, close_pos, open_out, close_out, flag, open_field, close_field in self.groups:
+            if values[flag_out] is not True:
+                continue
+            open_raw, close_raw = row[open_pos], row[close_pos]
+            if not open_raw.strip() or not close_raw.strip():
+                errors.append(self.message('time_required', row=row_no, open=open_field, close=close_field, flag=flag))
+                continue
+            try:
+                values[open_out] = parse(open_raw)
+                values[close_out] = parse(close_raw)
+            except ValueError:
+                errors.append(self.message('time', row=row_no, open=open_field, close=close_field))
+
+        return tuple(values), errors
+
+_compiled = {}
+
+def compile_schema(table, header=None):
+    # Compiled schemas are cached per (table, header) so each file layout
+    # is analysed only once
+    schema = SCHEMAS[table]
+    header = tuple(header) if header is not None else tuple(schema.columns)
+    compiled = _compiled.get((table, header))
+    if compiled is None:
+        if schema.strict_header and list(header) != schema.columns:
+            raise HeaderError(schema.messages['header'].format(expected=schema.columns, header=list(header)))
+        missing = [c for c in schema.columns if c not in header]
+        if missing:
+            raise HeaderError(schema.messages['header'].format(expected=schema.columns, header=list(header)))
+        compiled = _compiled[(table, header)] = CompiledSchema(schema, header)
+    return compiled
+
+# ---- registry ----
+
+ADMIN_USER = TableSchema(
+    'adminusers_adminuser',
+    [
+        Field('id', insert=False),
+        Field('admin_name', required=True, unique=('exact',)),
+        Field('admin_photo', kind='photo', default='default_admin.png', repeated=True),
+        Field('admin_desc', blank_to_none=True),
+        Field('admin_email', required=True, unique=('exact',)),
+    ],
+    insert_columns=['admin_name', 'admin_email', 'admin_desc', 'admin_photo'],
+    natural_key='admin_name',
+    messages={
+        'photo_ext': "Row {row}: Invalid image extension '{ext}' for photo",
+    },
+)
+
+def _restaurant_fields():
+    lenient = dict(kind='bool', truthy=('TRUE', 'T', '1'), falsy=('FALSE', 'F', '0'))
+    fields = [
+        Field('id', insert=False),
+        Field('restaurant_name', required=True, unique=('exact',)),
+        Field('list_date', kind='datetime', to_local=True, repeated=True),
+        Field('edit_date', kind='date', formats=("%Y-%m-%d", "%d/%m/%Y"), repeated=True),
+        Field('restaurant_photo_main', kind='photo', default='None', repeated=True),
+        Field('restaurant_area', repeated=True),
+        Field('restaurant_district', repeated=True),
+        Field('restaurant_street'),
+        Field('restaurant_address'),
+    ]
+    for period in ('fullday', 'afternoon', 'night', 'nightsnack'):
+        fields += [
+            Field(period, **lenient),
+            Field(f'openhour_{period}', kind='time'),
+            Field(f'closehour_{period}', kind='time'),
+        ]
+    fields += [Field(f'category_{c}', **lenient) for c in ('chinese', 'western', 'seafood', 'veg', 'japan')]
+    fields.append(Field('menu'))
+    fields += [Field(f'menu_photo{n}', kind='photo', default='None', repeated=True) for n in range(1, 7)]
+    fields += [Field(f'{p}_price', kind='number') for p in ('two_dish', 'three_dish', 'drink', 'soup')]
+    fields += [Field(f'payment_{p}', **lenient) for p in ('cash', 'octopus', 'alipayhk', 'wechatpay', 'payeme')]
+    fields += [
+        Field(name, **lenient)
+        for name in ('dine_in', 'takeaway', 'takeaway_self', 'takeaway_keeta', 'takeaway_foodpanda',
+                     'is_published', 'discount_coupon')
+    ]
+    return fields
+
+RESTAURANT = TableSchema(
+    'listings_two_dish_rice',
+    _restaurant_fields(),
+    time_groups=[
+        ('fullday', 'openhour_fullday', 'closehour_fullday'),
+        ('afternoon', 'openhour_afternoon', 'closehour_afternoon'),
+        ('night', 'openhour_night', 'closehour_night'),
+        ('nightsnack', 'openhour_nightsnack', 'closehour_nightsnack'),
+    ],
+    natural_key='restaurant_name',
+    watermark=('edit_date',),
+)
+
+AUTH_USER = TableSchema(
+    'auth_user',
+    [
+        Field('id', insert=False),
+        Field('password', required=True, repeated=True),
+        Field('last_login', repeated=True),
+        Field('is_superuser', kind='bool'),
+        Field('username', unique=('exact', 'casefold')),
+        Field('first_name', blank_to_none=True),
+        Field('last_name', blank_to_none=True),
+        Field('email', required=True),
+        Field('is_staff', kind='bool'),
+        Field('is_active', kind='bool'),
+        Field('date_joined', required=True, repeated=True),
+    ],
+    key_field='username',
+    strict_header=False,
+    natural_key='username',
+    casefold_key=True,
+    watermark=('last_login', 'date_joined'),
+    messages={
+        'missing': "Missing {field} for user {key}",
+        'duplicate': "Duplicate {field}: {value}",
+        'duplicate_casefold': "Duplicate {field} (case-insensitive): {value}",
+        'bool': "Invalid {field} value '{value}' for user {key}",
+    },
+)
+
+FOODIE_CONTACT = TableSchema(
+    'foodie_contact',
+    [
+        Field('id', insert=False),
+        Field('foodie_name', unique=('exact',)),
+        Field('updated_date', repeated=True),
+        Field('gender', required=True, repeated=True),
+        Field('age_range', required=True, repeated=True),
+        Field('occupation', required=True, repeated=True),
+        Field('live_district', required=True, repeated=True),
+    ] + [
+        Field(f'favor_{f}', kind='bool')
+        for f in ('chinese', 'western', 'veg', 'organic', 'japan', 'korean', 'thai',
+                  'seafood', 'muslim', 'no_beef', 'no_pork')
+    ] + [
+        Field('foodie_desc'),
+        Field('foodie_photo', repeated=True),
+        Field('is_mvp', kind='bool'),
+    ],
+    key_field='foodie_name',
+    strict_header=False,
+    natural_key='foodie_name',
+    casefold_key=True,
+    watermark=('updated_date',),
+    messages={
+        'missing': "Missing {field} for foodie {key}",
+        'duplicate': "Duplicate {field}: {value}",
+        'bool': "Invalid {field} value '{value}' for foodie {key}",
+        'reference': "Username {key} not found in auth_user for foodie {key}",
+    },
+)
+
+SCHEMAS = {s.table: s for s in (ADMIN_USER, RESTAURANT, AUTH_USER, FOODIE_CONTACT)}
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from data_core import (
+    EXPORT_ITERSIZE, EXPORT_TARGETS, begin_snapshot, export_filename, join_snapshot, write_export
+)
+from data_compress import open_csv, split_suffix
+from data_formats import format_of, stitch_binary, stitch_parquet
+from data_metrics import span
+from data_pool import connect
+
+# Sharded export for large tables. The table is cut into id ranges of about
+# the same row count and each range is written by its own process and
+# connection, so CSV formatting runs on every core. All shards read one
+# exported snapshot, so the parts add up to a consistent copy of the table.
+
+def shard_filename(file_path, part):
+    # Restaurant_20250624_110825.csv -> Restaurant_20250624_110825.part001.csv
+    # (and .part001.csv.gz for compressed exports)
+    root, ext = split_suffix(file_path)
+    return f"{root}.part{part:03d}{ext}"
+
+def shard_ranges(cur, table_name, parts):
+    # [(low, high)] id ranges, high exclusive and None for the last one.
+    # ntile() balances row counts even when ids have gaps.
+    cur.execute(f"""
+        SELECT min(id) FROM (
+            SELECT id, ntile(%s) OVER (ORDER BY id) AS shard FROM {table_name}
+        ) shards GROUP BY shard ORDER BY 1
+    """, (parts,))
+    starts = [low for (low,) in cur.fetchall()]
+    return [(low, starts[n + 1] if n + 1 < len(starts) else None) for n, low in enumerate(starts)]
+
+def export_shard(settings, snapshot, table_name, file_path, low, high, itersize=EXPORT_ITERSIZE):
+    # Worker entry point; returns the number of rows written
+    conn = connect(settings)
+    try:
+        join_snapshot(conn, snapshot)
+        query = f"SELECT * FROM {table_name} WHERE id >= %s"
+        params = [low]
+        if high is not None:
+            query += " AND id < %s"
+            params.append(high)
+        return write_export(conn, table_name, file_path, itersize, query + " ORDER BY id", params)
+    finally:
+        conn.close()
+
+def stitch_parts(part_paths, file_path):
+    # Concatenate the parts into one file, keeping only the first header;
+    # compressed parts are decompressed and the output compressed again
+    fmt = format_of(file_path)
+    if fmt == 'binary':
+        return stitch_binary(part_paths, file_path)
+    if fmt == 'parquet':
+        return stitch_parquet(part_paths, file_path)
+    with open_csv(file_path, 'wb') as out:
+        for n, part_path in enumerate(part_paths):
+            with open_csv(part_path, 'rb') as part:
+                header = part.readline()
+                if n == 0:
+                    out.write(header)
+                shutil.copyfileobj(part, out)
+
+def export_sharded(db, table_name, file_path, parts=None, workers=None, stitch=False):
+    # Returns the written file names: the parts, or [file_path] once stitched
+    start = perf_counter()
+    workers = workers or os.cpu_count() or 1
+    with db.connection() as conn:
+        # Stays open until every shard is written
+        snapshot = begin_snapshot(conn)
+        cur = conn.cursor()
+        ranges = shard_ranges(cur, table_name, parts or workers)
+        cur.close()
+        part_paths = [shard_filename(file_path, n) for n in range(1, len(ranges) + 1)]
+        counts = []
+        if ranges:
+            # spawn, not fork: exports can be started from a threaded Tk process
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                                           mp_context=multiprocessing.get_context('spawn'))
+            try:
+                # The shards run in other processes, so they are timed here
+                with span(f"export {table_name} ({len(ranges)} parts)") as timing:
+                    futures = [executor.submit(export_shard, db.pool.settings, snapshot, table_name,
+                                               part_path, low, high)
+                               for part_path, (low, high) in zip(part_paths, ranges)]
+                    counts = [future.result() for future in futures]
+                    timing.rows = sum(counts)
+                    timing.bytes = sum(os.path.getsize(path) for path in part_paths)
+            except Exception:
+                # Let running shards finish before deleting their files
+                executor.shutdown(wait=True, cancel_futures=True)
+                _remove(part_paths)
+                raise
+            executor.shutdown(wait=True)
+        conn.rollback()
+    
+    if not ranges:
+        # Empty table: one file holding just the header
+        db.export_csv(table_name, file_path)
+        return [file_path]
+    if stitch:
+        with span(f"stitch {table_name}"):
+            stitch_parts(part_paths, file_path)
+        _remove(part_paths)
+        part_paths = [file_path]
+    stats = db._make_stats(table_name, "sharded", sum(counts), perf_counter() - start)
+    stats['parts'] = len(ranges)
+    db.last_export_stats = stats
+    return part_paths
+
+def _remove(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def export_option_sharded(db, option, timestamp, directory=None, parts=None, workers=None,
+                          stitch=False, compression=None, fmt='csv'):
+    # Like export_option, one table after the other, each one sharded
+    filenames = []
+    for table_name, prefix in EXPORT_TARGETS[option]:
+        filename = export_filename(prefix, timestamp, compression, fmt)
+        if directory:
+            filename = os.path.join(directory, filename)
+        filenames.extend(export_sharded(db, table_name, filename, parts, workers, stitch))
+    return filenames
@@ -0,0 +1,289 @@
+import re
+from psycopg2.extras import execute_values
+from data_core import ImportMonitor, USER_PAGE_SIZE, _batches, _no_log
+from data_schema import ADMIN_USER, RESTAURANT, AUTH_USER, FOODIE_CONTACT
+
+# Shadow-table loads: the new rows go into <table>_shadow, which gets the
+# live table's indexes, constraints, triggers, comments and grants, and a
+# short transaction then drops the live table and renames the shadow into
+# its place, re-creating the views that read from it. Readers keep seeing
+# the old rows during the load and only wait for the swap.
+
+# Give up on the swap instead of queueing every reader behind our lock
+SWAP_LOCK_TIMEOUT = '5s'
+SWAP_ATTEMPTS = 3
+LOCK_NOT_AVAILABLE = '55P03'
+
+INDEX_DEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX \S+ ON (ONLY )?\S+')
+TRIGGER_DEF_RE = re.compile(r'^(CREATE (?:CONSTRAINT )?TRIGGER \S+ .*? ON )\S+')
+
+def _shadow_name(name):
+    # Stay within PostgreSQL's 63 character identifier limit
+    return f"{name[:56]}_shadow"
+
+def _inspect_table(cur, table):
+    # Everything the swap has to carry over from the live table
+    cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+    sequence = cur.fetchone()[0]
+    cur.execute("""
+        SELECT attidentity <> '' FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = 'id'
+    """, (table,))
+    identity = cur.fetchone()[0]
+    cur.execute("""
+        SELECT i.relname, pg_get_indexdef(i.oid), c.conname, c.contype
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid
+            AND c.conrelid = x.indrelid AND c.contype IN ('p', 'u')
+        WHERE x.indrelid = %s::regclass
+    """, (table,))
+    indexes = cur.fetchall()
+    cur.execute("""
+        SELECT conname, conrelid::regclass::text, pg_get_constraintdef(oid)
+        FROM pg_constraint WHERE contype = 'f' AND conrelid = %s::regclass
+    """, (table,))
+    outgoing = cur.fetchall()
+    cur.execute("""
+        SELECT conname, conrelid::regclass::text, pg_get_constraintdef(oid)
+        FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass
+    """, (table,))
+    incoming = cur.fetchall()
+    cur.execute("""
+        SELECT tgname, pg_get_triggerdef(oid), tgenabled = 'D' FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal
+    """, (table,))
+    triggers = cur.fetchall()
+    cur.execute("SELECT obj_description(%s::regclass, 'pg_class')", (table,))
+    comment = cur.fetchone()[0]
+    return {
+        'table': table, 'shadow': _shadow_name(table), 'sequence': sequence,
+        'identity': identity, 'indexes': indexes, 'outgoing': outgoing,
+        'incoming': incoming, 'grants': _grants(cur, table), 'triggers': triggers,
+        'comment': comment, 'views': _dependent_views(cur, table),
+    }
+
+def _grants(cur, name):
+    cur.execute("""
+        SELECT grantee, privilege_type FROM information_schema.role_table_grants
+        WHERE table_schema = current_schema() AND table_name = %s AND grantee <> current_user
+    """, (name,))
+    return cur.fetchall()
+
+def _dependent_views(cur, table):
+    # Views reading from the table, directly or through other views, as
+    # (name, depth, definition, options, comment, grants); DROP TABLE
+    # refuses while they exist, so the swap drops and re-creates them
+    cur.execute("""
+        WITH RECURSIVE dependents (oid, depth) AS (
+            SELECT r.ev_class, 1 FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = %s::regclass
+                AND r.ev_class <> d.refobjid
+            UNION
+            SELECT r.ev_class, p.depth + 1 FROM dependents p
+            JOIN pg_depend d ON d.refobjid = p.oid AND d.classid = 'pg_rewrite'::regclass
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE r.ev_class <> p.oid
+        )
+        SELECT c.relname, c.relkind, max(p.depth), pg_get_viewdef(c.oid), c.reloptions,
+               obj_description(c.oid, 'pg_class'), c.relnamespace = current_schema()::regnamespace
+        FROM dependents p JOIN pg_class c ON c.oid = p.oid
+        GROUP BY c.oid ORDER BY 3, 1
+    """, (table,))
+    views = []
+    for name, kind, depth, definition, options, comment, local in cur.fetchall():
+        if kind != 'v' or not local:
+            # Materialized views would be refreshed under the swap lock, and
+            # views in other schemas are not ours to re-create
+            raise ValueError(f"Swap mode cannot replace {table}: {name} depends on it, "
+                             f"import without swap instead")
+        views.append((name, depth, definition, options, comment, _grants(cur, name)))
+    return views
+
+def _build_shadow(cur, plan, columns, rows, monitor):
+    table, shadow = plan['table'], plan['shadow']
+    cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+    # Defaults keep nextval() on the live sequence; identity columns get
+    # their own sequence, which is renamed at swap time
+    like = "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS"
+    if plan['identity']:
+        like += " INCLUDING IDENTITY"
+    cur.execute(f"CREATE TABLE {shadow} (LIKE {table} {like})")
+
+    # ids are written explicitly (1..n, as after RESTART WITH 1), so the
+    # live sequence is not consumed while the old table is still serving
+    overriding = " OVERRIDING SYSTEM VALUE" if plan['identity'] else ""
+    query = f"INSERT INTO {shadow} (id, {', '.join(columns)}){overriding} VALUES %s"
+    for batch in _batches(rows, USER_PAGE_SIZE):
+        execute_values(cur, query, batch, page_size=len(batch))
+        monitor.advance(len(batch))
+
+    # Indexes are built after the data, with a shadow name until the swap
+    for name, definition, conname, contype in plan['indexes']:
+        cur.execute(INDEX_DEF_RE.sub(
+            lambda m: f"CREATE {m.group(1) or ''}INDEX {_shadow_name(name)} ON {shadow}",
+            definition, count=1))
+        if conname:
+            kind = "PRIMARY KEY" if contype == 'p' else "UNIQUE"
+            cur.execute(f"ALTER TABLE {shadow} ADD CONSTRAINT {_shadow_name(conname)} "
+                        f"{kind} USING INDEX {_shadow_name(name)}")
+    # Triggers are added after the data, so they fire for later writes
+    # only, as on the live table
+    for name, definition, disabled in plan['triggers']:
+        cur.execute(TRIGGER_DEF_RE.sub(lambda m: f"{m.group(1)}{shadow}", definition, count=1))
+        if disabled:
+            cur.execute(f"ALTER TABLE {shadow} DISABLE TRIGGER {name}")
+    if plan['comment'] is not None:
+        cur.execute(f"COMMENT ON TABLE {shadow} IS %s", (plan['comment'],))
+    _grant(cur, shadow, plan['grants'])
+    cur.execute(f"ANALYZE {shadow}")
+
+def _grant(cur, name, grants):
+    for grantee, privilege in grants:
+        grantee = grantee if grantee == 'PUBLIC' else f'"{grantee}"'
+        cur.execute(f"GRANT {privilege} ON {name} TO {grantee}")
+
+def _drop_shadows(conn, plans):
+    with conn:
+        with conn.cursor() as cur:
+            for plan in reversed(plans):
+                cur.execute(f"DROP TABLE IF EXISTS {plan['shadow']}")
+
+def _swap(cur, plans):
+    # One short transaction; plans are in foreign key order (parents first)
+    swapped = {plan['table'] for plan in plans}
+    cur.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    cur.execute(f"LOCK TABLE {', '.join(plan['table'] for plan in plans)} IN ACCESS EXCLUSIVE MODE")
+
+    # Foreign keys from tables we are not replacing are dropped and re-added
+    incoming = [fk for plan in plans for fk in plan['incoming'] if fk[1] not in swapped]
+    for conname, source, _ in incoming:
+        cur.execute(f"ALTER TABLE {source} DROP CONSTRAINT {conname}")
+
+    for plan in plans:
+        if plan['sequence'] and not plan['identity']:
+            # A serial sequence is owned by the live column and would be
+            # dropped with it
+            cur.execute(f"ALTER SEQUENCE {plan['sequence']} OWNED BY {plan['shadow']}.id")
+    # A view reading several of the tables is re-created once, after all
+    # of them; views on views come back after the views they read
+    views = {}
+    for plan in plans:
+        for view in plan['views']:
+            if view[1] >= views.get(view[0], (None, 0))[1]:
+                views[view[0]] = view
+    views = sorted(views.values(), key=lambda view: view[1])
+    for name, *_ in reversed(views):
+        cur.execute(f"DROP VIEW {name}")
+    for plan in reversed(plans):
+        cur.execute(f"DROP TABLE {plan['table']}")
+
+    for plan in plans:
+        table, shadow = plan['table'], plan['shadow']
+        if plan['identity']:
+            cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (shadow,))
+            shadow_sequence = cur.fetchone()[0]
+        cur.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+        for name, _, conname, _ in plan['indexes']:
+            if conname:
+                cur.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {_shadow_name(conname)} TO {conname}")
+            else:
+                cur.execute(f"ALTER INDEX {_shadow_name(name)} RENAME TO {name}")
+        if plan['identity']:
+            cur.execute(f"ALTER SEQUENCE {shadow_sequence} RENAME TO {plan['sequence'].split('.')[-1]}")
+        if plan['sequence']:
+            # Continue after the loaded ids
+            cur.execute(f"SELECT setval(%s, coalesce(max(id), 0) + 1, false) FROM {table}",
+                        (plan['sequence'],))
+
+    for name, _, definition, options, comment, grants in views:
+        options = f" WITH ({', '.join(options)})" if options else ""
+        cur.execute(f"CREATE VIEW {name}{options} AS {definition}")
+        if comment is not None:
+            cur.execute(f"COMMENT ON VIEW {name} IS %s", (comment,))
+        _grant(cur, name, grants)
+
+    # Re-created NOT VALID so the swap does not scan; validated afterwards
+    foreign_keys = [(conname, plan['table'], definition)
+                    for plan in plans for conname, _, definition in plan['outgoing']] + incoming
+    for conname, source, definition in foreign_keys:
+        definition = definition.replace(" NOT VALID", "")
+        cur.execute(f"ALTER TABLE {source} ADD CONSTRAINT {conname} {definition} NOT VALID")
+    return foreign_keys
+
+def _validate_foreign_keys(conn, foreign_keys, log):
+    # VALIDATE only takes a SHARE UPDATE EXCLUSIVE lock, readers and writers
+    # carry on while it runs
+    for conname, source, _ in foreign_keys:
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"ALTER TABLE {source} VALIDATE CONSTRAINT {conname}")
+        except Exception as e:
+            log(f"Foreign key {conname} on {source} left NOT VALID: {str(e)}", "error")
+
+def swap_load(conn, loads, log=_no_log, monitor=None):
+    # loads: [(schema, columns, rows)] with rows as (id,) + columns values,
+    # parents before children. Returns the row count per table.
+    monitor = monitor or ImportMonitor()
+    plans = []
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                for schema, columns, rows in loads:
+                    plan = _inspect_table(cur, schema.table)
+                    plans.append(plan)
+                    monitor.begin(f"load {plan['shadow']}", len(rows))
+                    _build_shadow(cur, plan, columns, rows, monitor)
+                    log(f"Loaded {len(rows)} records into {plan['shadow']}", "info")
+                monitor.check()
+
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                with conn:
+                    with conn.cursor() as cur:
+                        foreign_keys = _swap(cur, plans)
+                break
+            except Exception as e:
+                if getattr(e, 'pgcode', None) != LOCK_NOT_AVAILABLE or attempt == SWAP_ATTEMPTS:
+                    raise
+                log(f"Tables busy, retrying swap ({attempt}/{SWAP_ATTEMPTS - 1})", "info")
+    except Exception:
+        conn.rollback()
+        _drop_shadows(conn, plans)
+        raise
+    log(f"Swapped in {', '.join(plan['table'] for plan in plans)}", "info")
+
+    _validate_foreign_keys(conn, foreign_keys, log)
+    monitor.finish()
+    return [len(rows) for _, _, rows in loads]
+
+def _numbered(rows):
+    return [(n,) + tuple(row) for n, row in enumerate(rows, start=1)]
+
+def swap_admin_user(conn, rows, log=_no_log, monitor=None):
+    return swap_load(conn, [(ADMIN_USER, ADMIN_USER.insert_columns, _numbered(rows))], log, monitor)[0]
+
+def swap_restaurant(conn, rows, log=_no_log, monitor=None):
+    return swap_load(conn, [(RESTAURANT, RESTAURANT.insert_columns, _numbered(rows))], log, monitor)[0]
+
+def swap_users(conn, auth_data, foodie_data, log=_no_log, monitor=None):
+    # auth_user ids are known before anything is written, so user_id is
+    # resolved here instead of with RETURNING
+    auth_rows = _numbered(auth_data)
+    username_pos = AUTH_USER.insert_position('username') + 1
+    username_id_map = {row[username_pos].lower(): row[0] for row in auth_rows}
+    foodie_name_pos = FOODIE_CONTACT.insert_position('foodie_name')
+    foodie_rows = []
+    for row in foodie_data:
+        foodie_name = row[foodie_name_pos]
+        user_id = username_id_map.get(foodie_name.lower())
+        if not user_id:
+            raise ValueError(f"User ID not found for {foodie_name}")
+        foodie_rows.append(row + (user_id,))
+
+    counts = swap_load(conn, [
+        (AUTH_USER, AUTH_USER.insert_columns, auth_rows),
+        (FOODIE_CONTACT, FOODIE_CONTACT.insert_columns + ['user_id'], _numbered(foodie_rows)),
+    ], log, monitor)
+    return tuple(counts)
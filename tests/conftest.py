@@ -0,0 +1,143 @@
+import csv
+import os
+import shutil
+import sys
+import uuid
+import pytest
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_pool
+from data_core import DatabaseManager, load_users, validate_auth_user, validate_foodie_contact
+from data_pool import ConnectionPool, load_settings
+
+# Database tests run against the server in dishdb.ini / DISHDB_* (host,
+# port, user, password; DISHDB_PASSWORD= for a server without one). Each
+# session creates a throwaway database and every test starts from
+# tests/schema.sql; without a server they skip.
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'schema.sql')
+SAMPLES = {
+    'admin': 'Adminuser_20250626_112537.csv',
+    'restaurant': 'Restaurant_20250624_110825.csv',
+    'auth': 'Authorized_User_20250626_114439.csv',
+    'foodie': 'Foodie_20250626_114439.csv',
+}
+
+def _admin_connect(settings):
+    conn = psycopg2.connect(**{**data_pool.connect_args(settings), 'dbname': 'postgres', 'connect_timeout': 3})
+    conn.autocommit = True
+    return conn
+
+@pytest.fixture(scope='session')
+def db_settings():
+    settings = load_settings()
+    if settings['password'] is None:
+        pytest.skip("No database password in dishdb.ini or DISHDB_PASSWORD")
+    try:
+        conn = _admin_connect(settings)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"No PostgreSQL server: {str(e).strip()}")
+    dbname = f"dishdb_test_{uuid.uuid4().hex[:8]}"
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE {dbname}")
+    settings = dict(settings, dbname=dbname, pool_min='1', pool_max='4', pool_timeout='10')
+    yield settings
+    data_pool.close_pool()
+    with conn.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {dbname} WITH (FORCE)")
+    conn.close()
+
+@pytest.fixture
+def db(db_settings):
+    # A fresh schema; yields a plain connection for assertions
+    conn = psycopg2.connect(**data_pool.connect_args(db_settings))
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+            with open(SCHEMA_FILE, encoding='utf-8') as f:
+                cur.execute(f.read())
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def pool(db, db_settings):
+    pool = ConnectionPool(db_settings)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def manager(pool):
+    return DatabaseManager(pool)
+
+@pytest.fixture
+def env_db(db, db_settings, monkeypatch):
+    # For code that opens the shared pool itself (CLI, worker processes)
+    for key in data_pool.CONNECT_KEYS:
+        monkeypatch.setenv(f"DISHDB_{key.upper()}", str(db_settings[key]))
+    data_pool.close_pool()
+    yield db_settings
+    data_pool.close_pool()
+
+@pytest.fixture
+def samples(tmp_path):
+    # Copies, so checkpoints and error reports land in tmp_path
+    paths = {}
+    for name, file_name in SAMPLES.items():
+        paths[name] = str(tmp_path / file_name)
+        shutil.copy(os.path.join(ROOT, file_name), paths[name])
+    return paths
+
+@pytest.fixture
+def users(samples):
+    # The validated (auth_data, foodie_data) rows of the sample user files
+    valid, auth_data, errors = validate_auth_user(samples['auth'])
+    assert valid, list(errors)
+    valid, foodie_data, errors = validate_foodie_contact(samples['foodie'], auth_data)
+    assert valid, list(errors)
+    return auth_data, foodie_data
+
+@pytest.fixture
+def loaded_users(pool, users):
+    with pool.connection() as conn:
+        load_users(conn, *users)
+    return users
+
+def count(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {table}")
+        result = cur.fetchone()[0]
+    conn.rollback()
+    return result
+
+def fetch(conn, query, vars=None):
+    with conn.cursor() as cur:
+        cur.execute(query, vars)
+        rows = cur.fetchall()
+    conn.rollback()
+    return rows
+
+def write_copies(source, target, copies, key):
+    # target gets the rows of source `copies` times, with `key` made
+    # unique and ids renumbered; returns the number of rows written
+    with open(source, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    key_pos = header.index(key)
+    id_pos = header.index('id')
+    written = 0
+    with open(target, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for n in range(copies):
+            for row in rows:
+                row = list(row)
+                written += 1
+                row[id_pos] = str(written)
+                if n:
+                    row[key_pos] = f"{row[key_pos]} {n}"
+                writer.writerow(row)
+    return written
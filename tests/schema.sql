@@ -0,0 +1,107 @@
+-- The four tables as the Django site creates them, including the
+-- secondary indexes and the deferrable foreign key that bulk, swap and
+-- delta loads have to cope with.
+
+CREATE TABLE adminusers_adminuser (
+    id serial PRIMARY KEY,
+    admin_name varchar(100) NOT NULL UNIQUE,
+    admin_email varchar(254) NOT NULL UNIQUE,
+    admin_desc text,
+    admin_photo varchar(100) NOT NULL
+);
+CREATE INDEX adminusers_adminuser_admin_name_like
+    ON adminusers_adminuser (admin_name varchar_pattern_ops);
+
+CREATE TABLE listings_two_dish_rice (
+    id serial PRIMARY KEY,
+    restaurant_name varchar(200) NOT NULL UNIQUE,
+    list_date timestamp with time zone,
+    edit_date date,
+    restaurant_photo_main varchar(100),
+    restaurant_area varchar(100),
+    restaurant_district varchar(100),
+    restaurant_street varchar(200),
+    restaurant_address varchar(200),
+    fullday boolean NOT NULL,
+    openhour_fullday time,
+    closehour_fullday time,
+    afternoon boolean NOT NULL,
+    openhour_afternoon time,
+    closehour_afternoon time,
+    night boolean NOT NULL,
+    openhour_night time,
+    closehour_night time,
+    nightsnack boolean NOT NULL,
+    openhour_nightsnack time,
+    closehour_nightsnack time,
+    category_chinese boolean NOT NULL,
+    category_western boolean NOT NULL,
+    category_seafood boolean NOT NULL,
+    category_veg boolean NOT NULL,
+    category_japan boolean NOT NULL,
+    menu text,
+    menu_photo1 varchar(100),
+    menu_photo2 varchar(100),
+    menu_photo3 varchar(100),
+    menu_photo4 varchar(100),
+    menu_photo5 varchar(100),
+    menu_photo6 varchar(100),
+    two_dish_price double precision,
+    three_dish_price double precision,
+    drink_price double precision,
+    soup_price double precision,
+    payment_cash boolean NOT NULL,
+    payment_octopus boolean NOT NULL,
+    payment_alipayhk boolean NOT NULL,
+    payment_wechatpay boolean NOT NULL,
+    payment_payeme boolean NOT NULL,
+    dine_in boolean NOT NULL,
+    takeaway boolean NOT NULL,
+    takeaway_self boolean NOT NULL,
+    takeaway_keeta boolean NOT NULL,
+    takeaway_foodpanda boolean NOT NULL,
+    is_published boolean NOT NULL,
+    discount_coupon boolean NOT NULL
+);
+CREATE INDEX listings_two_dish_rice_district ON listings_two_dish_rice (restaurant_district);
+
+CREATE TABLE auth_user (
+    id serial PRIMARY KEY,
+    password varchar(128) NOT NULL,
+    last_login timestamp with time zone,
+    is_superuser boolean NOT NULL,
+    username varchar(150) NOT NULL UNIQUE,
+    first_name varchar(150),
+    last_name varchar(150),
+    email varchar(254) NOT NULL,
+    is_staff boolean NOT NULL,
+    is_active boolean NOT NULL,
+    date_joined timestamp with time zone NOT NULL
+);
+CREATE INDEX auth_user_username_like ON auth_user (username varchar_pattern_ops);
+
+CREATE TABLE foodie_contact (
+    id serial PRIMARY KEY,
+    foodie_name varchar(150) NOT NULL UNIQUE,
+    updated_date timestamp with time zone,
+    gender varchar(20) NOT NULL,
+    age_range varchar(20) NOT NULL,
+    occupation varchar(50) NOT NULL,
+    live_district varchar(50) NOT NULL,
+    favor_chinese boolean NOT NULL,
+    favor_western boolean NOT NULL,
+    favor_veg boolean NOT NULL,
+    favor_organic boolean NOT NULL,
+    favor_japan boolean NOT NULL,
+    favor_korean boolean NOT NULL,
+    favor_thai boolean NOT NULL,
+    favor_seafood boolean NOT NULL,
+    favor_muslim boolean NOT NULL,
+    favor_no_beef boolean NOT NULL,
+    favor_no_pork boolean NOT NULL,
+    foodie_desc text,
+    foodie_photo varchar(100),
+    is_mvp boolean NOT NULL,
+    user_id integer REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX foodie_contact_user_id ON foodie_contact (user_id);
@@ -0,0 +1,73 @@
+import pytest
+from conftest import count, fetch
+from data_core import (defer_indexes, import_users_staged, load_admin_user, load_typed, load_users,
+                       rebuild_indexes, validate_admin_user, write_export)
+from data_resume import import_users_resumable
+
+# Bulk loads drop secondary indexes and defer constraints; foodie_contact's
+# foreign key to auth_user is DEFERRABLE INITIALLY DEFERRED as in the Django
+# schema, so its checks are still queued when the indexes are rebuilt.
+
+def _index_names(db, table):
+    return sorted(name for (name,) in fetch(db, "SELECT indexname FROM pg_indexes WHERE tablename = %s",
+                                            (table,)))
+
+def _assert_users_loaded(db, before):
+    assert count(db, 'auth_user') == 20
+    assert count(db, 'foodie_contact') == 20
+    assert _index_names(db, 'auth_user') == before['auth_user']
+    assert _index_names(db, 'foodie_contact') == before['foodie_contact']
+    assert fetch(db, "SELECT count(*) FROM foodie_contact f JOIN auth_user u ON u.id = f.user_id") == [(20,)]
+
+@pytest.fixture
+def indexes(db):
+    return {table: _index_names(db, table) for table in ('auth_user', 'foodie_contact')}
+
+def test_bulk_admin_rebuilds_indexes(pool, db, samples):
+    before = _index_names(db, 'adminusers_adminuser')
+    _, rows, _ = validate_admin_user(samples['admin'])
+    with pool.connection() as conn:
+        load_admin_user(conn, rows, bulk=True)
+    assert count(db, 'adminusers_adminuser') == 20
+    assert _index_names(db, 'adminusers_adminuser') == before
+
+def test_bulk_load_users(pool, db, users, indexes):
+    auth_data, foodie_data = users
+    with pool.connection() as conn:
+        load_users(conn, auth_data, foodie_data, bulk=True)
+        # Twice, so the second load also deletes rows under the deferred key
+        load_users(conn, auth_data, foodie_data, bulk=True)
+    _assert_users_loaded(db, indexes)
+
+def test_bulk_staged_users(pool, db, samples, indexes):
+    with pool.connection() as conn:
+        valid, counts, errors = import_users_staged(conn, samples['auth'], samples['foodie'], bulk=True)
+    assert valid, errors
+    assert counts == (20, 20)
+    _assert_users_loaded(db, indexes)
+
+def test_bulk_resumable_users(pool, db, samples, indexes):
+    with pool.connection() as conn:
+        valid, counts, errors = import_users_resumable(conn, samples['auth'], samples['foodie'], bulk=True)
+    assert valid, list(errors)
+    assert counts == (20, 20)
+    _assert_users_loaded(db, indexes)
+
+def test_bulk_load_typed_users(pool, db, loaded_users, indexes, tmp_path):
+    loads = [('auth_user', str(tmp_path / 'auth.pgcopy')), ('foodie_contact', str(tmp_path / 'foodie.pgcopy'))]
+    with pool.connection() as conn:
+        for table_name, file_path in loads:
+            write_export(conn, table_name, file_path)
+        conn.rollback()
+        assert load_typed(conn, loads, bulk=True) == [20, 20]
+    _assert_users_loaded(db, indexes)
+
+def test_bulk_load_still_checks_foreign_keys(pool, db, loaded_users):
+    with pool.connection() as conn:
+        with pytest.raises(Exception, match='foreign key'):
+            with conn:
+                with conn.cursor() as cur:
+                    dropped = defer_indexes(cur, ['foodie_contact'])
+                    cur.execute("UPDATE foodie_contact SET user_id = user_id + 1000")
+                    rebuild_indexes(cur, dropped)
+    assert fetch(db, "SELECT count(*) FROM foodie_contact WHERE user_id > 1000") == [(0,)]
@@ -0,0 +1,62 @@
+import json
+import pytest
+import data2
+import data_cli
+from conftest import count
+from data_core import option_conflicts
+
+def _events(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+@pytest.mark.parametrize('argv', [
+    ['import', 'restaurant', 'r.csv', '--stream', '--workers', '2'],
+    ['import', 'users', 'a.csv', 'f.csv', '--staged', '--workers', '2'],
+    ['import', 'admin', 'a.csv', '--delta', '--bulk'],
+    ['import', 'users', 'a.csv', 'f.csv', '--delta', '--staged'],
+    ['import', 'restaurant', 'r.csv', '--delta', '--stream'],
+    ['import', 'users', 'a.csv', 'f.csv', '--staged', '--swap'],
+    ['import', 'restaurant', 'r.csv', '--stream', '--swap'],
+    ['import', 'admin', 'a.csv', '--swap', '--bulk'],
+    ['import', 'admin', 'a.csv', '--delta', '--swap'],
+    ['import', 'users', 'a.csv', 'f.csv', '--resume', '--staged'],
+    ['import', 'admin', 'a.csv', '--resume', '--workers', '2'],
+    ['export', 'admin', '--parts', '2', '--incremental'],
+    ['import', 'admin', 'a.csv', '--staged'],
+    ['import', 'admin', 'a.csv', '--stream'],
+    ['import', 'admin', 'a.csv', '--delete-missing'],
+    ['import', 'admin', 'a.pgcopy', '--workers', '2'],
+    ['import', 'users', 'a.csv'],
+    ['export', 'admin', '--stitch'],
+])
+def test_conflicting_options_are_rejected(argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        data_cli.main(argv)
+    assert exc.value.code == 2
+    assert 'error:' in capsys.readouterr().err
+
+def test_gui_uses_the_same_conflicts():
+    assert option_conflicts({'delta': True, 'bulk': True, 'workers': 2, 'stream': False}) == [('delta', 'bulk')]
+    assert option_conflicts({'parts': 4, 'incremental': True, 'bulk': True}, ['bulk']) == []
+    assert data2.option_errors({'swap': True, 'stream': True, 'bulk': False}) == \
+        ["Shadow load cannot be combined with Stream"]
+    assert data2.option_errors({'workers': 4, 'bulk': True}, typed=True) == ["All CPU cores needs a CSV file"]
+
+def test_import_users_staged_bulk(env_db, db, samples, tmp_path, capsys):
+    code = data_cli.main(['import', 'users', samples['auth'], samples['foodie'], '--staged', '--bulk',
+                          '--metrics-file', str(tmp_path / 'metrics.jsonl')])
+    events = _events(capsys)
+    assert code == data_cli.EXIT_OK, events
+    assert [e['rows'] for e in events if e['event'] == 'loaded'] == [20, 20]
+    assert events[-1] == {**events[-1], 'event': 'finished', 'exit_code': 0}
+    assert count(db, 'foodie_contact') == 20
+
+def test_import_validation_error(env_db, tmp_path, capsys):
+    bad = tmp_path / 'admin.csv'
+    bad.write_text("id,admin_name,admin_photo,admin_desc,admin_email\n1,Amy,a.gif,,amy@example.com\n",
+                   encoding='utf-8')
+    code = data_cli.main(['import', 'admin', str(bad), '--metrics-file', str(tmp_path / 'metrics.jsonl')])
+    events = _events(capsys)
+    assert code == data_cli.EXIT_VALIDATION
+    assert any(e['event'] == 'validation_error' and 'extension' in e['message'] for e in events)
+    summary = [e for e in events if e['event'] == 'error_summary'][0]
+    assert summary['report'] == str(tmp_path / 'admin.errors.csv')
@@ -0,0 +1,35 @@
+import gzip
+import pytest
+from conftest import count, fetch
+from data_compress import open_csv, split_suffix
+
+@pytest.mark.parametrize('suffix', ['.csv', '.csv.gz', '.csv.zst'])
+def test_open_csv_round_trip(tmp_path, suffix):
+    if suffix.endswith('.zst'):
+        pytest.importorskip('zstandard')
+    path = str(tmp_path / f"data{suffix}")
+    text = "name,desc\n" + "".join(f"row {n},兩餸飯 {n}\n" for n in range(20000))
+    with open_csv(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    with open_csv(path, 'r', encoding='utf-8') as f:
+        assert f.read() == text
+
+def test_gzip_output_is_plain_gzip(tmp_path):
+    path = str(tmp_path / 'data.csv.gz')
+    with open_csv(path, 'w', encoding='utf-8') as f:
+        f.write("a,b\n1,2\n")
+    assert gzip.open(path, 'rt', encoding='utf-8').read() == "a,b\n1,2\n"
+
+def test_split_suffix():
+    assert split_suffix('dir/Restaurant_x.csv.gz') == ('dir/Restaurant_x', '.csv.gz')
+    assert split_suffix('Restaurant_x.csv') == ('Restaurant_x', '.csv')
+
+@pytest.mark.parametrize('mode', ['insert', 'copy'])
+def test_compressed_export_and_import(manager, db, samples, tmp_path, mode):
+    manager.import_csv('adminusers_adminuser', samples['admin'])
+    before = fetch(db, "SELECT * FROM adminusers_adminuser ORDER BY id")
+    target = str(tmp_path / 'admin.csv.gz')
+    manager.export_csv('adminusers_adminuser', target)
+    manager.import_csv('adminusers_adminuser', target, mode=mode)
+    assert count(db, 'adminusers_adminuser') == 20
+    assert fetch(db, "SELECT * FROM adminusers_adminuser ORDER BY id") == before
@@ -0,0 +1,68 @@
+from conftest import count, fetch
+from data_core import load_admin_user, load_users, validate_admin_user
+from data_delta import upsert_admin_user, upsert_users
+
+def _admin_rows(samples):
+    _, rows, _ = validate_admin_user(samples['admin'])
+    return rows
+
+def _ids(db, table, key):
+    return dict(fetch(db, f"SELECT {key}, id FROM {table}"))
+
+def test_unchanged_file_writes_nothing(pool, db, samples):
+    rows = _admin_rows(samples)
+    with pool.connection() as conn:
+        load_admin_user(conn, rows)
+        stats = upsert_admin_user(conn, rows)
+    assert stats == {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 20}
+
+def test_admin_delta_keeps_ids(pool, db, samples):
+    rows = _admin_rows(samples)
+    with pool.connection() as conn:
+        load_admin_user(conn, rows)
+    before = _ids(db, 'adminusers_adminuser', 'admin_name')
+    email = rows[1][1]
+    changed = list(rows[1:])
+    # admin_name, admin_email, admin_desc, admin_photo
+    changed[0] = (changed[0][0], 'changed@example.com') + tuple(changed[0][2:])
+    changed.append(('New Admin', 'new@example.com', None, 'default_admin.png'))
+    with pool.connection() as conn:
+        stats = upsert_admin_user(conn, changed)
+    assert stats == {'inserted': 1, 'updated': 1, 'deleted': 0, 'unchanged': 18}
+    after = _ids(db, 'adminusers_adminuser', 'admin_name')
+    assert all(after[name] == before[name] for name in before)
+    assert after['New Admin'] == 21
+    assert fetch(db, "SELECT admin_email FROM adminusers_adminuser WHERE admin_email = %s", (email,)) == []
+
+def test_admin_delta_delete_missing(pool, db, samples):
+    rows = _admin_rows(samples)
+    with pool.connection() as conn:
+        load_admin_user(conn, rows)
+        stats = upsert_admin_user(conn, rows[5:], delete_missing=True)
+    assert stats['deleted'] == 5
+    assert count(db, 'adminusers_adminuser') == 15
+
+def test_users_delta(pool, db, users):
+    auth_data, foodie_data = users
+    with pool.connection() as conn:
+        load_users(conn, auth_data[:15], foodie_data[:15])
+    before = _ids(db, 'auth_user', 'username')
+    with pool.connection() as conn:
+        auth_stats, foodie_stats = upsert_users(conn, auth_data, foodie_data)
+    assert (auth_stats['inserted'], auth_stats['unchanged']) == (5, 15)
+    assert (foodie_stats['inserted'], foodie_stats['unchanged']) == (5, 15)
+    after = _ids(db, 'auth_user', 'username')
+    assert all(after[name] == before[name] for name in before)
+    assert fetch(db, """
+        SELECT count(*) FROM foodie_contact f JOIN auth_user u ON u.id = f.user_id
+        WHERE lower(u.username) = lower(f.foodie_name)
+    """) == [(20,)]
+
+def test_users_delta_delete_missing(pool, db, loaded_users):
+    auth_data, foodie_data = loaded_users
+    with pool.connection() as conn:
+        auth_stats, foodie_stats = upsert_users(conn, auth_data[:12], foodie_data[:12], delete_missing=True)
+    assert auth_stats['deleted'] == 8
+    assert foodie_stats['deleted'] == 8
+    assert count(db, 'auth_user') == 12
+    assert count(db, 'foodie_contact') == 12
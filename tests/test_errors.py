@@ -0,0 +1,61 @@
+import csv
+import pytest
+from data_core import validate_admin_user
+from data_errors import ErrorBudgetExceeded, ErrorCollector, RowError, error_report_path, error_summary
+
+def _bad_admins(path, rows):
+    # Every row has a bad photo extension, every third a missing email
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'admin_name', 'admin_photo', 'admin_desc', 'admin_email'])
+        for n in range(1, rows + 1):
+            writer.writerow([n, f"Admin {n}", 'a.gif', '', '' if n % 3 == 0 else f"a{n}@example.com"])
+
+def test_collector_counts_and_report(tmp_path):
+    report = str(tmp_path / 'x.errors.csv')
+    errors = ErrorCollector(report, examples=2, budget=None)
+    with errors:
+        for n in range(5):
+            errors.append(RowError(f"Row {n}: bad", 'bool', n))
+        errors.append("plain message")
+    assert len(errors) == 6
+    assert errors.counts == {'bool': 5, 'other': 1}
+    assert list(errors) == ['Row 0: bad', 'Row 1: bad', 'plain message']
+    with open(report, newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f))[:2] == [['row', 'category', 'message'], ['0', 'bool', 'Row 0: bad']]
+    summary = errors.summary()
+    assert summary[0] == "6 error(s): bool 5, other 1"
+    assert summary[-1] == "... and 3 more"
+
+def test_budget_stops_collection():
+    errors = ErrorCollector(budget=3)
+    errors.append("one")
+    errors.append("two")
+    with pytest.raises(ErrorBudgetExceeded):
+        errors.append("three")
+    errors.append("four")
+    assert len(errors) == 3
+    assert errors.exhausted
+
+def test_validator_stops_at_budget(tmp_path):
+    path = str(tmp_path / 'admins.csv')
+    _bad_admins(path, 500)
+    errors = ErrorCollector(error_report_path(path), budget=50)
+    valid, rows, errors = validate_admin_user(path, errors=errors)
+    assert not valid
+    assert len(errors) == 50
+    assert errors.exhausted
+    assert error_report_path(path) == str(tmp_path / 'admins.errors.csv')
+    with open(error_report_path(path), newline='', encoding='utf-8') as f:
+        assert len(list(csv.reader(f))) == 51
+
+def test_validator_counts_every_error(tmp_path):
+    path = str(tmp_path / 'admins.csv')
+    _bad_admins(path, 300)
+    valid, _, errors = validate_admin_user(path, errors=ErrorCollector(budget=None))
+    assert not valid
+    assert sum(errors.counts.values()) == len(errors) == 400
+    assert len(list(errors)) < len(errors)
+
+def test_error_summary_of_a_list():
+    assert error_summary(['a', 'b', 'c'], 2) == ['a', 'b', '... and 1 more']
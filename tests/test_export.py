@@ -0,0 +1,34 @@
+import csv
+import pytest
+from conftest import count
+from data_core import DatabaseManager
+from data_pool import ConnectionPool
+
+def _rows(file_path):
+    with open(file_path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+@pytest.fixture(params=['1', '4'], ids=['pool_max=1', 'pool_max=4'])
+def snapshot_manager(request, db, db_settings):
+    # pool_timeout is short so a deadlock fails the test instead of hanging
+    pool = ConnectionPool(dict(db_settings, pool_min='1', pool_max=request.param, pool_timeout='2'))
+    yield DatabaseManager(pool)
+    pool.close()
+
+def test_export_csv(manager, db, samples, tmp_path):
+    manager.import_csv('adminusers_adminuser', samples['admin'])
+    target = str(tmp_path / 'admin.csv')
+    assert manager.export_csv('adminusers_adminuser', target)
+    rows = _rows(target)
+    assert rows[0] == ['id', 'admin_name', 'admin_email', 'admin_desc', 'admin_photo']
+    assert len(rows) == 21
+    assert manager.last_export_stats['rows'] == 20
+
+def test_export_snapshot(snapshot_manager, db, loaded_users, tmp_path):
+    targets = [('auth_user', str(tmp_path / 'auth.csv')), ('foodie_contact', str(tmp_path / 'foodie.csv'))]
+    assert snapshot_manager.export_snapshot(targets)
+    stats = snapshot_manager.last_export_stats
+    assert [t['rows'] for t in stats['tables']] == [20, 20]
+    assert len(_rows(targets[0][1])) == 21
+    assert len(_rows(targets[1][1])) == 21
+    assert count(db, 'auth_user') == 20
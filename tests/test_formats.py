@@ -0,0 +1,40 @@
+import pytest
+import data_cli
+from conftest import fetch
+from data_core import export_option
+from data_formats import format_of, format_suffix
+
+USERS_QUERY = """
+    SELECT u.id, u.username, u.last_login, u.is_staff, f.id, f.user_id, f.updated_date, f.favor_thai
+    FROM auth_user u JOIN foodie_contact f ON f.user_id = u.id ORDER BY u.id
+"""
+
+def test_format_of():
+    assert format_of('Foodie_x.pgcopy') == 'binary'
+    assert format_of('Foodie_x.pgcopy.gz') == 'binary'
+    assert format_of('Foodie_x.parquet') == 'parquet'
+    assert format_of('Foodie_x.csv.zst') == 'csv'
+    assert format_suffix('binary', 'gz') == '.pgcopy.gz'
+    assert format_suffix('parquet', 'gz') == '.parquet'
+
+@pytest.mark.parametrize('fmt, compression', [('binary', None), ('binary', 'gz'), ('parquet', None)])
+def test_typed_round_trip(env_db, manager, db, loaded_users, tmp_path, fmt, compression):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    # Gaps in the ids must survive the round trip
+    with db:
+        with db.cursor() as cur:
+            cur.execute("DELETE FROM foodie_contact WHERE id = 3")
+            cur.execute("DELETE FROM auth_user WHERE id = 3")
+    before = fetch(db, USERS_QUERY)
+    files = export_option(manager, 3, '20250101_000000', str(tmp_path), compression=compression, fmt=fmt)
+    assert all(f.endswith(format_suffix(fmt, compression)) for f in files)
+
+    with db:
+        with db.cursor() as cur:
+            cur.execute("DELETE FROM foodie_contact; DELETE FROM auth_user")
+    code = data_cli.main(['import', 'users'] + files + ['--metrics-file', str(tmp_path / 'metrics.jsonl')])
+    assert code == data_cli.EXIT_OK
+    assert fetch(db, USERS_QUERY) == before
+    # Sequences continue after the loaded ids
+    assert fetch(db, "SELECT nextval('auth_user_id_seq')") == [(21,)]
@@ -0,0 +1,63 @@
+import pytest
+from conftest import count, fetch
+from data_core import (ImportMonitor, load_admin_user, load_restaurant, load_users,
+                       validate_admin_user, validate_restaurant)
+
+@pytest.mark.parametrize('mode', ['insert', 'copy'])
+def test_import_csv_modes(manager, db, samples, mode):
+    assert manager.import_csv('adminusers_adminuser', samples['admin'], mode=mode)
+    assert count(db, 'adminusers_adminuser') == 20
+    assert manager.last_import_stats['mode'] == mode
+    assert manager.last_import_stats['rows'] == 20
+    # The file's id column is dropped, ids restart at 1
+    assert fetch(db, "SELECT min(id), max(id) FROM adminusers_adminuser") == [(1, 20)]
+
+def test_import_csv_replaces_existing_rows(manager, db, samples):
+    manager.import_csv('adminusers_adminuser', samples['admin'], mode='copy')
+    manager.import_csv('adminusers_adminuser', samples['admin'], mode='copy')
+    assert count(db, 'adminusers_adminuser') == 20
+
+def test_copy_falls_back_to_insert_to_report_the_bad_row(manager, db, samples, tmp_path):
+    bad = tmp_path / 'bad.csv'
+    lines = open(samples['admin'], encoding='utf-8').read().splitlines()
+    # Duplicate admin_name on line 4
+    lines.insert(3, lines[2].replace('@', '_dup@'))
+    bad.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    manager.import_csv('adminusers_adminuser', samples['admin'])
+    with pytest.raises(Exception, match='Row 4'):
+        manager.import_csv('adminusers_adminuser', str(bad), mode='copy')
+    # The failed load left the previous rows alone
+    assert count(db, 'adminusers_adminuser') == 20
+
+def test_load_admin_and_restaurant(pool, db, samples):
+    valid, admin_rows, errors = validate_admin_user(samples['admin'])
+    assert valid, list(errors)
+    valid, restaurant_rows, errors = validate_restaurant(samples['restaurant'])
+    assert valid, list(errors)
+    with pool.connection() as conn:
+        assert load_admin_user(conn, admin_rows) == 20
+        assert load_restaurant(conn, restaurant_rows) == len(restaurant_rows)
+    assert count(db, 'listings_two_dish_rice') == len(restaurant_rows)
+    assert fetch(db, "SELECT openhour_afternoon::text, two_dish_price FROM listings_two_dish_rice "
+                     "WHERE restaurant_name = 'BBB'") == [('12:00:00', 25)]
+
+def test_load_users_links_foodies(pool, db, users):
+    auth_data, foodie_data = users
+    monitor = ImportMonitor()
+    with pool.connection() as conn:
+        assert load_users(conn, auth_data, foodie_data, monitor=monitor) == (20, 20)
+    assert fetch(db, """
+        SELECT count(*) FROM foodie_contact f JOIN auth_user u ON u.id = f.user_id
+        WHERE lower(u.username) = lower(f.foodie_name)
+    """) == [(20,)]
+
+def test_cancelled_load_rolls_back(pool, db, samples):
+    valid, admin_rows, _ = validate_admin_user(samples['admin'])
+    with pool.connection() as conn:
+        load_admin_user(conn, admin_rows)
+    monitor = ImportMonitor()
+    monitor.cancel()
+    with pool.connection() as conn:
+        with pytest.raises(Exception, match='cancelled'):
+            load_admin_user(conn, admin_rows[:5], monitor)
+    assert count(db, 'adminusers_adminuser') == 20
@@ -0,0 +1,91 @@
+import logging
+import pytest
+import data2
+from data2 import LogConsole
+
+class FakeText:
+    """The parts of tk.Text LogConsole uses, without a display"""
+    def __init__(self):
+        self.lines = []
+        self.inserts = 0
+        self.scheduled = []
+        self.state = None
+
+    def after(self, ms, callback):
+        self.scheduled.append((ms, callback))
+
+    def config(self, state):
+        self.state = state
+
+    def insert(self, index, *chunks):
+        assert index == 'end' and self.state == 'normal'
+        self.inserts += 1
+        for text, tag in zip(chunks[::2], chunks[1::2]):
+            self.lines += [(line, tag) for line in text.splitlines()]
+
+    def index(self, index):
+        return f"{len(self.lines) + 2}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split('.')[0]) - 1]
+
+    def see(self, index):
+        pass
+
+    def run_timer(self):
+        _, callback = self.scheduled.pop(0)
+        callback()
+
+@pytest.fixture
+def console(tmp_path, monkeypatch):
+    logger = logging.getLogger("data_manager.console")
+    logger.handlers.clear()
+    monkeypatch.setattr(data2, 'LOG_FILE', str(tmp_path / 'data_manager.log'))
+    monkeypatch.setattr(LogConsole, 'MAX_LINES', 5)
+    yield LogConsole(FakeText())
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers.clear()
+
+def _log_lines(tmp_path):
+    logging.getLogger("data_manager.console").handlers[0].flush()
+    return (tmp_path / 'data_manager.log').read_text(encoding='utf-8').splitlines()
+
+def test_flushes_in_one_insert(console):
+    text = console.text
+    assert text.scheduled[0][0] == LogConsole.FLUSH_MS
+    console.write("one", "info")
+    console.write("two", "success")
+    console.write("three")
+    assert text.lines == []
+    text.run_timer()
+    assert text.inserts == 1
+    assert [(line.split('] ')[1], tag) for line, tag in text.lines] == \
+        [("one", "info"), ("two", "success"), ("three", ())]
+    assert text.state == 'disabled'
+    # Nothing pending: no insert, and the timer keeps running
+    text.run_timer()
+    assert text.inserts == 1
+    assert len(text.scheduled) == 1
+
+def test_widget_keeps_last_lines(console):
+    text = console.text
+    for n in range(3):
+        console.write(f"line {n}")
+    text.run_timer()
+    for n in range(3, 6):
+        console.write(f"line {n}")
+    text.run_timer()
+    assert [line.split('] ')[1] for line, _ in text.lines] == [f"line {n}" for n in range(1, 6)]
+
+def test_burst_keeps_its_tail(console, tmp_path):
+    text = console.text
+    for n in range(10):
+        console.write(f"line {n}", "error" if n == 0 else None)
+    text.run_timer()
+    assert text.lines[0] == (f"... 6 lines not shown, see {tmp_path / 'data_manager.log'}", "info")
+    assert [line.split('] ')[1] for line, _ in text.lines[1:]] == [f"line {n}" for n in range(6, 10)]
+    # The file has every line
+    lines = _log_lines(tmp_path)
+    assert len(lines) == 10
+    assert lines[0].endswith("ERROR line 0")
@@ -0,0 +1,69 @@
+import data_cli
+from data_metrics import RunMetrics, read_metrics, span, start_span
+
+def _run(metrics_file, *argv):
+    code = data_cli.main(list(argv) + ['--metrics-file', metrics_file])
+    return code, read_metrics(metrics_file)[-1]
+
+def _span_names(record):
+    return [s['name'] for s in record['spans']]
+
+def test_passing_import(env_db, samples, tmp_path):
+    code, record = _run(str(tmp_path / 'metrics.jsonl'), 'import', 'admin', samples['admin'])
+    assert code == data_cli.EXIT_OK
+    assert record['ok'] is True
+    assert record['exit_code'] == 0
+    assert record['error'] is None
+    names = _span_names(record)
+    assert 'validate adminusers_adminuser' in names
+    assert 'load adminusers_adminuser' in names
+    assert not any(s['failed'] for s in record['spans'])
+
+def test_failing_import(env_db, db, samples, tmp_path):
+    with db:
+        with db.cursor() as cur:
+            cur.execute("ALTER TABLE adminusers_adminuser DROP COLUMN admin_desc")
+    code, record = _run(str(tmp_path / 'metrics.jsonl'), 'import', 'admin', samples['admin'])
+    assert code == data_cli.EXIT_DATABASE
+    assert record['ok'] is False
+    assert record['exit_code'] == data_cli.EXIT_DATABASE
+    assert 'admin_desc' in record['error']
+    load = [s for s in record['spans'] if s['name'] == 'load adminusers_adminuser']
+    assert len(load) == 1 and load[0]['failed']
+
+def test_validation_failure_is_not_ok(env_db, tmp_path):
+    bad = tmp_path / 'admin.csv'
+    bad.write_text("id,admin_name,admin_photo,admin_desc,admin_email\n1,,a.png,,\n", encoding='utf-8')
+    code, record = _run(str(tmp_path / 'metrics.jsonl'), 'import', 'admin', str(bad))
+    assert code == data_cli.EXIT_VALIDATION
+    assert record['ok'] is False
+    assert record['exit_code'] == data_cli.EXIT_VALIDATION
+
+def test_passing_and_failing_export(env_db, samples, tmp_path):
+    metrics_file = str(tmp_path / 'metrics.jsonl')
+    data_cli.main(['import', 'admin', samples['admin'], '--metrics-file', metrics_file])
+    code, record = _run(metrics_file, 'export', 'admin', '--dir', str(tmp_path))
+    assert code == data_cli.EXIT_OK
+    assert record['ok'] is True
+    assert _span_names(record) == ['export adminusers_adminuser']
+
+    code, record = _run(metrics_file, 'export', 'admin', '--dir', str(tmp_path / 'missing'))
+    assert code == data_cli.EXIT_DATABASE
+    assert record['ok'] is False
+    assert record['error']
+    assert _span_names(record) == ['export adminusers_adminuser']
+    assert record['spans'][0]['failed']
+
+def test_open_spans_are_closed_as_failed(tmp_path):
+    with RunMetrics('import', str(tmp_path / 'metrics.jsonl')) as metrics:
+        start_span("never closed")
+        try:
+            with span("raises"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        with span("fine"):
+            pass
+    spans = {s['name']: s['failed'] for s in metrics.record['spans']}
+    assert spans == {"never closed": True, "raises": True, "fine": False}
+    assert metrics.record['ok'] is True
@@ -0,0 +1,91 @@
+import csv
+import random
+from data_core import PackedRows, validate_auth_user, validate_foodie_contact
+from data_errors import ErrorCollector
+from data_schema import FOODIE_CONTACT
+
+FLAGS = FOODIE_CONTACT.fields_of_kind('bool')
+
+def _row(**flags):
+    values = {c: f"{c} value" for c in FOODIE_CONTACT.insert_columns}
+    values.update({c: False for c in FLAGS})
+    values.update(flags)
+    return tuple(values[c] for c in FOODIE_CONTACT.insert_columns)
+
+def test_round_trip_every_flag():
+    # One row per flag, so a bit landing in the wrong column shows up
+    rows = [_row()] + [_row(**{flag: True}) for flag in FLAGS] + [_row(**dict.fromkeys(FLAGS, True))]
+    packed = PackedRows(FOODIE_CONTACT, rows)
+    assert len(packed) == len(rows)
+    assert list(packed) == rows
+    assert packed[3] == rows[3]
+    assert packed[-1] == rows[-1]
+    assert packed[2:5] == rows[2:5]
+    assert all(type(v) is bool for row in packed for c, v in zip(FOODIE_CONTACT.insert_columns, row)
+               if c in FLAGS)
+
+def test_one_mask_per_row():
+    packed = PackedRows(FOODIE_CONTACT, [_row(favor_thai=True, is_mvp=True)])
+    stored = packed._rows[0]
+    assert len(stored) == len(FOODIE_CONTACT.insert_columns) - len(FLAGS) + 1
+    assert bin(stored[-1]).count('1') == 2
+
+def test_column_reads_without_unpacking():
+    rows = [_row(foodie_name=f"user{n}") for n in range(3)]
+    packed = PackedRows(FOODIE_CONTACT, rows)
+    assert list(packed.column(FOODIE_CONTACT.insert_position('foodie_name'))) == ['user0', 'user1', 'user2']
+
+def test_validated_foodies_are_packed(users, samples):
+    auth_data, foodie_data = users
+    assert isinstance(auth_data, PackedRows)
+    assert isinstance(foodie_data, PackedRows)
+    # Same tuples as validating again, and as many as the file has rows
+    _, again, _ = validate_foodie_contact(samples['foodie'], auth_data)
+    assert list(again) == list(foodie_data)
+    assert len(foodie_data) == 20
+
+def _shuffle_users(file_path, bad_ids=(), first_ids=()):
+    # Rows out of id order, starting with first_ids in ascending order; the
+    # users in bad_ids get an invalid is_staff
+    with open(file_path, newline='', encoding='utf-8') as f:
+        header, *rows = list(csv.reader(f))
+    random.Random(7).shuffle(rows)
+    id_pos = header.index('id')
+    for row in rows:
+        if row[id_pos] in bad_ids:
+            row[header.index('is_staff')] = 'maybe'
+    rows.sort(key=lambda row: first_ids.index(row[id_pos]) if row[id_pos] in first_ids else len(first_ids))
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def test_shuffled_users_come_back_in_id_order(users, samples):
+    auth_data, _ = users
+    _shuffle_users(samples['auth'])
+    valid, shuffled, errors = validate_auth_user(samples['auth'])
+    assert valid, list(errors)
+    assert list(shuffled) == list(auth_data)
+
+def _error_ids(file_path, errors):
+    with open(file_path, newline='', encoding='utf-8') as f:
+        header, *rows = list(csv.reader(f))
+    line_ids = {n: int(row[header.index('id')]) for n, row in enumerate(rows, start=2)}
+    return [line_ids[e.row] for e in errors]
+
+def test_shuffled_users_report_each_error_once(samples):
+    _shuffle_users(samples['auth'], {'3', '9', '12', '17'}, ['12', '17', '1'])
+    valid, _, errors = validate_auth_user(samples['auth'], errors=ErrorCollector(budget=None))
+    assert not valid
+    assert all('maybe' in e for e in errors)
+    # Once each, in id order as the sorted pass found them, not file order
+    assert _error_ids(samples['auth'], errors) == [3, 9, 12, 17]
+
+def test_shuffled_users_budget_counts_from_the_sorted_pass(samples):
+    # Read in file order, 12 and 17 would spend the budget before the
+    # first out-of-order id shows the file needs sorting
+    _shuffle_users(samples['auth'], {'3', '9', '12', '17'}, ['12', '17', '1'])
+    valid, _, errors = validate_auth_user(samples['auth'], errors=ErrorCollector(budget=2))
+    assert not valid
+    assert errors.exhausted
+    assert _error_ids(samples['auth'], errors) == [3, 9]
@@ -0,0 +1,56 @@
+import pytest
+from conftest import write_copies
+from data_core import ImportMonitor, validate_auth_user, validate_restaurant
+from data_parallel import split_csv_records, validate_parallel
+
+# Chunks of a few kilobytes, so small files are still split across workers
+CHUNK_BYTES = 4096
+
+@pytest.fixture
+def restaurants(samples, tmp_path):
+    path = str(tmp_path / 'restaurants.csv')
+    rows = write_copies(samples['restaurant'], path, 20, 'restaurant_name')
+    return path, rows
+
+def test_split_csv_records_keeps_quoted_newlines(restaurants):
+    path, _ = restaurants
+    header_end, ranges = split_csv_records(path, CHUNK_BYTES)
+    assert len(ranges) > 2
+    # Ranges are contiguous and each starts at a record's row number
+    assert ranges[0][0] == header_end
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert ranges[0][2] == 2
+
+def test_parallel_matches_sequential(restaurants):
+    path, rows = restaurants
+    valid, sequential, errors = validate_restaurant(path)
+    assert valid, list(errors)
+    valid, parallel, errors = validate_parallel(path, 'listings_two_dish_rice', ImportMonitor(),
+                                                workers=2, chunk_bytes=CHUNK_BYTES)
+    assert valid, errors
+    assert len(parallel) == rows
+    assert parallel == sequential
+
+def test_parallel_finds_duplicates_across_chunks(samples, tmp_path):
+    path = str(tmp_path / 'restaurants.csv')
+    rows = write_copies(samples['restaurant'], path, 20, 'restaurant_name')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(open(path, encoding='utf-8').read().splitlines()[1] + '\n')
+    _, _, sequential = validate_restaurant(path)
+    valid, _, errors = validate_parallel(path, 'listings_two_dish_rice', ImportMonitor(),
+                                         workers=2, chunk_bytes=CHUNK_BYTES)
+    assert not valid
+    assert errors == list(sequential)
+    assert f"Row {rows + 2}" in errors[0]
+
+def test_parallel_users_sorted_by_id(samples, tmp_path):
+    # Reversed file: both paths load users in id order
+    path = str(tmp_path / 'auth.csv')
+    lines = open(samples['auth'], encoding='utf-8').read().splitlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines[:1] + lines[:0:-1]) + '\n')
+    _, sequential, _ = validate_auth_user(path)
+    valid, parallel, errors = validate_parallel(path, 'auth_user', ImportMonitor(), workers=2,
+                                                chunk_bytes=512, sort_by_id=True)
+    assert valid, errors
+    assert list(parallel) == list(sequential)
@@ -0,0 +1,61 @@
+import pytest
+from data_pool import ConnectionPool, load_settings
+
+def test_settings_from_file_and_environment(tmp_path, monkeypatch):
+    config = tmp_path / 'dishdb.ini'
+    config.write_text("[database]\nhost = db.example\npool_max = 3\n", encoding='utf-8')
+    monkeypatch.setenv('DISHDB_CONFIG', str(config))
+    monkeypatch.delenv('DISHDB_HOST', raising=False)
+    monkeypatch.delenv('DISHDB_DBNAME', raising=False)
+    monkeypatch.setenv('DISHDB_POOL_MAX', '5')
+    settings = load_settings()
+    assert settings['host'] == 'db.example'
+    assert settings['pool_max'] == '5'
+    assert settings['dbname'] == 'dishdb'
+
+def test_dead_connection_is_replaced(db, db_settings):
+    pool = ConnectionPool(dict(db_settings, pool_min='1', pool_max='1'))
+    try:
+        with pool.connection() as conn:
+            conn.close()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                assert cur.fetchone() == (1,)
+    finally:
+        pool.close()
+
+def test_open_transaction_is_rolled_back(db, db_settings):
+    pool = ConnectionPool(dict(db_settings, pool_min='1', pool_max='1'))
+    try:
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO auth_user (password, is_superuser, username, email, is_staff, "
+                            "is_active, date_joined) VALUES ('x', false, 'u', 'e', false, true, now())")
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT count(*) FROM auth_user")
+                assert cur.fetchone() == (0,)
+    finally:
+        pool.close()
+
+def test_exhausted_pool_times_out(db, db_settings):
+    pool = ConnectionPool(dict(db_settings, pool_min='1', pool_max='1', pool_timeout='0.2'))
+    try:
+        with pool.connection():
+            with pytest.raises(Exception, match='No database connection free'):
+                with pool.connection():
+                    pass
+    finally:
+        pool.close()
+
+def test_password_is_required(tmp_path, monkeypatch):
+    monkeypatch.setenv('DISHDB_CONFIG', str(tmp_path / 'missing.ini'))
+    monkeypatch.delenv('DISHDB_PASSWORD', raising=False)
+    settings = load_settings()
+    assert settings['password'] is None
+    with pytest.raises(Exception, match='No database password'):
+        ConnectionPool(settings)
+    # An empty password is a deliberate choice, not a missing one
+    monkeypatch.setenv('DISHDB_PASSWORD', '')
+    assert load_settings()['password'] == ''
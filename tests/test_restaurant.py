@@ -0,0 +1,87 @@
+import csv
+from datetime import datetime, time
+from data_core import validate_restaurant
+from data_schema import RESTAURANT
+
+# validate_restaurant parses every field once; its tuples and messages must
+# match what the old validate-then-convert passes of import_restaurant gave.
+
+BOOLEANS = RESTAURANT.fields_of_kind('bool')
+PRICES = RESTAURANT.fields_of_kind('number')
+PHOTOS = RESTAURANT.fields_of_kind('photo')
+
+def _old_convert(row):
+    # The second pass of the old import_restaurant, on a row the first
+    # pass accepted
+    row = dict(zip(RESTAURANT.columns, row))
+    converted = {}
+    for field in BOOLEANS:
+        converted[field] = row[field].strip().upper() in ('TRUE', 'T', '1')
+    for field in PRICES:
+        converted[field] = float(row[field])
+    for field in PHOTOS:
+        value = row[field].strip()
+        converted[field] = 'None' if value in ('', 'None', 'null') else value
+    converted['list_date'] = datetime.fromisoformat(row['list_date']).astimezone().replace(tzinfo=None)
+    try:
+        converted['edit_date'] = datetime.strptime(row['edit_date'], "%Y-%m-%d")
+    except ValueError:
+        converted['edit_date'] = datetime.strptime(row['edit_date'], "%d/%m/%Y")
+    for flag, open_field, close_field in RESTAURANT.time_groups:
+        for field in (open_field, close_field):
+            value = row[field].strip()
+            if len(value.split(':')[0]) == 1:
+                value = '0' + value
+            converted[field] = time.fromisoformat(value) if converted[flag] else None
+    for field in ('restaurant_name', 'restaurant_area', 'restaurant_district', 'restaurant_street',
+                  'restaurant_address', 'menu'):
+        converted[field] = row[field]
+    return tuple(converted[c] for c in RESTAURANT.insert_columns)
+
+def _read(file_path):
+    with open(file_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        return next(reader), list(reader)
+
+def _write(file_path, header, rows):
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def _set(row, **values):
+    row = list(row)
+    for name, value in values.items():
+        row[RESTAURANT.columns.index(name)] = value
+    return row
+
+def test_matches_old_conversion(samples):
+    header, rows = _read(samples['restaurant'])
+    # The spellings the old passes normalised
+    rows[0] = _set(rows[0], edit_date='2025-06-24', fullday='t', openhour_fullday='9:00',
+                   closehour_fullday='21:30', category_veg='0', menu_photo1='null')
+    rows[1] = _set(rows[1], edit_date='24/06/2025', night='1', openhour_night='18:00',
+                   closehour_night='23:00', payment_cash='F')
+    _write(samples['restaurant'], header, rows)
+    valid, converted, errors = validate_restaurant(samples['restaurant'])
+    assert valid, list(errors)
+    assert converted == [_old_convert(row) for row in rows]
+
+def test_same_messages_as_old_validation(samples):
+    header, rows = _read(samples['restaurant'])
+    rows[0] = _set(rows[0], two_dish_price='cheap', category_veg='maybe')
+    rows[1] = _set(rows[1], restaurant_name=rows[0][1])
+    rows[2] = _set(rows[2], fullday='TRUE', openhour_fullday='', edit_date='June')
+    rows[3] = rows[3][:5]
+    _write(samples['restaurant'], header, rows)
+    valid, converted, errors = validate_restaurant(samples['restaurant'])
+    assert not valid
+    assert converted is None
+    assert sorted(errors) == sorted([
+        "Row 2: category_veg must be 'TRUE' or 'FALSE'",
+        "Row 2: two_dish_price must be a number",
+        f"Row 3: Duplicate restaurant_name {rows[0][1]}",
+        "Row 4: edit_date has invalid format (expected dd/mm/yyyy)",
+        "Row 4: openhour_fullday and closehour_fullday are required when fullday is TRUE",
+        "Row 5: Incorrect number of columns",
+    ])
@@ -0,0 +1,127 @@
+import os
+import pytest
+from conftest import count, fetch
+from data_core import ImportCancelled, ImportMonitor
+from data_errors import ErrorCollector, error_report_path
+from data_resume import checkpoint_file, import_admin_resumable, import_users_resumable
+
+# Small batches so a 20 row file is committed in several steps
+BATCH_BYTES = 600
+
+def _break_row(file_path, row_no):
+    # Blank the admin_email of CSV line row_no (the header is line 1)
+    with open(file_path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    original = lines[row_no - 1]
+    lines[row_no - 1] = original.rsplit(',', 1)[0] + ','
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return original
+
+def _restore_row(file_path, row_no, original):
+    with open(file_path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    lines[row_no - 1] = original
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def _stage_tables(db):
+    return fetch(db, "SELECT tablename FROM pg_tables WHERE schemaname = 'public' "
+                     "AND tablename LIKE '%%_import_stage'")
+
+def test_resumable_import(pool, db, samples):
+    with pool.connection() as conn:
+        valid, row_count, errors = import_admin_resumable(conn, samples['admin'], batch_bytes=BATCH_BYTES)
+    assert valid, errors
+    assert row_count == 20
+    assert count(db, 'adminusers_adminuser') == 20
+    assert not os.path.exists(checkpoint_file(samples['admin']))
+    assert _stage_tables(db) == []
+
+def test_resume_after_bad_row(pool, db, samples):
+    original = _break_row(samples['admin'], 18)
+    messages = []
+    with pool.connection() as conn:
+        valid, staged, errors = import_admin_resumable(conn, samples['admin'], batch_bytes=BATCH_BYTES)
+    assert not valid
+    assert 'Row 18' in list(errors)[0]
+    assert 0 < staged < 17
+    assert count(db, 'adminusers_adminuser') == 0
+    assert os.path.exists(checkpoint_file(samples['admin']))
+
+    # Fixing a row after the checkpoint keeps the staged batches
+    _restore_row(samples['admin'], 18, original)
+    with pool.connection() as conn:
+        valid, row_count, errors = import_admin_resumable(
+            conn, samples['admin'], lambda message, tag=None: messages.append(message),
+            batch_bytes=BATCH_BYTES)
+    assert valid, errors
+    assert row_count == 20
+    assert any(m.startswith('Resuming adminusers_adminuser') for m in messages)
+    assert fetch(db, "SELECT min(id), max(id), count(DISTINCT admin_name) FROM adminusers_adminuser") == [(1, 20, 20)]
+    assert not os.path.exists(checkpoint_file(samples['admin']))
+
+def test_resume_after_cancel(pool, db, samples):
+    def cancel_after_first_batch(stage, done, total, rate):
+        if done:
+            monitor.cancel()
+    monitor = ImportMonitor(callback=cancel_after_first_batch, every=1)
+    with pool.connection() as conn:
+        with pytest.raises(ImportCancelled):
+            import_admin_resumable(conn, samples['admin'], monitor=monitor, batch_bytes=BATCH_BYTES)
+        valid, row_count, errors = import_admin_resumable(conn, samples['admin'], batch_bytes=BATCH_BYTES)
+    assert valid, errors
+    assert row_count == 20
+    assert count(db, 'adminusers_adminuser') == 20
+
+def test_changed_prefix_starts_over(pool, db, samples):
+    _break_row(samples['admin'], 18)
+    messages = []
+    with pool.connection() as conn:
+        import_admin_resumable(conn, samples['admin'], batch_bytes=BATCH_BYTES)
+    # Rewrite the whole file: row 2 changes, which was already staged
+    with open(samples['admin'], encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    lines[1] = lines[1].replace('Mandy Tang', 'Mandy T')
+    lines[17] = lines[17] + 'fixed@example.com'
+    with open(samples['admin'], 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    with pool.connection() as conn:
+        valid, row_count, errors = import_admin_resumable(
+            conn, samples['admin'], lambda message, tag=None: messages.append(message),
+            batch_bytes=BATCH_BYTES)
+    assert valid, errors
+    assert row_count == 20
+    assert any('starting over' in m for m in messages)
+    assert fetch(db, "SELECT admin_name FROM adminusers_adminuser WHERE id = 1") == [('Mandy T',)]
+
+def test_resumable_users(pool, db, samples):
+    with pool.connection() as conn:
+        valid, counts, errors = import_users_resumable(conn, samples['auth'], samples['foodie'],
+                                                       batch_bytes=BATCH_BYTES)
+    assert valid, list(errors)
+    assert counts == (20, 20)
+    assert fetch(db, """
+        SELECT count(*) FROM foodie_contact f JOIN auth_user u ON u.id = f.user_id
+        WHERE lower(u.username) = lower(f.foodie_name)
+    """) == [(20,)]
+    assert _stage_tables(db) == []
+
+def test_import_csv_resumable(manager, db, samples):
+    assert manager.import_csv('adminusers_adminuser', samples['admin'], resumable=True)
+    assert manager.last_import_stats['mode'] == 'resumable'
+    assert count(db, 'adminusers_adminuser') == 20
+
+def test_resume_errors_stop_at_budget(pool, db, samples):
+    # Every row of the first batch lacks its admin_email
+    for row_no in range(2, 22):
+        _break_row(samples['admin'], row_no)
+    errors = ErrorCollector(error_report_path(samples['admin']), examples=3, budget=5)
+    with pool.connection() as conn:
+        valid, staged, errors = import_admin_resumable(conn, samples['admin'], errors=errors)
+    assert not valid
+    assert staged == 0
+    assert len(errors) == 5
+    assert errors.exhausted
+    assert len(list(errors)) == 3
+    assert os.path.exists(errors.report_path)
@@ -0,0 +1,38 @@
+import pytest
+from data_schema import AUTH_USER, HeaderError, SCHEMAS, compile_schema
+
+def test_compiled_once_per_header():
+    assert compile_schema('adminusers_adminuser') is compile_schema('adminusers_adminuser')
+    header = list(reversed(AUTH_USER.columns))
+    assert compile_schema('auth_user', header) is compile_schema('auth_user', tuple(header))
+    assert compile_schema('auth_user', header) is not compile_schema('auth_user')
+
+def test_positions_follow_the_header():
+    header = list(reversed(AUTH_USER.columns))
+    schema = compile_schema('auth_user', header)
+    assert schema.positions['username'] == header.index('username')
+    row = [{'is_superuser': 'True', 'is_staff': 'False', 'is_active': 'True'}.get(c, f"{c} value")
+           for c in header]
+    values, errors = schema.convert(row, 2, schema.new_state())
+    assert errors == []
+    assert dict(zip(AUTH_USER.insert_columns, values))['username'] == 'username value'
+    assert dict(zip(AUTH_USER.insert_columns, values))['is_staff'] is False
+
+def test_strict_header_must_match_exactly():
+    header = list(reversed(SCHEMAS['adminusers_adminuser'].columns))
+    with pytest.raises(HeaderError, match='Header mismatch'):
+        compile_schema('adminusers_adminuser', header)
+
+def test_missing_column_is_a_header_error():
+    with pytest.raises(HeaderError, match='Header mismatch'):
+        compile_schema('auth_user', [c for c in AUTH_USER.columns if c != 'email'])
+
+def test_row_errors_use_table_messages():
+    schema = compile_schema('auth_user')
+    row = dict.fromkeys(AUTH_USER.columns, '')
+    row.update(id='1', password='x', username='mt', email='', is_superuser='maybe',
+               is_staff='False', is_active='True', date_joined='2025-06-17')
+    values, errors = schema.convert(list(row.values()), 2, schema.new_state())
+    assert errors == ["Invalid is_superuser value 'maybe' for user mt", "Missing email for user mt"]
+    assert [e.kind for e in errors] == ['bool', 'missing']
+    assert schema.convert(['1', 'x'], 3, None) == (None, ['Row 3: Incorrect number of columns'])
@@ -0,0 +1,55 @@
+import csv
+import os
+import pytest
+from conftest import fetch, write_copies
+from data_core import load_restaurant, load_typed, validate_restaurant
+from data_shard import export_sharded, shard_filename
+
+def _rows(file_path):
+    with open(file_path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+@pytest.fixture
+def restaurants(pool, samples, tmp_path):
+    path = str(tmp_path / 'restaurants.csv')
+    write_copies(samples['restaurant'], path, 5, 'restaurant_name')
+    _, rows, _ = validate_restaurant(path)
+    with pool.connection() as conn:
+        load_restaurant(conn, rows)
+    return len(rows)
+
+def test_shard_filename():
+    assert shard_filename('out/Restaurant_x.csv.gz', 2) == 'out/Restaurant_x.part002.csv.gz'
+
+@pytest.mark.parametrize('suffix', ['.csv', '.csv.gz', '.pgcopy'])
+def test_sharded_export_matches_plain_export(manager, restaurants, tmp_path, suffix):
+    plain = str(tmp_path / f"plain{suffix}")
+    manager.export_csv('listings_two_dish_rice', plain)
+    target = str(tmp_path / f"sharded{suffix}")
+    parts = export_sharded(manager, 'listings_two_dish_rice', target, parts=3, workers=2)
+    assert parts == [shard_filename(target, n) for n in (1, 2, 3)]
+    assert manager.last_export_stats['rows'] == restaurants
+
+    stitched = str(tmp_path / f"stitched{suffix}")
+    assert export_sharded(manager, 'listings_two_dish_rice', stitched, parts=3, workers=2,
+                          stitch=True) == [stitched]
+    assert not any(os.path.exists(shard_filename(stitched, n)) for n in (1, 2, 3))
+    if suffix == '.csv':
+        rows = _rows(stitched)
+        assert rows[0] == _rows(plain)[0]
+        assert sorted(rows[1:], key=lambda r: int(r[0])) == sorted(_rows(plain)[1:], key=lambda r: int(r[0]))
+        assert sum(len(_rows(p)) - 1 for p in parts) == restaurants
+
+def test_sharded_binary_round_trip(manager, pool, db, restaurants, tmp_path):
+    query = "SELECT * FROM listings_two_dish_rice ORDER BY id"
+    before = fetch(db, query)
+    stitched = str(tmp_path / 'stitched.pgcopy')
+    export_sharded(manager, 'listings_two_dish_rice', stitched, parts=3, workers=2, stitch=True)
+    with pool.connection() as conn:
+        assert load_typed(conn, [('listings_two_dish_rice', stitched)]) == [restaurants]
+    assert fetch(db, query) == before
+
+def test_empty_table(manager, db, tmp_path):
+    target = str(tmp_path / 'empty.csv')
+    assert export_sharded(manager, 'listings_two_dish_rice', target, parts=3, workers=2) == [target]
+    assert len(_rows(target)) == 1
@@ -0,0 +1,70 @@
+import os
+from conftest import count, fetch
+from data_core import import_users_staged
+from data_errors import ErrorCollector, error_report_path
+
+def _rewrite(file_path, edit):
+    with open(file_path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    edit(lines)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def test_staged_matches_validated_load(pool, db, samples, loaded_users):
+    query = """
+        SELECT u.username, u.last_login, u.is_superuser, u.first_name, f.foodie_name, f.updated_date,
+               f.favor_veg, f.foodie_desc, f.user_id
+        FROM auth_user u JOIN foodie_contact f ON f.user_id = u.id ORDER BY u.id
+    """
+    with pool.connection() as conn:
+        expected = fetch(db, query)
+        valid, counts, errors = import_users_staged(conn, samples['auth'], samples['foodie'])
+    assert valid, errors
+    assert counts == (20, 20)
+    assert fetch(db, query) == expected
+
+def test_staged_errors_leave_live_tables(pool, db, samples):
+    with pool.connection() as conn:
+        import_users_staged(conn, samples['auth'], samples['foodie'])
+    # Row 3 repeats row 2's username in upper case, row 4 is not a boolean
+    def edit_auth(lines):
+        fields = lines[2].split(',')
+        fields[4] = lines[1].split(',')[4].upper()
+        lines[2] = ','.join(fields)
+        lines[3] = lines[3].replace(',True,', ',maybe,', 1)
+    _rewrite(samples['auth'], edit_auth)
+    with pool.connection() as conn:
+        valid, _, errors = import_users_staged(conn, samples['auth'], samples['foodie'])
+    assert not valid
+    assert any('Duplicate username (case-insensitive)' in e for e in errors)
+    assert any("value 'maybe'" in e for e in errors)
+    assert any(e.startswith('FOODIE: Username') for e in errors)
+    assert count(db, 'auth_user') == 20
+    assert count(db, 'foodie_contact') == 20
+
+def test_staged_errors_stop_at_budget(pool, db, samples):
+    # Every user fails the boolean checks
+    def edit_auth(lines):
+        lines[1:] = [line.replace(',True,', ',maybe,').replace(',False,', ',maybe,') for line in lines[1:]]
+    _rewrite(samples['auth'], edit_auth)
+    errors = ErrorCollector(error_report_path(samples['auth']), examples=2, budget=7)
+    with pool.connection() as conn:
+        valid, _, errors = import_users_staged(conn, samples['auth'], samples['foodie'], errors=errors)
+    assert not valid
+    assert len(errors) == 7
+    assert errors.exhausted
+    assert list(errors) == ["AUTH: Invalid is_superuser value 'maybe' for user mt",
+                            "AUTH: Invalid is_superuser value 'maybe' for user User1"]
+    with open(errors.report_path, encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 8
+    assert count(db, 'auth_user') == 0
+
+def test_staged_errors_are_reported(pool, db, samples):
+    def edit_foodie(lines):
+        lines[1] = lines[1].replace(',mt,', ',nobody,', 1)
+    _rewrite(samples['foodie'], edit_foodie)
+    with pool.connection() as conn:
+        valid, _, errors = import_users_staged(conn, samples['auth'], samples['foodie'])
+    assert not valid
+    assert errors.counts == {'reference': 1}
+    assert os.path.exists(error_report_path(samples['auth']))
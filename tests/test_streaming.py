@@ -0,0 +1,30 @@
+from conftest import count, fetch, write_copies
+from data_core import import_restaurant_streaming, load_restaurant, validate_restaurant
+
+RESTAURANT_QUERY = "SELECT * FROM listings_two_dish_rice ORDER BY id"
+
+def test_streaming_matches_batch_load(pool, db, samples, tmp_path):
+    path = str(tmp_path / 'restaurants.csv')
+    rows = write_copies(samples['restaurant'], path, 5, 'restaurant_name')
+    _, converted, _ = validate_restaurant(path)
+    with pool.connection() as conn:
+        load_restaurant(conn, converted)
+        expected = fetch(db, RESTAURANT_QUERY)
+        valid, row_count, errors = import_restaurant_streaming(conn, path, chunk_size=7)
+    assert valid, list(errors)
+    assert row_count == rows
+    assert fetch(db, RESTAURANT_QUERY) == expected
+
+def test_streaming_error_rolls_back_every_chunk(pool, db, samples, tmp_path):
+    path = str(tmp_path / 'restaurants.csv')
+    rows = write_copies(samples['restaurant'], path, 5, 'restaurant_name')
+    with open(path, 'a', encoding='utf-8') as f:
+        # Same name as the first row, found after several chunks are written
+        f.write(open(path, encoding='utf-8').read().splitlines()[1] + '\n')
+    with pool.connection() as conn:
+        load_restaurant(conn, validate_restaurant(samples['restaurant'])[1])
+        before = count(db, 'listings_two_dish_rice')
+        valid, _, errors = import_restaurant_streaming(conn, path, chunk_size=7)
+    assert not valid
+    assert f"Row {rows + 2}" in list(errors)[0]
+    assert count(db, 'listings_two_dish_rice') == before
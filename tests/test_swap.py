@@ -0,0 +1,108 @@
+import pytest
+import psycopg2
+from conftest import count, fetch
+from data_core import validate_admin_user, validate_restaurant
+from data_swap import swap_admin_user, swap_restaurant, swap_users
+
+def _structure(db, table):
+    # Index and constraint definitions, which the swap has to carry over
+    indexes = fetch(db, "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s ORDER BY 1", (table,))
+    constraints = fetch(db, """
+        SELECT conname, pg_get_constraintdef(oid), convalidated FROM pg_constraint
+        WHERE conrelid = %s::regclass ORDER BY 1
+    """, (table,))
+    return indexes, constraints
+
+def _shadows(db):
+    return fetch(db, "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename LIKE '%%_shadow'")
+
+def test_swap_admin(pool, db, samples):
+    _, rows, _ = validate_admin_user(samples['admin'])
+    before = _structure(db, 'adminusers_adminuser')
+    with pool.connection() as conn:
+        assert swap_admin_user(conn, rows) == 20
+        # Again, now replacing the table the first swap created
+        assert swap_admin_user(conn, rows[:10]) == 10
+    assert count(db, 'adminusers_adminuser') == 10
+    assert _structure(db, 'adminusers_adminuser') == before
+    assert fetch(db, "SELECT min(id), max(id) FROM adminusers_adminuser") == [(1, 10)]
+    assert fetch(db, "SELECT nextval('adminusers_adminuser_id_seq')") == [(11,)]
+    assert _shadows(db) == []
+
+def test_swap_restaurant(pool, db, samples):
+    _, rows, _ = validate_restaurant(samples['restaurant'])
+    before = _structure(db, 'listings_two_dish_rice')
+    with pool.connection() as conn:
+        assert swap_restaurant(conn, rows) == len(rows)
+    assert count(db, 'listings_two_dish_rice') == len(rows)
+    assert _structure(db, 'listings_two_dish_rice') == before
+
+def test_swap_users_keeps_foreign_key(pool, db, loaded_users):
+    auth_data, foodie_data = loaded_users
+    before = {table: _structure(db, table) for table in ('auth_user', 'foodie_contact')}
+    with pool.connection() as conn:
+        assert swap_users(conn, auth_data, foodie_data) == (20, 20)
+    assert {table: _structure(db, table) for table in ('auth_user', 'foodie_contact')} == before
+    assert fetch(db, """
+        SELECT count(*) FROM foodie_contact f JOIN auth_user u ON u.id = f.user_id
+        WHERE lower(u.username) = lower(f.foodie_name)
+    """) == [(20,)]
+    with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+        with db:
+            with db.cursor() as cur:
+                cur.execute("UPDATE foodie_contact SET user_id = 1000 WHERE id = 1")
+
+def test_failed_swap_leaves_live_table(pool, db, samples):
+    _, rows, _ = validate_admin_user(samples['admin'])
+    with pool.connection() as conn:
+        swap_admin_user(conn, rows)
+        # Duplicate admin_name fails the shadow's unique index
+        with pytest.raises(psycopg2.errors.UniqueViolation):
+            swap_admin_user(conn, rows + rows[:1])
+    assert count(db, 'adminusers_adminuser') == 20
+    assert _shadows(db) == []
+
+def test_swap_keeps_views_triggers_and_comments(pool, db, samples):
+    _, rows, _ = validate_admin_user(samples['admin'])
+    with db:
+        with db.cursor() as cur:
+            cur.execute("""
+                CREATE VIEW admin_names AS SELECT admin_name FROM adminusers_adminuser;
+                CREATE VIEW admin_initials AS SELECT left(admin_name, 1) AS initial FROM admin_names;
+                COMMENT ON VIEW admin_names IS 'names only';
+                COMMENT ON TABLE adminusers_adminuser IS 'site admins';
+                CREATE FUNCTION lower_email() RETURNS trigger AS $$
+                BEGIN NEW.admin_email := lower(NEW.admin_email); RETURN NEW; END $$ LANGUAGE plpgsql;
+                CREATE TRIGGER admin_lower_email BEFORE INSERT OR UPDATE ON adminusers_adminuser
+                    FOR EACH ROW EXECUTE FUNCTION lower_email();
+            """)
+    with pool.connection() as conn:
+        assert swap_admin_user(conn, rows[:10]) == 10
+    assert count(db, 'admin_names') == 10
+    assert count(db, 'admin_initials') == 10
+    assert fetch(db, "SELECT obj_description('admin_names'::regclass, 'pg_class'), "
+                     "obj_description('adminusers_adminuser'::regclass, 'pg_class')") == [('names only', 'site admins')]
+    with db:
+        with db.cursor() as cur:
+            cur.execute("UPDATE adminusers_adminuser SET admin_email = 'SHOUT@EXAMPLE.COM' WHERE id = 1")
+    assert fetch(db, "SELECT admin_email FROM adminusers_adminuser WHERE id = 1") == [('shout@example.com',)]
+
+def test_swap_users_with_view_on_both_tables(pool, db, loaded_users):
+    auth_data, foodie_data = loaded_users
+    with db:
+        with db.cursor() as cur:
+            cur.execute("CREATE VIEW foodie_users AS SELECT u.username, f.gender "
+                        "FROM auth_user u JOIN foodie_contact f ON f.user_id = u.id")
+    with pool.connection() as conn:
+        assert swap_users(conn, auth_data[:5], foodie_data[:5]) == (5, 5)
+    assert count(db, 'foodie_users') == 5
+
+def test_swap_refuses_materialized_view(pool, db, samples):
+    _, rows, _ = validate_admin_user(samples['admin'])
+    with db:
+        with db.cursor() as cur:
+            cur.execute("CREATE MATERIALIZED VIEW admin_count AS SELECT count(*) FROM adminusers_adminuser")
+    with pool.connection() as conn:
+        with pytest.raises(ValueError, match='admin_count depends on it'):
+            swap_admin_user(conn, rows)
+    assert _shadows(db) == []
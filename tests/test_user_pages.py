@@ -0,0 +1,41 @@
+import data_core
+from conftest import fetch
+from data_core import load_users
+from data_schema import AUTH_USER
+
+# auth_user and foodie_contact go in multi-row pages; a small page size
+# makes the 20 sample users span several pages, the last one short.
+
+def _count_pages(monkeypatch):
+    pages = []
+    def counting(cur, query, rows, **kwargs):
+        pages.append(len(rows))
+        return execute_values(cur, query, rows, **kwargs)
+    execute_values = data_core.execute_values
+    monkeypatch.setattr(data_core, 'execute_values', counting)
+    monkeypatch.setattr(data_core, 'USER_PAGE_SIZE', 3)
+    return pages
+
+def test_users_load_in_pages(pool, db, users, monkeypatch):
+    pages = _count_pages(monkeypatch)
+    auth_data, foodie_data = users
+    with pool.connection() as conn:
+        assert load_users(conn, auth_data, foodie_data) == (20, 20)
+    assert pages == [3] * 6 + [2] + [3] * 6 + [2]
+    # Ids follow the file order across pages
+    assert [row[0] for row in fetch(db, "SELECT username FROM auth_user ORDER BY id")] == \
+        [row[AUTH_USER.insert_position('username')] for row in auth_data]
+
+def test_paged_mapping_ignores_case(pool, db, users, monkeypatch):
+    _count_pages(monkeypatch)
+    auth_data, foodie_data = users
+    username_pos = AUTH_USER.insert_position('username')
+    # Foodies still find their user after the usernames change case
+    shouted = [row[:username_pos] + (row[username_pos].upper(),) + row[username_pos + 1:]
+               for row in auth_data]
+    with pool.connection() as conn:
+        load_users(conn, shouted, foodie_data)
+    assert fetch(db, """
+        SELECT count(*) FROM foodie_contact f JOIN auth_user u ON u.id = f.user_id
+        WHERE u.username = upper(f.foodie_name)
+    """) == [(20,)]
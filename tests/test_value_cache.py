@@ -0,0 +1,43 @@
+from data_core import ImportMonitor, format_cache_stats, validate_admin_user, validate_restaurant
+from data_schema import compile_schema
+
+def _admin_row(n, photo):
+    return [str(n), f"admin{n}", photo, '', f"admin{n}@example.com"]
+
+def test_hits_and_misses():
+    schema = compile_schema('adminusers_adminuser')
+    cache = schema.new_cache()
+    state = schema.new_state()
+    photos = ['a.png', 'b.png', 'a.png', 'a.png', 'b.png', 'c.jpg']
+    rows = [schema.convert(_admin_row(n, photo), n, state, cache)[0] for n, photo in enumerate(photos, start=2)]
+    assert cache.stats() == {'admin_photo': {'hits': 3, 'misses': 3, 'hit_rate': 0.5}}
+    # Equal raw values share one converted object
+    photo_pos = schema.schema.insert_position('admin_photo')
+    assert rows[0][photo_pos] is rows[2][photo_pos]
+
+def test_errors_are_not_cached():
+    schema = compile_schema('adminusers_adminuser')
+    cache = schema.new_cache()
+    for n in (2, 3):
+        _, errors = schema.convert(_admin_row(n, 'photo.gif'), n, None, cache)
+        assert errors == [f"Row {n}: Invalid image extension '.gif' for photo"]
+    assert cache.stats()['admin_photo']['hits'] == 0
+
+def test_caches_are_per_import():
+    schema = compile_schema('adminusers_adminuser')
+    first, second = schema.new_cache(), schema.new_cache()
+    schema.convert(_admin_row(2, 'a.png'), 2, None, first)
+    schema.convert(_admin_row(2, 'a.png'), 2, None, second)
+    assert first.stats()['admin_photo']['misses'] == 1
+    assert second.stats()['admin_photo']['misses'] == 1
+
+def test_imports_report_hit_rates(samples):
+    monitor = ImportMonitor()
+    validate_admin_user(samples['admin'], monitor)
+    validate_restaurant(samples['restaurant'], monitor)
+    assert set(monitor.cache_stats) == {'adminusers_adminuser', 'listings_two_dish_rice'}
+    restaurant = monitor.cache_stats['listings_two_dish_rice']
+    assert 'opening hours' in restaurant
+    assert all(s['hits'] + s['misses'] > 0 for s in restaurant.values())
+    assert format_cache_stats({'gender': {'hit_rate': 0.5}, 'age_range': {'hit_rate': 1.0}}) == \
+        'gender 50%, age_range 100%'